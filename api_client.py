@@ -7,17 +7,25 @@ import hashlib
 import logging
 import os
 import socketio
-import urllib.parse
 import websockets
-import websocket
-import threading
-from typing import Dict, Optional, List
-from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from typing import Dict, Optional, List, Tuple
 
 import config
+import delta_messages
+from delta_messages import decode_frame, DecodeError
+from log_utils import HotPathLogger
+from market_state import MarketStateStore, MarketSnapshot
+from order_book import OrderBook, parse_levels
+from tick_log import TickRecorder
+from signing import RequestSigner
+from ws_shards import ShardedConnectionManager
+from universe import UniverseManager
 
 logger = logging.getLogger(__name__)
 
+# Per-tick market data lines: sampled, rate-limited and formatted lazily
+hot_log = HotPathLogger(logger, config.HOT_PATH_LOG_SAMPLE_EVERY, config.HOT_PATH_LOG_MAX_PER_SECOND)
+
 class CoinSwitchClient:
     """
     A simplified CoinSwitch client for live trading, using WebSockets for market data
@@ -27,6 +35,8 @@ class CoinSwitchClient:
     def __init__(self):
         self.api_key = config.API_KEY
         self.api_secret = config.API_SECRET
+        # Parses the private key once; reused for every REST call
+        self.signer = RequestSigner(self.api_key, self.api_secret)
         
         if config.DEMO_MODE:
             logger.info("🧪 Running in DEMO MODE - using simulated data")
@@ -40,27 +50,59 @@ class CoinSwitchClient:
         self.session = aiohttp.ClientSession(
             connector=self.connector,
             timeout=timeout,
-            headers={
-                'Content-Type': 'application/json',
-                'X-AUTH-APIKEY': self.api_key or ''
-            }
+            headers=self.signer.base_headers
         )
         
         self.ws_connections = {}
         self.ws_tasks = {}
+        # In-flight order book resubscriptions by slot, kept so they are not garbage collected mid-send
+        self._resync_tasks: Dict[int, asyncio.Task] = {}
+        self.delta_ws = None
+        # Set when market data is sharded over several connections (WS_SHARD_COUNT > 1)
+        self.shard_manager = None
+        # Set when ingest runs in worker processes over shared memory (INGEST_WORKERS > 1)
+        self.ingest_pool = None
+        # Set when the universe comes from the pair list (UNIVERSE_ENABLED)
+        self.universe: Optional[UniverseManager] = None
+        
+        # Raw frames from the WebSocket reader, drained in batches by _run_ingest_applier
+        self._ingest_queue: asyncio.Queue = asyncio.Queue()
+        self.ingest_messages = 0
+        self.ingest_batches = 0
+        self._delta_parsers = {
+            delta_messages.L1Orderbook: self._parse_delta_orderbook_update,
+            delta_messages.Trade: self._parse_delta_trade_update,
+            delta_messages.Ticker: self._parse_delta_ticker_update,
+            delta_messages.MarkPrice: self._parse_delta_mark_price_update,
+            delta_messages.Candlestick: self._parse_delta_candlestick_update,
+            delta_messages.L2Update: self._parse_delta_l2_update
+        }
         self.futures_polling_active = False
         
-        # Real-time data cache and lock
-        self.spot_prices = {}
-        self.futures_data = {}
-        self.funding_rates = {}
+        # Real-time market state (bid/ask/last/mark/funding per symbol) and lock
+        self.market_state = MarketStateStore(capacity=config.MARKET_STATE_CAPACITY)
         self._data_lock = asyncio.Lock()
         
+        # Set on every market state write; dirty symbols come from market_state.drain_dirty()
+        self.market_data_event = asyncio.Event()
+        self.market_state.on_update = self.market_data_event.set
+        
+        # Full-depth L2 books (l2_updates snapshot + deltas), for fill-cost estimates
+        self.order_books: Dict[int, OrderBook] = {}  # keyed by market state slot (symbol ID)
+        
+        # Optional binary capture of applied market data changes, conflated per symbol, for replay
+        self.tick_recorder: Optional[TickRecorder] = None
+        if config.TICK_LOG_ENABLED:
+            self.tick_recorder = TickRecorder(
+                config.TICK_LOG_DIR,
+                max_file_bytes=config.TICK_LOG_MAX_FILE_BYTES,
+                buffer_records=config.TICK_LOG_BUFFER_RECORDS,
+                min_interval=config.TICK_LOG_MIN_INTERVAL_SECONDS
+            )
+        self._delta_channels = {struct: channel for channel, struct in delta_messages.STRUCTS.items()}
+        
         # Available trading pairs
         self.trading_pairs = []
-        
-        # Store event loop for thread-safe WebSocket processing
-        self.event_loop = None
 
     async def __aenter__(self):
         await self.initialize()
@@ -72,11 +114,13 @@ class CoinSwitchClient:
     async def initialize(self):
         """Initializes the client, fetches trading pairs, and starts WebSockets."""
         try:
-            # Store the current event loop for thread-safe WebSocket processing
-            self.event_loop = asyncio.get_event_loop()
-            
             self.trading_pairs = config.TARGET_SYMBOLS
-            logger.info(f"Loaded {len(self.trading_pairs)} trading pairs from config.")
+            if config.UNIVERSE_ENABLED and not config.DEMO_MODE:
+                self.universe = UniverseManager(self)
+                self.trading_pairs = await self.universe.initial_universe()
+            for symbol in self.trading_pairs:
+                self.market_state.slot(symbol)
+            logger.info(f"Loaded {len(self.trading_pairs)} trading pairs from {'the pair list' if self.universe else 'config'}.")
 
             if config.DEMO_MODE:
                 # In demo mode, populate with simulated data
@@ -84,6 +128,9 @@ class CoinSwitchClient:
                 logger.info("🧪 Demo mode - Simulated data initialized")
             else:
                 await self._start_websockets()
+                # Worker processes own fixed symbol slices, so their universe is set at start
+                if self.universe and not self.ingest_pool:
+                    self.ws_tasks['universe'] = asyncio.create_task(self.universe.run())
                 logger.info("🌐 Live mode - WebSocket connections initialized")
         except Exception as e:
             logger.error(f"Failed to initialize client: {e}")
@@ -97,13 +144,19 @@ class CoinSwitchClient:
                     await sio.disconnect()
                     logger.info(f"WebSocket {ws_type} disconnected")
 
-            for task in self.ws_tasks.values():
+            for task in list(self.ws_tasks.values()) + list(self._resync_tasks.values()):
                 if not task.done():
                     task.cancel()
             
             if self.session:
                 await self.session.close()
             
+            if self.tick_recorder:
+                self.tick_recorder.close()
+            
+            if self.ingest_pool:
+                await self.ingest_pool.stop()
+            
             logger.info("CoinSwitchClient cleaned up successfully")
         except Exception as e:
             logger.error(f"Error during cleanup: {e}")
@@ -125,18 +178,7 @@ class CoinSwitchClient:
     def _generate_signature(self, timestamp: str, method: str, path: str, params: Dict = None, body: str = "") -> str:
         """Generates an Ed25519 signature for REST API requests."""
         try:
-            if method.upper() == 'GET' and params:
-                query = urllib.parse.urlencode(params)
-                full_path = path + ('?' if '?' not in path else '&') + query
-                message_str = method.upper() + urllib.parse.unquote_plus(full_path) + timestamp
-            else:
-                message_str = method.upper() + path + timestamp + body
-            if not self.api_secret:
-                raise ValueError("API secret is required for authentication")
-            secret_key_bytes = bytes.fromhex(self.api_secret)
-            private_key = Ed25519PrivateKey.from_private_bytes(secret_key_bytes)
-            signature_bytes = private_key.sign(message_str.encode('utf-8'))
-            return signature_bytes.hex()
+            return self.signer.sign(timestamp, method, path, params=params, body=body)
         except Exception as e:
             logger.error(f"Error generating signature: {e}")
             return "invalid_signature"
@@ -148,26 +190,31 @@ class CoinSwitchClient:
             async with self._data_lock:
                 # Current BTC/USD price around $100,000
                 btc_price = 100000.0
-                self.spot_prices['BTCUSD'] = {
+                demo_state = {
                     'bid': btc_price * 0.999,  # Slightly lower bid
                     'ask': btc_price * 1.001,  # Slightly higher ask
-                    'last': btc_price
+                    'last': btc_price,
+                    # Simulated futures data (slightly higher for positive funding)
+                    'mark': btc_price * 1.002,
+                    # Simulated positive funding rate (1% for demo)
+                    'funding': 0.01
                 }
                 
-                # Simulated futures data (slightly higher for positive funding)
-                self.futures_data['BTCUSD'] = btc_price * 1.002
+                # Written once: BTC/USD and other aliases resolve to the same slot
+                self.market_state.update_many({'BTCUSD': demo_state})
+                if self.tick_recorder:
+                    self.tick_recorder.record_many({'BTCUSD': demo_state}, 'demo')
                 
-                # Simulated positive funding rate (1% for demo)
-                self.funding_rates['BTCUSD'] = 0.01
+                if config.DEMO_MODE:
+                    # Simulated depth: 20 levels a side, 0.01% apart, deeper further out.
+                    # Never in live mode, where real orders would be sized against it.
+                    demo_bids = [(demo_state['bid'] * (1 - 0.0001 * i), 0.25 * (i + 1)) for i in range(20)]
+                    demo_asks = [(demo_state['ask'] * (1 + 0.0001 * i), 0.25 * (i + 1)) for i in range(20)]
+                    self._get_order_book('BTCUSD').apply_snapshot(demo_bids, demo_asks)
                 
                 logger.info(f"💰 Demo BTC/USD Spot Price: ${btc_price:,.2f}")
-                logger.info(f"📈 Demo BTC/USD Futures Price: ${self.futures_data['BTCUSD']:,.2f}")
-                logger.info(f"📊 Demo BTC/USD Funding Rate: {self.funding_rates['BTCUSD']:.2%}")
-                
-                # Also add for BTC/USD format (with slash)
-                self.spot_prices['BTC/USD'] = self.spot_prices['BTCUSD']
-                self.futures_data['BTC/USD'] = self.futures_data['BTCUSD']
-                self.funding_rates['BTC/USD'] = self.funding_rates['BTCUSD']
+                logger.info(f"📈 Demo BTC/USD Futures Price: ${demo_state['mark']:,.2f}")
+                logger.info(f"📊 Demo BTC/USD Funding Rate: {demo_state['funding']:.2%}")
                 
         except Exception as e:
             logger.error(f"Failed to populate demo data: {e}")
@@ -177,21 +224,17 @@ class CoinSwitchClient:
         try:
             async with self._data_lock:
                 # Get current spot price to base futures price on
-                spot_price = self.spot_prices.get('BTCUSD', {})
-                if isinstance(spot_price, dict):
-                    base_price = spot_price.get('last', spot_price.get('ask', 100000.0))
-                else:
-                    base_price = spot_price if spot_price else 100000.0
+                base_price = (self.market_state.get_field('BTCUSD', 'last')
+                              or self.market_state.get_field('BTCUSD', 'ask')
+                              or 100000.0)
                 
                 # Set futures price slightly higher than spot (typical contango)
                 futures_price = base_price * 1.002  # 0.2% premium
-                self.futures_data['BTCUSD'] = futures_price
-                self.futures_data['BTC/USD'] = futures_price
                 
                 # Set a positive funding rate for demo
                 funding_rate = 0.01  # 1% funding rate
-                self.funding_rates['BTCUSD'] = funding_rate
-                self.funding_rates['BTC/USD'] = funding_rate
+                
+                self.market_state.update('BTCUSD', mark=futures_price, funding=funding_rate)
                 
                 logger.info(f"💰 Demo Futures Data - BTC/USD: ${futures_price:,.2f}")
                 logger.info(f"📊 Demo Funding Rate - BTC/USD: {funding_rate:.2%}")
@@ -203,18 +246,18 @@ class CoinSwitchClient:
         """Makes an authenticated HTTP request to the CoinSwitch API."""
         try:
             url = f"{config.BASE_URL}{endpoint}"
-            timestamp = str(int(time.time() * 1000))
+            timestamp = self.signer.timestamp()
             body = json.dumps(data) if data else ""
             signature = self._generate_signature(timestamp, method.upper(), endpoint, body=body, params=params)
             
+            # Static headers are on the session; only the signature and epoch change per request
             headers = {
                 'X-AUTH-SIGNATURE': signature,
-                'X-AUTH-EPOCH': timestamp,
-                'X-AUTH-APIKEY': self.api_key,
-                'Content-Type': 'application/json'
+                'X-AUTH-EPOCH': timestamp
             }
             
-            async with self.session.request(method, url, params=params, json=data, headers=headers) as response:
+            # Send the exact body that was signed rather than re-serializing it
+            async with self.session.request(method, url, params=params, data=body or None, headers=headers) as response:
                 response.raise_for_status()
                 return await response.json()
         except Exception as e:
@@ -223,8 +266,20 @@ class CoinSwitchClient:
 
     async def _start_websockets(self):
         """Starts and manages asyncio-based WebSocket connections."""
-        if not config.DEMO_MODE:
+        if not config.DEMO_MODE and config.INGEST_WORKERS > 1:
+            # Decode in worker processes that write into shared memory; this process only reads it
+            from ingest_workers import IngestWorkerPool  # builds on this module
+            self.ingest_pool = IngestWorkerPool(self, config.INGEST_WORKERS)
+            self.ingest_pool.start()
+            logger.info(f"🌐 Live mode - Delta Exchange ingest in {config.INGEST_WORKERS} worker processes")
+        elif not config.DEMO_MODE and config.WS_SHARD_COUNT > 1:
+            # Spread the universe over several connections, each with its own reader and parser
+            self.shard_manager = ShardedConnectionManager(self, config.WS_SHARD_COUNT)
+            self.ws_tasks['delta_shards'] = asyncio.create_task(self.shard_manager.run())
+            logger.info(f"🌐 Live mode - Delta Exchange WebSocket sharded over {config.WS_SHARD_COUNT} connections")
+        elif not config.DEMO_MODE:
             # Start Delta Exchange WebSocket for real market data
+            self.ws_tasks['delta_ingest'] = asyncio.create_task(self._run_ingest_applier())
             self.ws_tasks['delta_websocket'] = asyncio.create_task(self._run_delta_websocket())
             logger.info("🌐 Live mode - Delta Exchange WebSocket initialized (real data only)")
         else:
@@ -241,283 +296,353 @@ class CoinSwitchClient:
                 connection_attempts += 1
                 logger.info(f"🔌 Attempting Delta Exchange WebSocket connection (Attempt {connection_attempts})")
                 
-                # Initialize with demo data immediately for testing
-                await self._populate_demo_data()
-                
-                # Create Delta Exchange WebSocket connection using official format
-                ws_url = "wss://socket.india.delta.exchange"
-                
-                # Run WebSocket in a separate thread to avoid blocking asyncio
-                def run_websocket():
-                    try:
-                        ws = websocket.WebSocketApp(
-                            ws_url,
-                            on_message=self._on_websocket_message,
-                            on_error=self._on_websocket_error,
-                            on_close=self._on_websocket_close
-                        )
-                        ws.on_open = self._on_websocket_open
-                        logger.info(f"🔌 Starting Delta Exchange WebSocket connection to {ws_url}")
-                        ws.run_forever()
-                    except Exception as e:
-                        logger.error(f"❌ WebSocket thread error: {e}")
-                
-                # Start WebSocket in a separate thread
-                ws_thread = threading.Thread(target=run_websocket)
-                ws_thread.daemon = True
-                ws_thread.start()
+                # Native asyncio reader: frames are queued on the event loop and
+                # applied in drained batches by _run_ingest_applier
+                async with websockets.connect(config.WS_URL, ping_interval=20, ping_timeout=20) as ws:
+                    self.delta_ws = ws
+                    await self._on_websocket_open(ws)
+                    
+                    # Reset retry delay on successful connection
+                    retry_delay = 5
+                    
+                    ingest = self._ingest_queue.put_nowait
+                    async for message in ws:
+                        ingest(message)
                 
-                # Wait for WebSocket to establish connection
-                await asyncio.sleep(5)
+                logger.warning("❌ Delta Exchange WebSocket closed by server")
                 
-                # Keep the connection alive
-                while True:
-                    await asyncio.sleep(1)
-                    
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.error(f"❌ Delta Exchange WebSocket connection error: {e}")
-                logger.info(f"⏳ Reconnecting in {retry_delay} seconds... (Attempt {connection_attempts})")
-                await asyncio.sleep(retry_delay)
-                retry_delay = min(retry_delay * 2, max_retry_delay)
+            finally:
+                self.delta_ws = None
+            
+            logger.info(f"⏳ Reconnecting in {retry_delay} seconds... (Attempt {connection_attempts})")
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, max_retry_delay)
 
-    def _on_websocket_open(self, ws):
-        """Called when WebSocket connection is opened"""
-        logger.info("🔌 Delta Exchange WebSocket connection opened")
+    async def _on_websocket_open(self, ws):
+        """Called when WebSocket connection is opened (and again after every reconnect)"""
+        logger.info(f"🔌 Delta Exchange WebSocket connection opened to {config.WS_URL}")
         
-        # Subscribe to market data channels using official format
-        for symbol in self.trading_pairs:
-            # SPOT DATA SUBSCRIPTIONS
-            logger.info(f"📡 Subscribing to SPOT data for {symbol}")
-            self._subscribe_channel(ws, "v2/ticker", [symbol])        # Spot ticker
-            self._subscribe_channel(ws, "l1_orderbook", [symbol])     # Spot orderbook
-            self._subscribe_channel(ws, "all_trades", [symbol])       # Spot trades
-            
-            # FUTURES DATA SUBSCRIPTIONS
-            logger.info(f"📡 Subscribing to FUTURES data for {symbol}")
-            self._subscribe_channel(ws, "mark_price", [symbol])       # Futures mark price
-            self._subscribe_channel(ws, "candlestick_1m", [f"MARK:{symbol}"])  # Futures candlesticks
-            
-            # FUNDING RATE DATA
-            logger.info(f"📡 Subscribing to FUNDING RATE data for {symbol}")
-            # Note: Funding rate is included in v2/ticker data
+        await self._subscribe_channels(ws, self._channels_for(self.trading_pairs))
 
-    def _subscribe_channel(self, ws, channel_name, symbols):
-        """Subscribe to a specific channel using official Delta Exchange format"""
-        payload = {
-            "type": "subscribe",
-            "payload": {
-                "channels": [
-                    {
-                        "name": channel_name,
-                        "symbols": symbols
-                    }
-                ]
-            }
+    @staticmethod
+    def _channels_for(symbols: List[str]) -> Dict[str, List[str]]:
+        """Market data channels to subscribe for a set of symbols"""
+        symbols = list(symbols)
+        # Every symbol goes into one channel entry per channel (official format),
+        # so the whole universe is subscribed in a handful of frames
+        return {
+            "v2/ticker": symbols,           # Spot ticker (includes funding rate)
+            "l1_orderbook": symbols,        # Spot orderbook
+            "l2_updates": symbols,          # Full depth (snapshot + deltas)
+            "all_trades": symbols,          # Spot trades
+            "mark_price": symbols,          # Futures mark price
+            "candlestick_1m": [f"MARK:{symbol}" for symbol in symbols]  # Futures candlesticks
         }
-        ws.send(json.dumps(payload))
-        logger.info(f"📡 Subscribed to {channel_name} for symbols: {symbols}")
 
-    def _on_websocket_message(self, ws, message):
-        """Called when WebSocket message is received"""
-        try:
-            data = json.loads(message)
-            logger.info(f"📊 Received Delta Exchange WebSocket message: {data}")
-            
-            # Process the message in a thread-safe way
-            asyncio.run_coroutine_threadsafe(
-                self._process_websocket_message(data), 
-                self.event_loop
-            )
-            
-        except json.JSONDecodeError:
-            logger.warning(f"⚠️ Received non-JSON message: {message}")
-        except Exception as e:
-            logger.error(f"❌ Error processing WebSocket message: {e}")
+    @staticmethod
+    def _subscription_frames(channels: Dict[str, List[str]], action: str = "subscribe",
+                             max_frame_bytes: int = None, max_symbols: int = None) -> List[str]:
+        """
+        Pack {channel: symbols} into as few subscribe frames as the limits allow.
+        
+        A frame holds several channel entries; a channel whose symbols do not
+        fit is continued in the next frame. Sizes are tracked from the JSON
+        encoding as entries are added, so every frame stays under max_frame_bytes.
+        """
+        max_frame_bytes = max_frame_bytes or config.WS_SUBSCRIBE_MAX_FRAME_BYTES
+        max_symbols = max_symbols or config.WS_SUBSCRIBE_MAX_SYMBOLS
+        base_size = len(json.dumps({"type": action, "payload": {"channels": []}}))
+        
+        frames = []
+        entries: List[Dict] = []
+        size = base_size
+        
+        def flush():
+            nonlocal entries, size
+            if entries:
+                frames.append(json.dumps({"type": action, "payload": {"channels": entries}}))
+            entries, size = [], base_size
+        
+        for name, symbols in channels.items():
+            entry_size = len(json.dumps({"name": name, "symbols": []})) + 2
+            entry = None
+            for symbol in symbols:
+                symbol_size = len(json.dumps(symbol)) + 2  # including the ", " separator
+                entry_full = entry is None or len(entry["symbols"]) >= max_symbols
+                if entry_full or size + symbol_size > max_frame_bytes:
+                    # Start a new entry for this channel, in a new frame if it would not fit
+                    if entries and size + entry_size + symbol_size > max_frame_bytes:
+                        flush()
+                    entry = {"name": name, "symbols": []}
+                    entries.append(entry)
+                    size += entry_size
+                entry["symbols"].append(symbol)
+                size += symbol_size
+        flush()
+        return frames
+
+    async def _subscribe_channels(self, ws, channels: Dict[str, List[str]], action: str = "subscribe"):
+        """Subscribe (or unsubscribe) several channels at once, in as few frames as possible"""
+        frames = self._subscription_frames(channels, action)
+        for frame in frames:
+            await ws.send(frame)
+        symbol_count = max((len(symbols) for symbols in channels.values()), default=0)
+        logger.info(f"📡 {action.capitalize()}d {', '.join(channels)} for {symbol_count} symbols in {len(frames)} frame(s)")
 
-    def _on_websocket_error(self, ws, error):
-        """Called when WebSocket error occurs"""
-        logger.error(f"❌ Delta Exchange WebSocket error: {error}")
+    async def _subscribe_channel(self, ws, channel_name, symbols):
+        """Subscribe to a specific channel using official Delta Exchange format"""
+        await self._subscribe_channels(ws, {channel_name: symbols})
+
+    async def _on_websocket_message(self, message):
+        """Decodes and applies a single WebSocket frame"""
+        await self._process_websocket_batch([message])
+
+    async def _run_ingest_applier(self):
+        """Drains the ingest queue and applies everything pending as one batch"""
+        queue = self._ingest_queue
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < config.INGEST_MAX_BATCH:
+                try:
+                    batch.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            await self._process_websocket_batch(batch)
+
+    async def _process_websocket_batch(self, messages: List):
+        """Decode frames, fold them into last-value-per-symbol-per-field and apply under one lock"""
+        pending: Dict[int, Dict[str, float]] = {}
+        exchange_ts: Dict[int, Dict[str, float]] = {}
+        for message in messages:
+            try:
+                msg = decode_frame(message)
+                hot_log.debug("delta_ws", "📊 Received Delta Exchange WebSocket message: {}", msg)
+                self._fold_websocket_message(msg, pending, exchange_ts)
+            except DecodeError:
+                logger.warning(f"⚠️ Received non-JSON message: {message}")
+            except Exception as e:
+                logger.error(f"❌ Error processing WebSocket message: {e}")
+        
+        self.ingest_messages += len(messages)
+        self.ingest_batches += 1
+        await self._apply_market_updates(pending, exchange_ts)
 
-    def _on_websocket_close(self, ws, close_status_code, close_msg):
-        """Called when WebSocket connection is closed"""
-        logger.warning(f"❌ Delta Exchange WebSocket closed with status: {close_status_code}, message: {close_msg}")
+    async def _apply_market_updates(self, pending: Dict[int, Dict[str, float]],
+                                    exchange_ts: Optional[Dict[int, Dict[str, float]]] = None):
+        """Write a folded batch to the market state with a single lock acquisition"""
+        if not pending:
+            return
+        async with self._data_lock:
+            self.market_state.update_by_slot(pending, exchange_ts=exchange_ts)
+        if self.tick_recorder:
+            # At most once per TICK_LOG_MIN_INTERVAL_SECONDS and only what changed, not one record per message
+            self.tick_recorder.conflate()
 
     async def _process_websocket_message(self, data: Dict):
         """Process WebSocket message from Delta Exchange"""
+        pending: Dict[int, Dict[str, float]] = {}
+        exchange_ts: Dict[int, Dict[str, float]] = {}
+        self._fold_websocket_message(delta_messages.from_dict(data), pending, exchange_ts)
+        await self._apply_market_updates(pending, exchange_ts)
+
+    def _fold_websocket_message(self, msg, pending: Dict[int, Dict[str, float]],
+                                exchange_ts: Optional[Dict[int, Dict[str, float]]] = None):
+        """
+        Fold one decoded Delta Exchange message into a pending {slot: {field: value}} batch,
+        and its exchange timestamp into exchange_ts ({slot: {field: epoch seconds}}) if given
+        """
         try:
-            # Check message type based on actual Delta Exchange format
-            if isinstance(data, dict):
-                msg_type = data.get('type', '')
+            # l1_orderbook, all_trades, v2/ticker, mark_price, candlestick_1m arrive as typed structs
+            parser = self._delta_parsers.get(type(msg))
+            if parser is not None:
+                update = parser(msg)
+                if update:
+                    symbol, fields = update
+                    if fields:
+                        # Any spelling seen before resolves to its slot in one dict lookup
+                        slot = self.market_state.registry.get(symbol)
+                        if slot is None:
+                            slot = self.market_state.slot(symbol)
+                        # Later messages in the batch win, field by field
+                        pending.setdefault(slot, {}).update(fields)
+                        if exchange_ts is not None and msg.timestamp:
+                            # Delta stamps messages in microseconds
+                            exchange_ts.setdefault(slot, {}).update(dict.fromkeys(fields, msg.timestamp / 1e6))
+                        if self.tick_recorder:
+                            # Held with its receive time and channel; written by conflate() after the batch
+                            self.tick_recorder.hold(self.market_state.registry.name(slot),
+                                                    self._delta_channels[type(msg)], fields)
+                return
+            
+            # Everything else is a generic dict
+            if isinstance(msg, dict):
+                msg_type = msg.get('type', '')
                 
                 # Handle subscription confirmations
                 if msg_type == 'subscriptions':
-                    logger.info(f"✅ Subscription confirmed: {data}")
+                    logger.info(f"✅ Subscription confirmed: {msg}")
                     return
                 
-                # Handle orderbook updates (l1_orderbook)
-                elif msg_type == 'l1_orderbook':
-                    await self._process_delta_orderbook_update(data)
-                
-                # Handle trade updates (all_trades)
-                elif msg_type == 'all_trades':
-                    await self._process_delta_trade_update(data)
-                
-                # Handle ticker updates (v2/ticker)
-                elif msg_type == 'v2/ticker':
-                    await self._process_delta_ticker_update(data)
-                
-                # Handle mark price updates
-                elif msg_type == 'mark_price':
-                    await self._process_delta_mark_price_update(data)
-                
-                # Handle candlestick updates
-                elif msg_type == 'candlestick_1m':
-                    await self._process_delta_candlestick_update(data)
-                
                 # Log unknown message types
-                else:
-                    logger.debug(f"🔍 Unknown message type '{msg_type}': {data}")
+                logger.debug(f"🔍 Unknown message type '{msg_type}': {msg}")
                     
         except Exception as e:
             logger.error(f"❌ Error processing WebSocket message: {e}")
 
-    async def _process_delta_orderbook_update(self, data: Dict):
-        """Process Delta Exchange orderbook update (l1_orderbook)"""
-        try:
-            symbol = data.get('symbol')
-            if not symbol:
-                return
-            
-            # Extract bid/ask from Delta Exchange format
-            best_bid = data.get('best_bid')
-            best_ask = data.get('best_ask')
-            
-            async with self._data_lock:
-                if symbol not in self.spot_prices:
-                    self.spot_prices[symbol] = {}
-                
-                if best_bid:
-                    self.spot_prices[symbol]['bid'] = float(best_bid)
-                    logger.info(f"💰 {symbol} Real Bid: ${float(best_bid):,.2f}")
-                
-                if best_ask:
-                    self.spot_prices[symbol]['ask'] = float(best_ask)
-                    logger.info(f"💰 {symbol} Real Ask: ${float(best_ask):,.2f}")
-                
-                # Update last price with mid price
-                if best_bid and best_ask:
-                    mid_price = (float(best_bid) + float(best_ask)) / 2
-                    self.spot_prices[symbol]['last'] = mid_price
-                    logger.info(f"📈 {symbol} Real Mid Price: ${mid_price:,.2f}")
-                    
-        except Exception as e:
-            logger.error(f"❌ Error processing Delta orderbook update: {e}")
+    def _parse_delta_orderbook_update(self, msg: delta_messages.L1Orderbook) -> Optional[Tuple[str, Dict[str, float]]]:
+        """Parse Delta Exchange orderbook update (l1_orderbook)"""
+        symbol = msg.symbol
+        if not symbol:
+            return None
+        
+        # Extract bid/ask from Delta Exchange format
+        best_bid = msg.best_bid
+        best_ask = msg.best_ask
+        
+        fields = {}
+        if best_bid:
+            fields['bid'] = best_bid
+            hot_log.debug("l1_orderbook", "💰 {} Real Bid: ${:,.2f}", symbol, best_bid)
+        
+        if best_ask:
+            fields['ask'] = best_ask
+            hot_log.debug("l1_orderbook", "💰 {} Real Ask: ${:,.2f}", symbol, best_ask)
+        
+        # Update last price with mid price
+        if best_bid and best_ask:
+            mid_price = (best_bid + best_ask) / 2
+            fields['last'] = mid_price
+            hot_log.debug("l1_orderbook", "📈 {} Real Mid Price: ${:,.2f}", symbol, mid_price)
+        
+        return symbol, fields
 
-    async def _process_delta_trade_update(self, data: Dict):
-        """Process Delta Exchange trade update (all_trades)"""
-        try:
-            symbol = data.get('symbol')
-            price = data.get('price')
-            size = data.get('size')
-            
-            if not symbol or not price:
-                return
-            
-            trade_price = float(price)
-            
-            async with self._data_lock:
-                if symbol not in self.spot_prices:
-                    self.spot_prices[symbol] = {}
-                self.spot_prices[symbol]['last'] = trade_price
-                logger.info(f"💱 {symbol} Real Trade: ${trade_price:,.2f} (Size: {size})")
-                
-        except Exception as e:
-            logger.error(f"❌ Error processing Delta trade update: {e}")
+    def _parse_delta_trade_update(self, msg: delta_messages.Trade) -> Optional[Tuple[str, Dict[str, float]]]:
+        """Parse Delta Exchange trade update (all_trades)"""
+        symbol = msg.symbol
+        trade_price = msg.price
+        
+        if not symbol or not trade_price:
+            return None
+        
+        hot_log.debug("all_trades", "💱 {} Real Trade: ${:,.2f} (Size: {})", symbol, trade_price, msg.size)
+        return symbol, {'last': trade_price}
 
-    async def _process_delta_ticker_update(self, data: Dict):
-        """Process Delta Exchange ticker update (v2/ticker) - includes spot price, mark price, and funding rate"""
-        try:
-            symbol = data.get('symbol')
-            close_price = data.get('close')
-            mark_price = data.get('mark_price')
-            funding_rate = data.get('funding_rate')
-            
-            if not symbol:
-                return
-            
-            async with self._data_lock:
-                # Update spot price
-                if close_price:
-                    spot_price = float(close_price)
-                    if symbol not in self.spot_prices:
-                        self.spot_prices[symbol] = {}
-                    self.spot_prices[symbol]['last'] = spot_price
-                    logger.info(f"📊 {symbol} Real Spot Price: ${spot_price:,.2f}")
-                
-                # Update futures mark price
-                if mark_price:
-                    futures_price = float(mark_price)
-                    self.futures_data[symbol] = futures_price
-                    logger.info(f"📈 {symbol} Real Mark Price (Futures): ${futures_price:,.2f}")
-                
-                # Update funding rate
-                if funding_rate:
-                    rate = float(funding_rate)
-                    self.funding_rates[symbol] = rate
-                    logger.info(f"💰 {symbol} Real Funding Rate: {rate:.4f} ({rate*100:.2f}%)")
-                
-        except Exception as e:
-            logger.error(f"❌ Error processing Delta ticker update: {e}")
+    def _parse_delta_ticker_update(self, msg: delta_messages.Ticker) -> Optional[Tuple[str, Dict[str, float]]]:
+        """Parse Delta Exchange ticker update (v2/ticker) - includes spot price, mark price, and funding rate"""
+        symbol = msg.symbol
+        if not symbol:
+            return None
+        
+        fields = {}
+        # Update spot price
+        if msg.close:
+            fields['last'] = msg.close
+            hot_log.debug("v2/ticker", "📊 {} Real Spot Price: ${:,.2f}", symbol, msg.close)
+        
+        # Update futures mark price
+        if msg.mark_price:
+            fields['mark'] = msg.mark_price
+            hot_log.debug("v2/ticker", "📈 {} Real Mark Price (Futures): ${:,.2f}", symbol, msg.mark_price)
+        
+        # Update funding rate
+        if msg.funding_rate:
+            rate = msg.funding_rate
+            fields['funding'] = rate
+            hot_log.debug("v2/ticker", "💰 {} Real Funding Rate: {:.4f} ({:.2f}%)", symbol, rate, rate*100)
+        
+        return symbol, fields
 
-    async def _process_delta_mark_price_update(self, data: Dict):
-        """Process Delta Exchange mark price update (dedicated futures price feed)"""
-        try:
-            symbol = data.get('symbol')
-            mark_price = data.get('mark_price')
-            
-            if not symbol or not mark_price:
-                return
-            
-            futures_price = float(mark_price)
-            
-            async with self._data_lock:
-                self.futures_data[symbol] = futures_price
-                logger.info(f"📈 {symbol} Real Mark Price Update: ${futures_price:,.2f}")
-                
-        except Exception as e:
-            logger.error(f"❌ Error processing Delta mark price update: {e}")
+    def _parse_delta_mark_price_update(self, msg: delta_messages.MarkPrice) -> Optional[Tuple[str, Dict[str, float]]]:
+        """Parse Delta Exchange mark price update (dedicated futures price feed)"""
+        symbol = msg.symbol
+        futures_price = msg.mark_price
+        
+        if not symbol or not futures_price:
+            return None
+        
+        hot_log.debug("mark_price", "📈 {} Real Mark Price Update: ${:,.2f}", symbol, futures_price)
+        return symbol, {'mark': futures_price}
 
-    async def _process_delta_candlestick_update(self, data: Dict):
-        """Process Delta Exchange candlestick update (1m MARK price candles for futures)"""
-        try:
-            symbol = data.get('symbol')
-            close_price = data.get('close')
-            
-            if not symbol or not close_price:
-                return
-            
-            # Remove MARK: prefix if present
-            if symbol.startswith('MARK:'):
-                clean_symbol = symbol[5:]
-                symbol_type = "FUTURES"
-            else:
-                clean_symbol = symbol
-                symbol_type = "SPOT"
-            
-            price = float(close_price)
-            
-            async with self._data_lock:
-                if symbol_type == "FUTURES":
-                    self.futures_data[clean_symbol] = price
-                    logger.info(f"🕯️ {clean_symbol} Real Futures Candlestick: ${price:,.2f}")
-                else:
-                    if clean_symbol not in self.spot_prices:
-                        self.spot_prices[clean_symbol] = {}
-                    self.spot_prices[clean_symbol]['last'] = price
-                    logger.info(f"🕯️ {clean_symbol} Real Spot Candlestick: ${price:,.2f}")
-                
-        except Exception as e:
-            logger.error(f"❌ Error processing Delta candlestick update: {e}")
+    def _get_order_book(self, symbol: str) -> OrderBook:
+        """Get the L2 book for a symbol, creating an empty one if needed"""
+        slot = self.market_state.slot(symbol)
+        book = self.order_books.get(slot)
+        if book is None:
+            book = self.order_books[slot] = OrderBook(self.market_state.registry.name(slot))
+        return book
+
+    def _parse_delta_l2_update(self, msg: delta_messages.L2Update) -> Optional[Tuple[str, Dict[str, float]]]:
+        """Apply a Delta Exchange l2_updates snapshot or delta to the symbol's book"""
+        symbol = msg.symbol
+        if not symbol:
+            return None
+        
+        book = self._get_order_book(symbol)
+        bids, asks = parse_levels(msg.bids), parse_levels(msg.asks)
+        if msg.action == 'snapshot':
+            book.apply_snapshot(bids, asks, msg.sequence_no)
+        elif not book.apply_delta(bids, asks, msg.sequence_no):
+            # Missed a delta: the book is unusable until a fresh snapshot arrives.
+            # Ask for one once per gap and drop the deltas that keep coming meanwhile.
+            if not book.resync_pending:
+                self._request_l2_resync(symbol)
+            return None
+        
+        hot_log.debug("l2_updates", "📚 {} L2 {}: {} bids / {} asks, best {} / {}",
+                      symbol, msg.action, len(book.bids), len(book.asks), book.best_bid(), book.best_ask())
+        # Always write top of book so the symbol's version moves with its depth
+        return symbol, book.top_of_book()
+
+    def _request_l2_resync(self, symbol: str):
+        """Resubscribe to l2_updates for a symbol, which makes the exchange send a new snapshot"""
+        ws = self.shard_manager.socket_for(symbol) if self.shard_manager else self.delta_ws
+        if ws is None:
+            return
+        slot = self.market_state.slot(symbol)
+        book = self._get_order_book(symbol)
+        book.resync_pending = True
+        
+        async def resubscribe():
+            try:
+                await ws.send(json.dumps({
+                    "type": "unsubscribe",
+                    "payload": {"channels": [{"name": "l2_updates", "symbols": [symbol]}]}
+                }))
+                await self._subscribe_channel(ws, "l2_updates", [symbol])
+            except Exception as e:
+                # Let the next delta ask again
+                book.resync_pending = False
+                logger.error(f"❌ Failed to resync {symbol} order book: {e}")
+        
+        task = self._resync_tasks[slot] = asyncio.create_task(resubscribe())
+        task.add_done_callback(lambda done: self._resync_done(slot, done))
+
+    def _resync_done(self, slot: int, task: asyncio.Task):
+        """Forget a finished resubscription and surface anything it raised"""
+        if self._resync_tasks.get(slot) is task:
+            del self._resync_tasks[slot]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"❌ Order book resync task failed: {task.exception()}")
+
+    def _parse_delta_candlestick_update(self, msg: delta_messages.Candlestick) -> Optional[Tuple[str, Dict[str, float]]]:
+        """Parse Delta Exchange candlestick update (1m MARK price candles for futures)"""
+        symbol = msg.symbol
+        price = msg.close
+        
+        if not symbol or not price:
+            return None
+        
+        # MARK:BTCUSD candles are the futures mark; the registry resolves the alias to BTCUSD
+        if symbol.startswith('MARK:'):
+            hot_log.debug("candlestick_1m", "🕯️ {} Real Futures Candlestick: ${:,.2f}", symbol, price)
+            return symbol, {'mark': price}
+        
+        hot_log.debug("candlestick_1m", "🕯️ {} Real Spot Candlestick: ${:,.2f}", symbol, price)
+        return symbol, {'last': price}
 
     async def _process_ticker_update(self, data: Dict):
         """Process ticker update from Delta Exchange"""
@@ -525,17 +650,16 @@ class CoinSwitchClient:
             symbol = data['symbol']
             last_price = float(data['close'])
             
+            fields = {'last': last_price}
+            # Also handle bid/ask if available
+            if 'bid' in data:
+                fields['bid'] = float(data['bid'])
+            if 'ask' in data:
+                fields['ask'] = float(data['ask'])
+            
             async with self._data_lock:
-                if symbol not in self.spot_prices:
-                    self.spot_prices[symbol] = {}
-                self.spot_prices[symbol]['last'] = last_price
-                logger.info(f"📈 {symbol} Ticker Price: ${last_price:,.2f}")
-                
-                # Also handle bid/ask if available
-                if 'bid' in data:
-                    self.spot_prices[symbol]['bid'] = float(data['bid'])
-                if 'ask' in data:
-                    self.spot_prices[symbol]['ask'] = float(data['ask'])
+                self.market_state.update(symbol, **fields)
+                hot_log.debug("ticker", "📈 {} Ticker Price: ${:,.2f}", symbol, last_price)
                     
         except Exception as e:
             logger.error(f"❌ Error processing ticker update: {e}")
@@ -545,21 +669,21 @@ class CoinSwitchClient:
         try:
             symbol = data['symbol']
             
+            fields = {}
+            # Process buy orders (bids)
+            if 'buy' in data and data['buy'] and len(data['buy']) > 0:
+                bid_price = float(data['buy'][0]['price'])
+                fields['bid'] = bid_price
+                hot_log.debug("orderbook", "💰 {} Bid: ${:,.2f}", symbol, bid_price)
+            
+            # Process sell orders (asks)
+            if 'sell' in data and data['sell'] and len(data['sell']) > 0:
+                ask_price = float(data['sell'][0]['price'])
+                fields['ask'] = ask_price
+                hot_log.debug("orderbook", "💰 {} Ask: ${:,.2f}", symbol, ask_price)
+            
             async with self._data_lock:
-                if symbol not in self.spot_prices:
-                    self.spot_prices[symbol] = {}
-                
-                # Process buy orders (bids)
-                if 'buy' in data and data['buy'] and len(data['buy']) > 0:
-                    bid_price = float(data['buy'][0]['price'])
-                    self.spot_prices[symbol]['bid'] = bid_price
-                    logger.info(f"💰 {symbol} Bid: ${bid_price:,.2f}")
-                
-                # Process sell orders (asks)
-                if 'sell' in data and data['sell'] and len(data['sell']) > 0:
-                    ask_price = float(data['sell'][0]['price'])
-                    self.spot_prices[symbol]['ask'] = ask_price
-                    logger.info(f"💰 {symbol} Ask: ${ask_price:,.2f}")
+                self.market_state.update(symbol, **fields)
                     
         except Exception as e:
             logger.error(f"❌ Error processing orderbook update: {e}")
@@ -571,10 +695,8 @@ class CoinSwitchClient:
             trade_price = float(data['price'])
             
             async with self._data_lock:
-                if symbol not in self.spot_prices:
-                    self.spot_prices[symbol] = {}
-                self.spot_prices[symbol]['last'] = trade_price
-                logger.info(f"💱 {symbol} Trade: ${trade_price:,.2f}")
+                self.market_state.update(symbol, last=trade_price)
+                hot_log.debug("trades", "💱 {} Trade: ${:,.2f}", symbol, trade_price)
                 
         except Exception as e:
             logger.error(f"❌ Error processing trade update: {e}")
@@ -587,8 +709,8 @@ class CoinSwitchClient:
             
             async with self._data_lock:
                 # Update futures data with mark price
-                self.futures_data[symbol] = mark_price
-                logger.info(f"📈 {symbol} Mark Price: ${mark_price:,.2f}")
+                self.market_state.update(symbol, mark=mark_price)
+                hot_log.debug("mark_price", "📈 {} Mark Price: ${:,.2f}", symbol, mark_price)
                 
         except Exception as e:
             logger.error(f"❌ Error processing mark price update: {e}")
@@ -601,10 +723,8 @@ class CoinSwitchClient:
             
             async with self._data_lock:
                 # Update with candlestick close price
-                if symbol not in self.spot_prices:
-                    self.spot_prices[symbol] = {}
-                self.spot_prices[symbol]['last'] = close_price
-                logger.info(f"🕯️ {symbol} Candlestick Close: ${close_price:,.2f}")
+                self.market_state.update(symbol, last=close_price)
+                hot_log.debug("candlestick", "🕯️ {} Candlestick Close: ${:,.2f}", symbol, close_price)
                 
         except Exception as e:
             logger.error(f"❌ Error processing candlestick update: {e}")
@@ -618,28 +738,26 @@ class CoinSwitchClient:
                 last_price = float(data['close'])
                 
                 async with self._data_lock:
-                    if symbol not in self.spot_prices:
-                        self.spot_prices[symbol] = {}
-                    self.spot_prices[symbol]['last'] = last_price
-                    logger.info(f"📈 {symbol} Raw WebSocket Price Update: ${last_price:,.2f}")
+                    self.market_state.update(symbol, last=last_price)
+                    hot_log.debug("raw", "📈 {} Raw WebSocket Price Update: ${:,.2f}", symbol, last_price)
             
             # Check if this is an orderbook update
             elif 'symbol' in data and ('buy' in data or 'sell' in data):
                 symbol = data['symbol']
                 
+                fields = {}
+                if 'buy' in data and data['buy'] and len(data['buy']) > 0:
+                    bid_price = float(data['buy'][0]['price'])
+                    fields['bid'] = bid_price
+                    hot_log.debug("raw", "💰 {} Bid: ${:,.2f}", symbol, bid_price)
+                
+                if 'sell' in data and data['sell'] and len(data['sell']) > 0:
+                    ask_price = float(data['sell'][0]['price'])
+                    fields['ask'] = ask_price
+                    hot_log.debug("raw", "💰 {} Ask: ${:,.2f}", symbol, ask_price)
+                
                 async with self._data_lock:
-                    if symbol not in self.spot_prices:
-                        self.spot_prices[symbol] = {}
-                    
-                    if 'buy' in data and data['buy'] and len(data['buy']) > 0:
-                        bid_price = float(data['buy'][0]['price'])
-                        self.spot_prices[symbol]['bid'] = bid_price
-                        logger.info(f"💰 {symbol} Bid: ${bid_price:,.2f}")
-                    
-                    if 'sell' in data and data['sell'] and len(data['sell']) > 0:
-                        ask_price = float(data['sell'][0]['price'])
-                        self.spot_prices[symbol]['ask'] = ask_price
-                        logger.info(f"💰 {symbol} Ask: ${ask_price:,.2f}")
+                    self.market_state.update(symbol, **fields)
             
             # Check if this is a mark price update (futures)
             elif 'symbol' in data and 'price' in data and 'mark_price' in str(data):
@@ -647,8 +765,8 @@ class CoinSwitchClient:
                 mark_price = float(data['price'])
                 
                 async with self._data_lock:
-                    self.futures_data[symbol] = mark_price
-                    logger.info(f"📈 {symbol} Mark Price: ${mark_price:,.2f}")
+                    self.market_state.update(symbol, mark=mark_price)
+                    hot_log.debug("raw", "📈 {} Mark Price: ${:,.2f}", symbol, mark_price)
                     
         except Exception as e:
             logger.error(f"❌ Error processing raw WebSocket message: {e}")
@@ -708,7 +826,7 @@ class CoinSwitchClient:
                 @sio.on('l1_orderbook')
                 async def on_l1_orderbook_update(data):
                     try:
-                        logger.info(f"📊 Received Delta Exchange l1_orderbook update: {json.dumps(data, indent=2)}")
+                        hot_log.debug("l1_orderbook", "📊 Received Delta Exchange l1_orderbook update: {}", data)
                         
                         # Delta Exchange l1_orderbook format
                         if 'symbol' in data and 'buy' in data and 'sell' in data:
@@ -720,63 +838,45 @@ class CoinSwitchClient:
                                 ask_quantity = float(data['sell'][0]['size'])
                                 
                                 async with self._data_lock:
-                                    if symbol not in self.spot_prices:
-                                        self.spot_prices[symbol] = {}
-                                    self.spot_prices[symbol]['ask'] = ask_price
-                                    logger.info(f"💰 {symbol} Ask Price Updated: ${ask_price:,.2f} (Qty: {ask_quantity})")
+                                    self.market_state.update(symbol, ask=ask_price)
+                                    hot_log.debug("l1_orderbook", "💰 {} Ask Price Updated: ${:,.2f} (Qty: {})", symbol, ask_price, ask_quantity)
                             
                             if data['buy'] and len(data['buy']) > 0:
                                 bid_price = float(data['buy'][0]['price'])
                                 bid_quantity = float(data['buy'][0]['size'])
                                 
                                 async with self._data_lock:
-                                    if symbol not in self.spot_prices:
-                                        self.spot_prices[symbol] = {}
-                                    self.spot_prices[symbol]['bid'] = bid_price
-                                    logger.info(f"💰 {symbol} Bid Price Updated: ${bid_price:,.2f} (Qty: {bid_quantity})")
+                                    self.market_state.update(symbol, bid=bid_price)
+                                    hot_log.debug("l1_orderbook", "💰 {} Bid Price Updated: ${:,.2f} (Qty: {})", symbol, bid_price, bid_quantity)
                         
                     except Exception as e:
                         logger.error(f"❌ Error processing Delta Exchange l1_orderbook update: {e}")
-                        logger.debug(f"Problematic orderbook data: {data}")
+                        hot_log.debug("l1_orderbook", "Problematic orderbook data: {}", data)
 
                 @sio.on('l2_orderbook')
                 async def on_l2_orderbook_update(data):
                     try:
-                        logger.info(f"📊 Received Delta Exchange l2_orderbook update: {json.dumps(data, indent=2)}")
+                        hot_log.debug("l2_orderbook", "📊 Received Delta Exchange l2_orderbook update: {}", data)
                         
-                        # Delta Exchange l2_orderbook format - similar to l1 but with more depth
+                        # Delta Exchange l2_orderbook format - full depth snapshot on every message
                         if 'symbol' in data and 'buy' in data and 'sell' in data:
                             symbol = data['symbol']
+                            book = self._get_order_book(symbol)
+                            book.apply_snapshot(parse_levels(data['buy']), parse_levels(data['sell']))
                             
-                            # Extract best bid/ask prices
-                            if data['sell'] and len(data['sell']) > 0:
-                                ask_price = float(data['sell'][0]['price'])
-                                ask_quantity = float(data['sell'][0]['size'])
-                                
-                                async with self._data_lock:
-                                    if symbol not in self.spot_prices:
-                                        self.spot_prices[symbol] = {}
-                                    self.spot_prices[symbol]['ask'] = ask_price
-                                    logger.info(f"💰 {symbol} Ask Price Updated: ${ask_price:,.2f} (Qty: {ask_quantity})")
-                            
-                            if data['buy'] and len(data['buy']) > 0:
-                                bid_price = float(data['buy'][0]['price'])
-                                bid_quantity = float(data['buy'][0]['size'])
-                                
-                                async with self._data_lock:
-                                    if symbol not in self.spot_prices:
-                                        self.spot_prices[symbol] = {}
-                                    self.spot_prices[symbol]['bid'] = bid_price
-                                    logger.info(f"💰 {symbol} Bid Price Updated: ${bid_price:,.2f} (Qty: {bid_quantity})")
+                            async with self._data_lock:
+                                self.market_state.update(symbol, **book.top_of_book())
+                            hot_log.debug("l2_orderbook", "💰 {} Book Updated: ${} / ${} ({} bids, {} asks)",
+                                          symbol, book.best_bid(), book.best_ask(), len(book.bids), len(book.asks))
                         
                     except Exception as e:
                         logger.error(f"❌ Error processing Delta Exchange l2_orderbook update: {e}")
-                        logger.debug(f"Problematic orderbook data: {data}")
+                        hot_log.debug("l2_orderbook", "Problematic orderbook data: {}", data)
 
                 @sio.on('v2/ticker')
                 async def on_v2_ticker_update(data):
                     try:
-                        logger.info(f"📊 Received Delta Exchange v2/ticker update: {json.dumps(data, indent=2)}")
+                        hot_log.debug("v2/ticker", "📊 Received Delta Exchange v2/ticker update: {}", data)
                         
                         # Delta Exchange v2/ticker format
                         if 'symbol' in data and 'close' in data:
@@ -787,24 +887,22 @@ class CoinSwitchClient:
                                 last_price = float(data['close'])
                                 
                                 async with self._data_lock:
-                                    if symbol not in self.spot_prices:
-                                        self.spot_prices[symbol] = {}
-                                    self.spot_prices[symbol]['last'] = last_price
-                                    logger.info(f"📈 {symbol} Last Price Updated: ${last_price:,.2f}")
+                                    self.market_state.update(symbol, last=last_price)
+                                    hot_log.debug("v2/ticker", "📈 {} Last Price Updated: ${:,.2f}", symbol, last_price)
                                     
                                     # Also extract volume and other data if available
                                     if 'volume' in data:
                                         volume = float(data['volume'])
-                                        logger.info(f"📊 {symbol} 24h Volume: {volume}")
+                                        hot_log.debug("v2/ticker", "📊 {} 24h Volume: {}", symbol, volume)
                         
                     except Exception as e:
                         logger.error(f"❌ Error processing Delta Exchange v2/ticker update: {e}")
-                        logger.debug(f"Problematic ticker data: {data}")
+                        hot_log.debug("v2/ticker", "Problematic ticker data: {}", data)
 
                 @sio.on('all_trades')
                 async def on_trade_update(data):
                     try:
-                        logger.info(f"💱 Received Delta Exchange all_trades update: {json.dumps(data, indent=2)}")
+                        hot_log.debug("all_trades", "💱 Received Delta Exchange all_trades update: {}", data)
                         
                         # Delta Exchange all_trades format
                         if 'symbol' in data and 'price' in data:
@@ -817,19 +915,17 @@ class CoinSwitchClient:
                                 trade_side = data.get('side', 'unknown')
                                 
                                 async with self._data_lock:
-                                    if symbol not in self.spot_prices:
-                                        self.spot_prices[symbol] = {}
-                                    self.spot_prices[symbol]['last'] = trade_price
-                                    logger.info(f"💱 {symbol} Trade: ${trade_price:,.2f} (Qty: {trade_quantity}, Side: {trade_side})")
+                                    self.market_state.update(symbol, last=trade_price)
+                                    hot_log.debug("all_trades", "💱 {} Trade: ${:,.2f} (Qty: {}, Side: {})", symbol, trade_price, trade_quantity, trade_side)
                         
                     except Exception as e:
                         logger.error(f"❌ Error processing Delta Exchange all_trades update: {e}")
-                        logger.debug(f"Problematic trade data: {data}")
+                        hot_log.debug("all_trades", "Problematic trade data: {}", data)
 
                 @sio.on('mark_price')
                 async def on_mark_price_update(data):
                     try:
-                        logger.info(f"📊 Received Delta Exchange mark_price update: {json.dumps(data, indent=2)}")
+                        hot_log.debug("mark_price", "📊 Received Delta Exchange mark_price update: {}", data)
                         
                         # Delta Exchange mark_price format - this is futures pricing
                         if 'symbol' in data and 'price' in data:
@@ -838,39 +934,39 @@ class CoinSwitchClient:
                             
                             async with self._data_lock:
                                 # Update futures data with mark price
-                                self.futures_data[symbol] = mark_price
-                                logger.info(f"📈 {symbol} Mark Price Updated: ${mark_price:,.2f}")
+                                self.market_state.update(symbol, mark=mark_price)
+                                hot_log.debug("mark_price", "📈 {} Mark Price Updated: ${:,.2f}", symbol, mark_price)
                         
                     except Exception as e:
                         logger.error(f"❌ Error processing Delta Exchange mark_price update: {e}")
-                        logger.debug(f"Problematic mark_price data: {data}")
+                        hot_log.debug("mark_price", "Problematic mark_price data: {}", data)
 
                 # Add more potential Delta Exchange event handlers
                 @sio.on('v2/ticker')
                 async def on_v2_ticker(data):
-                    logger.info(f"📊 Delta Exchange v2/ticker event: {json.dumps(data, indent=2)}")
+                    hot_log.debug("v2/ticker", "📊 Delta Exchange v2/ticker event: {}", data)
                 
                 @sio.on('all_ticker')
                 async def on_all_ticker(data):
-                    logger.info(f"📊 Delta Exchange all_ticker event: {json.dumps(data, indent=2)}")
+                    hot_log.debug("all_ticker", "📊 Delta Exchange all_ticker event: {}", data)
                 
                 @sio.on('trades')
                 async def on_trades(data):
-                    logger.info(f"💱 Delta Exchange trades event: {json.dumps(data, indent=2)}")
+                    hot_log.debug("trades", "💱 Delta Exchange trades event: {}", data)
                 
                 @sio.on('message')
                 async def on_message(data):
-                    logger.info(f"📨 Delta Exchange message: {json.dumps(data, indent=2)}")
+                    hot_log.debug("message", "📨 Delta Exchange message: {}", data)
                 
                 @sio.on('update')
                 async def on_update(data):
-                    logger.info(f"🔄 Delta Exchange update: {json.dumps(data, indent=2)}")
+                    hot_log.debug("update", "🔄 Delta Exchange update: {}", data)
 
                 # Catch all events to see what we're actually receiving from Delta Exchange
                 @sio.on('*')
                 async def catch_all_delta(event, data):
                     if event not in ['connect', 'disconnect', 'l1_orderbook', 'l2_orderbook', 'v2/ticker', 'all_trades', 'mark_price', 'message', 'update']:
-                        logger.info(f"🔍 Delta Exchange - Unexpected event: {event} with data: {data}")
+                        hot_log.debug("unexpected", "🔍 Delta Exchange - Unexpected event: {} with data: {}", event, data)
 
                 # Connect to Delta Exchange WebSocket using correct URLs
                 ws_urls = [
@@ -982,7 +1078,7 @@ class CoinSwitchClient:
                 @sio.on('FETCH_FUTURES_TICKER_CS_PRO', namespace='/coinswitchx')
                 async def on_futures_ticker(data):
                     try:
-                        logger.debug(f"📊 Received futures ticker data: {json.dumps(data, indent=2)}")
+                        hot_log.debug("futures_ticker", "📊 Received futures ticker data: {}", data)
                         
                         # Handle subscription confirmation
                         if 'success' in data and data.get('success') == 'true':
@@ -995,17 +1091,17 @@ class CoinSwitchClient:
                             price = float(data.get('lastPrice', data.get('close', 0)))
                             if price > 0:
                                 async with self._data_lock:
-                                    self.futures_data[symbol] = price
-                                    logger.info(f"📈 {symbol} Futures Price Updated: ₹{price:,.2f}")
+                                    self.market_state.update(symbol, mark=price)
+                                    hot_log.debug("futures_ticker", "📈 {} Futures Price Updated: ₹{:,.2f}", symbol, price)
                         
                     except Exception as e:
                         logger.error(f"❌ Error processing futures ticker: {e}")
-                        logger.debug(f"Problematic futures ticker data: {data}")
+                        hot_log.debug("futures_ticker", "Problematic futures ticker data: {}", data)
 
                 @sio.on('FETCH_FUNDING_RATE_CS_PRO', namespace='/coinswitchx')
                 async def on_funding_rate(data):
                     try:
-                        logger.debug(f"📊 Received funding rate data: {json.dumps(data, indent=2)}")
+                        hot_log.debug("funding_rate", "📊 Received funding rate data: {}", data)
                         
                         # Handle subscription confirmation
                         if 'success' in data and data.get('success') == 'true':
@@ -1017,17 +1113,17 @@ class CoinSwitchClient:
                             symbol = data.get('pair', '').replace('/', '')  # BTC/INR -> BTCINR
                             rate = float(data.get('fundingRate', data.get('rate', 0)))
                             async with self._data_lock:
-                                self.funding_rates[symbol] = rate
-                                logger.info(f"📊 {symbol} Funding Rate Updated: {rate:.6f} ({rate*100:.4f}%)")
+                                self.market_state.update(symbol, funding=rate)
+                                hot_log.debug("funding_rate", "📊 {} Funding Rate Updated: {:.6f} ({:.4f}%)", symbol, rate, rate*100)
                         
                     except Exception as e:
                         logger.error(f"❌ Error processing funding rate: {e}")
-                        logger.debug(f"Problematic funding rate data: {data}")
+                        hot_log.debug("funding_rate", "Problematic funding rate data: {}", data)
 
                 @sio.on('FETCH_FUTURES_MARKET_DATA_CS_PRO', namespace='/coinswitchx')
                 async def on_futures_market_data(data):
                     try:
-                        logger.debug(f"📊 Received futures market data: {json.dumps(data, indent=2)}")
+                        hot_log.debug("futures_market_data", "📊 Received futures market data: {}", data)
                         
                         # Handle subscription confirmation
                         if 'success' in data and data.get('success') == 'true':
@@ -1040,18 +1136,18 @@ class CoinSwitchClient:
                             price = float(data.get('price', data.get('lastPrice', data.get('close', 0))))
                             if price > 0:
                                 async with self._data_lock:
-                                    self.futures_data[symbol] = price
-                                    logger.info(f"📈 {symbol} Futures Market Data Updated: ₹{price:,.2f}")
+                                    self.market_state.update(symbol, mark=price)
+                                    hot_log.debug("futures_market_data", "📈 {} Futures Market Data Updated: ₹{:,.2f}", symbol, price)
                         
                     except Exception as e:
                         logger.error(f"❌ Error processing futures market data: {e}")
-                        logger.debug(f"Problematic futures market data: {data}")
+                        hot_log.debug("futures_market_data", "Problematic futures market data: {}", data)
 
                 # Catch all futures events to see what we're actually receiving
                 @sio.on('*', namespace='/coinswitchx')
                 async def catch_all_futures(event, data):
                     if event not in ['FETCH_FUTURES_TICKER_CS_PRO', 'FETCH_FUNDING_RATE_CS_PRO', 'FETCH_FUTURES_MARKET_DATA_CS_PRO']:
-                        logger.info(f"🔍 FUTURES - Unexpected event: {event} with data: {data}")
+                        hot_log.debug("unexpected_futures", "🔍 FUTURES - Unexpected event: {} with data: {}", event, data)
 
                 # Connect to CoinSwitch Futures WebSocket with authentication
                 ws_url = "wss://ws.coinswitch.co/"
@@ -1146,7 +1242,7 @@ class CoinSwitchClient:
                 @sio.on('FETCH_ORDER_UPDATES_CS_PRO', namespace='/coinswitchx')
                 async def on_order_update(data):
                     try:
-                        logger.info(f"📦 Received order update: {json.dumps(data, indent=2)}")
+                        logger.info("📦 Received order update: %s", data)
                         
                         # Handle subscription confirmation
                         if 'success' in data and data.get('success') == 'true':
@@ -1173,7 +1269,7 @@ class CoinSwitchClient:
                 @sio.on('FETCH_BALANCE_UPDATES_CS_PRO', namespace='/coinswitchx')
                 async def on_balance_update(data):
                     try:
-                        logger.info(f"💰 Received balance update: {json.dumps(data, indent=2)}")
+                        logger.info("💰 Received balance update: %s", data)
                         
                         # Handle subscription confirmation
                         if 'success' in data and data.get('success') == 'true':
@@ -1238,65 +1334,69 @@ class CoinSwitchClient:
 
     # Futures simulator removed - using real Delta Exchange data only
     
+    @staticmethod
+    def _spot_from_state(state: Optional[Dict]) -> Optional[float]:
+        """Derives the spot price from a market state row."""
+        if not state:
+            return None
+        # Return last price if available (from candlestick), otherwise mid price
+        last = state.get('last')
+        if last is not None and last > 0:
+            return last
+        # Return mid price (average of bid and ask); NaN compares False
+        bid = state.get('bid', 0)
+        ask = state.get('ask', 0)
+        if bid > 0 and ask > 0:
+            return (bid + ask) / 2
+        elif ask > 0:
+            return ask
+        elif bid > 0:
+            return bid
+        return None
+
     async def _get_spot_price_sync(self, symbol: str) -> Optional[float]:
         """Synchronous version of get_spot_price for internal use."""
-        price_data = self.spot_prices.get(symbol)
-        if isinstance(price_data, dict):
-            # Return last price if available (from candlestick), otherwise mid price
-            if 'last' in price_data and price_data['last'] > 0:
-                return price_data['last']
-            # Return mid price (average of bid and ask)
-            bid = price_data.get('bid', 0)
-            ask = price_data.get('ask', 0)
-            if bid > 0 and ask > 0:
-                return (bid + ask) / 2
-            elif ask > 0:
-                return ask
-            elif bid > 0:
-                return bid
-        elif isinstance(price_data, (int, float)):
-            return price_data
-        return None
+        return self._spot_from_state(self.market_state.get(symbol))
 
     # --- Data Access Methods ---
+    def has_market_data(self) -> bool:
+        """Checks whether both spot and futures prices have started arriving."""
+        return (
+            (self.market_state.has_data('last') or self.market_state.has_data('bid'))
+            and self.market_state.has_data('mark')
+        )
+
+    # Reads go through the market state seqlock and never wait on _data_lock,
+    # which only serialises writers.
+    async def get_market_snapshot(self, symbols: Optional[List[str]] = None) -> MarketSnapshot:
+        """Gets a consistent snapshot of every (or the given) symbol in one call."""
+        return self.market_state.snapshot(symbols)
+
+    def get_order_book(self, symbol: str) -> Optional[OrderBook]:
+        """Gets the L2 book for a symbol, if one has been received and is in sync."""
+        if self.ingest_pool is not None:
+            return self.market_state.book(symbol)
+        book = self.order_books.get(self.market_state.lookup(symbol))
+        return book if book is not None and book.is_synced else None
+
     async def get_spot_price(self, symbol: str) -> Optional[float]:
         """Gets the latest spot price from the WebSocket cache."""
-        async with self._data_lock:
-            price_data = self.spot_prices.get(symbol)
-            if isinstance(price_data, dict):
-                # Return last price if available (from candlestick), otherwise mid price
-                if 'last' in price_data and price_data['last'] > 0:
-                    return price_data['last']
-                # Return mid price (average of bid and ask)
-                bid = price_data.get('bid', 0)
-                ask = price_data.get('ask', 0)
-                if bid > 0 and ask > 0:
-                    return (bid + ask) / 2
-                elif ask > 0:
-                    return ask
-                elif bid > 0:
-                    return bid
-            elif isinstance(price_data, (int, float)):
-                return price_data
-            return None
+        return self._spot_from_state(self.market_state.get(symbol))
     
     async def get_futures_data(self, symbol: str) -> Optional[Dict]:
         """Gets the latest futures data from the WebSocket cache."""
-        async with self._data_lock:
-            price = self.futures_data.get(symbol)
-            if price is not None:
-                return {'price': price}
-            return None
+        price = self.market_state.get_field(symbol, 'mark')
+        if price is not None:
+            return {'price': price}
+        return None
     
     async def get_futures_price(self, symbol: str) -> Optional[float]:
         """Gets the latest futures price from the WebSocket cache."""
-        async with self._data_lock:
-            return self.futures_data.get(symbol)
+        return self.market_state.get_field(symbol, 'mark')
     
     async def get_funding_rate(self, symbol: str) -> Optional[float]:
         """Gets the latest funding rate from the WebSocket cache."""
-        async with self._data_lock:
-            return self.funding_rates.get(symbol)
+        return self.market_state.get_field(symbol, 'funding')
     
     async def place_order(self, symbol: str, side: str, quantity: float, price: float = None, exchange_type: str = 'spot') -> Optional[Dict]:
         """Places a trading order via the REST API."""
@@ -1314,7 +1414,8 @@ class CoinSwitchClient:
                     'exchange_type': exchange_type,
                     'timestamp': time.time()
                 }
-                logger.info(f"🧪 Demo Order Placed: {order_id} - {side} {quantity} {symbol} @ ₹{price:,.2f}")
+                price_text = f"₹{price:,.2f}" if price else "market"
+                logger.info(f"🧪 Demo Order Placed: {order_id} - {side} {quantity} {symbol} @ {price_text}")
                 return simulated_order
             
             # Live mode - actual order placement
@@ -1346,6 +1447,12 @@ class CoinSwitchClient:
         endpoint = f'/trade/api/v2/futures/order/{order_id}' if is_futures else f'/trade/api/v2/order/{order_id}'
         return await self._make_request('DELETE', endpoint)
     
+    async def get_order(self, order_id: str, exchange_type: str = 'spot') -> Optional[Dict]:
+        """Gets an order's current status and filled quantity via the REST API."""
+        is_futures = exchange_type == 'futures'
+        endpoint = f'/trade/api/v2/futures/order/{order_id}' if is_futures else f'/trade/api/v2/order/{order_id}'
+        return await self._make_request('GET', endpoint)
+    
     async def get_account_balance(self) -> Optional[Dict]:
         """Gets the user's account balance via the REST API."""
         try:
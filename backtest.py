@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Deterministic backtest / replay for the arbitrage bot
+
+Feeds recorded (tick_log) or synthetic tick streams into a CoinSwitchClient
+under a simulated clock and runs the real ArbitrageBot / ArbitrageLogicEngine
+decision code on every step, with orders filled by a simple simulator. No
+sockets, no sleeping: a day of data replays as fast as the scans run.
+"""
+
+import time
+import asyncio
+import logging
+import argparse
+from datetime import datetime
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import config
+from api_client import CoinSwitchClient
+from logic_engine import ArbitrageLogicEngine
+from main import ArbitrageBot
+from order_book import OrderBook
+from tick_log import TICK_DTYPE, CHANNEL_IDS, PRICE_FIELDS, TickLogReader, list_tick_files
+
+logger = logging.getLogger(__name__)
+
+# (records, symbols): a TICK_DTYPE array, possibly memory-mapped, and its symbol table
+TickSource = Tuple[np.ndarray, List[str]]
+
+# Loggers silenced during a quiet run; per-step INFO lines would dominate the runtime
+_NOISY_LOGGERS = ('main', 'api_client', 'logic_engine', 'market_state', 'order_book', 'performance_utils')
+
+class SimulatedClock:
+    """Replay clock, advanced by the tick stream"""
+
+    def __init__(self, start: float):
+        self.now = start
+
+    def time(self) -> float:
+        return self.now
+
+    def advance_to(self, timestamp: float):
+        if timestamp > self.now:
+            self.now = timestamp
+
+class BacktestClient(CoinSwitchClient):
+    """
+    CoinSwitchClient whose market state is written by the replay, not WebSockets.
+
+    Orders fill immediately against a synthetic book around the current
+    top of book (level_quote of notional per level, tick_fraction apart),
+    so VWAP slippage and the liquidity checks behave as they would live.
+    A limit order whose fill price would cross its limit is rejected.
+    """
+
+    def __init__(self, clock: SimulatedClock, symbols: Sequence[str], fee_rate: float = 0.00017,
+                 book_levels: int = 20, level_quote: float = 25000.0, tick_fraction: float = 0.0001):
+        super().__init__()
+        self.tick_recorder = None  # never re-record a replay
+        self.clock = clock
+        self.trading_pairs = list(symbols)
+        for symbol in self.trading_pairs:
+            self.market_state.slot(symbol)
+
+        self.fee_rate = fee_rate
+        self.book_levels = book_levels
+        self.level_quote = level_quote
+        self.tick_fraction = tick_fraction
+        self._books: Dict[str, Tuple[int, OrderBook]] = {}
+
+        self.fills: List[Dict] = []
+        self.rejected_orders = 0
+
+    def apply_records(self, records: np.ndarray, slot_map: np.ndarray):
+        """Write a slice of tick records to the market state, last value per symbol and field winning"""
+        if not len(records):
+            return
+        timestamp = float(records['ts'][-1])
+        symbol_slots = slot_map[records['symbol_id']]
+        for field in PRICE_FIELDS:
+            column = records[field]
+            present = ~np.isnan(column)
+            if not present.any():
+                continue
+            # np.unique keeps the first occurrence, so search the slice backwards
+            slots = symbol_slots[present][::-1]
+            values = column[present][::-1]
+            unique_slots, first = np.unique(slots, return_index=True)
+            self.market_state.update_slots(field, unique_slots, values[first], timestamp)
+
+    def get_order_book(self, symbol: str) -> Optional[OrderBook]:
+        """Synthetic book around the current bid/ask, rebuilt only when the symbol changes"""
+        version = self.market_state.version(symbol)
+        cached = self._books.get(symbol)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        state = self.market_state.get(symbol)
+        spot = self._spot_from_state(state)
+        if not spot:
+            return None
+        bid = state['bid'] if state['bid'] > 0 else spot
+        ask = state['ask'] if state['ask'] > 0 else spot
+
+        book = OrderBook(symbol)
+        book.apply_snapshot(
+            [(bid * (1 - self.tick_fraction * i), self.level_quote / bid) for i in range(self.book_levels)],
+            [(ask * (1 + self.tick_fraction * i), self.level_quote / ask) for i in range(self.book_levels)]
+        )
+        self._books[symbol] = (version, book)
+        return book
+
+    async def place_order(self, symbol: str, side: str, quantity: float, price: float = None,
+                          exchange_type: str = 'spot') -> Optional[Dict]:
+        """Fill immediately at the simulated book price"""
+        state = self.market_state.get(symbol)
+        if state is None:
+            self.rejected_orders += 1
+            return None
+
+        spot = self._spot_from_state(state)
+        if exchange_type == 'futures':
+            reference = state['mark'] if state['mark'] > 0 else spot
+        elif side == 'buy':
+            reference = state['ask'] if state['ask'] > 0 else spot
+        else:
+            reference = state['bid'] if state['bid'] > 0 else spot
+        book = self.get_order_book(symbol)
+        if not reference or book is None:
+            self.rejected_orders += 1
+            return None
+
+        slippage = book.estimate_fill(side, quantity * reference)['slippage'] or 0.0
+        fill_price = reference * (1 + slippage) if side == 'buy' else reference * (1 - slippage)
+        if price and ((side == 'buy' and fill_price > price) or (side == 'sell' and fill_price < price)):
+            self.rejected_orders += 1
+            return None
+
+        order = {
+            'orderId': f"BT_{exchange_type}_{len(self.fills)}",
+            'symbol': symbol,
+            'side': side,
+            'quantity': quantity,
+            'price': fill_price,
+            'fee': quantity * fill_price * self.fee_rate,
+            'status': 'FILLED',
+            'exchange_type': exchange_type,
+            'timestamp': self.clock.time()
+        }
+        self.fills.append(order)
+        return order
+
+    async def cancel_order(self, order_id: str, exchange_type: str = 'spot') -> Optional[Dict]:
+        """Orders fill on placement, so there is never anything left to cancel"""
+        return None
+
+    async def get_order(self, order_id: str, exchange_type: str = 'spot') -> Optional[Dict]:
+        """A fill placed by this client, by ID"""
+        return next((order for order in self.fills if order['orderId'] == order_id), None)
+
+    async def get_account_balance(self) -> Optional[Dict]:
+        return None
+
+@dataclass
+class BacktestResult:
+    """Summary of one replay"""
+    ticks: int
+    steps: int
+    simulated_seconds: float
+    wall_seconds: float
+    opportunity_checks: int
+    positions_opened: int
+    positions_closed: int
+    fills: int
+    rejected_orders: int
+    fees: float
+    funding_pnl: float
+    trading_pnl: float
+    total_pnl: float
+
+    @property
+    def speedup(self) -> float:
+        return self.simulated_seconds / self.wall_seconds if self.wall_seconds else 0.0
+
+class Backtester:
+    """
+    Drives ArbitrageBot from tick sources under a SimulatedClock.
+
+    Ticks are applied in step_seconds slices (the replay's coalescing window),
+    after which the bot re-scores the symbols that changed, exactly as the
+    live evaluator does. Full scans and position checks run on their live
+    cadences in simulated time, and funding is paid to open positions at
+    every funding time the clock crosses.
+    """
+
+    def __init__(self, step_seconds: float = 1.0, position_check_interval: float = 60.0,
+                 full_scan_interval: float = None, quiet: bool = True, **client_options):
+        self.step_seconds = step_seconds
+        self.position_check_interval = position_check_interval
+        self.full_scan_interval = config.OPPORTUNITY_FULL_SCAN_INTERVAL if full_scan_interval is None else full_scan_interval
+        self.quiet = quiet
+        self.client_options = client_options
+
+    async def run(self, sources: Sequence[TickSource]) -> BacktestResult:
+        """Replay the sources in order and return the result"""
+        sources = [(records, symbols) for records, symbols in sources if len(records)]
+        if not sources:
+            raise ValueError("No ticks to replay")
+
+        saved_levels = self._silence() if self.quiet else {}
+        wall_start = time.perf_counter()
+        self._start_ts = float(sources[0][0]['ts'][0])
+        clock = SimulatedClock(self._start_ts)
+        symbols = list(dict.fromkeys(symbol for _, source_symbols in sources for symbol in source_symbols))
+
+        bot = ArbitrageBot()
+        client = BacktestClient(clock, symbols, **self.client_options)
+        engine = ArbitrageLogicEngine(client)
+        engine._has_started = True
+        bot.api_client, bot.logic_engine = client, engine
+        bot.clock = engine.clock = clock.time
+        bot.running = True
+
+        self._funding_pnl = 0.0
+        self._next_funding = engine._next_funding_time()[0].timestamp()
+        self._last_full_scan = self._last_position_check = clock.time()
+        ticks = steps = 0
+
+        try:
+            for records, source_symbols in sources:
+                slot_map = np.array([client.market_state.slot(s) for s in source_symbols], dtype=np.intp)
+                step_index = np.floor((records['ts'] - records['ts'][0]) / self.step_seconds)
+                bounds = np.concatenate(([0], np.flatnonzero(np.diff(step_index)) + 1, [len(records)]))
+
+                for start, end in zip(bounds[:-1], bounds[1:]):
+                    chunk = records[start:end]
+                    clock.advance_to(float(chunk['ts'][-1]))
+                    client.apply_records(chunk, slot_map)
+                    await self._step(bot, clock)
+                    ticks += len(chunk)
+                    steps += 1
+
+            return self._result(bot, client, clock, ticks, steps, time.perf_counter() - wall_start)
+        finally:
+            await client.cleanup()
+            for name, level in saved_levels.items():
+                logging.getLogger(name).setLevel(level)
+
+    async def _step(self, bot: ArbitrageBot, clock: SimulatedClock):
+        """One evaluator pass plus whatever periodic work is due at the current time"""
+        now = clock.time()
+        if now >= self._next_funding:
+            self._pay_funding(bot)
+            self._next_funding = bot.logic_engine._next_funding_time()[0].timestamp()
+
+        dirty_symbols = bot.api_client.market_state.drain_dirty()
+        if dirty_symbols:
+            await bot._check_opportunities(dirty_symbols)
+
+        if now - self._last_full_scan >= self.full_scan_interval:
+            await bot._check_opportunities()
+            self._last_full_scan = now
+
+        if now - self._last_position_check >= self.position_check_interval:
+            await bot._monitor_positions()
+            self._last_position_check = now
+
+    def _pay_funding(self, bot: ArbitrageBot):
+        """Short futures legs receive funding rate x notional at each funding time"""
+        market_state = bot.api_client.market_state
+        for position in bot.active_positions.values():
+            rate = market_state.get_field(position.symbol, 'funding')
+            mark = market_state.get_field(position.symbol, 'mark')
+            if rate is not None and mark:
+                self._funding_pnl += rate * position.position_size * mark
+
+    def _result(self, bot: ArbitrageBot, client: BacktestClient, clock: SimulatedClock,
+                ticks: int, steps: int, wall_seconds: float) -> BacktestResult:
+        """Cash flows of every fill, with anything still open marked to market"""
+        cash = 0.0
+        fees = 0.0
+        exposure: Dict[Tuple[str, str], float] = {}
+        for fill in client.fills:
+            signed_quantity = fill['quantity'] if fill['side'] == 'buy' else -fill['quantity']
+            cash -= signed_quantity * fill['price']
+            fees += fill['fee']
+            key = (fill['symbol'], fill['exchange_type'])
+            exposure[key] = exposure.get(key, 0.0) + signed_quantity
+
+        for (symbol, exchange_type), quantity in exposure.items():
+            if abs(quantity) < 1e-12:
+                continue
+            if exchange_type == 'futures':
+                price = client.market_state.get_field(symbol, 'mark')
+            else:
+                price = client._spot_from_state(client.market_state.get(symbol))
+            cash += quantity * (price or 0.0)
+
+        checks = bot.profiler.get_stats('opportunity_check').get('count', 0)
+        return BacktestResult(
+            ticks=ticks,
+            steps=steps,
+            simulated_seconds=clock.time() - self._start_ts,
+            wall_seconds=wall_seconds,
+            opportunity_checks=checks,
+            positions_opened=len(bot.active_positions) + len(bot.position_history),
+            positions_closed=len(bot.position_history),
+            fills=len(client.fills),
+            rejected_orders=client.rejected_orders,
+            fees=fees,
+            funding_pnl=self._funding_pnl,
+            trading_pnl=cash,
+            total_pnl=cash - fees + self._funding_pnl
+        )
+
+    @staticmethod
+    def _silence() -> Dict[str, int]:
+        saved = {}
+        for name in _NOISY_LOGGERS:
+            log = logging.getLogger(name)
+            saved[name] = log.level
+            log.setLevel(logging.WARNING)
+        return saved
+
+def synthetic_ticks(symbols: Sequence[str], start: float, duration: float, interval: float = 1.0,
+                    seed: int = 0, funding_mean: float = 0.012, volatility: float = 0.0002) -> TickSource:
+    """
+    Reproducible random-walk ticks: one record per symbol per interval.
+
+    Prices follow a geometric random walk from a random starting level, the
+    futures mark carries a small mean-reverting basis, and funding wanders
+    around funding_mean. Same arguments, same stream.
+    """
+    rng = np.random.default_rng(seed)
+    steps = max(int(duration / interval), 1)
+    count = len(symbols)
+
+    start_prices = np.exp(rng.uniform(np.log(5.0), np.log(100000.0), count))
+    returns = rng.normal(0.0, volatility, (steps, count))
+    last = start_prices * np.exp(np.cumsum(returns, axis=0))
+    spread = rng.uniform(0.0001, 0.001, count) / 2
+    basis = 0.001 + np.cumsum(rng.normal(0.0, 0.00002, (steps, count)), axis=0) * 0.5
+    funding = funding_mean + np.cumsum(rng.normal(0.0, 0.00005, (steps, count)), axis=0)
+
+    records = np.zeros(steps * count, dtype=TICK_DTYPE)
+    records['ts'] = np.repeat(start + np.arange(steps) * interval, count)
+    records['symbol_id'] = np.tile(np.arange(count, dtype=np.uint32), steps)
+    records['channel'] = CHANNEL_IDS['synthetic']
+    records['last'] = last.ravel()
+    records['bid'] = (last * (1 - spread)).ravel()
+    records['ask'] = (last * (1 + spread)).ravel()
+    records['mark'] = (last * (1 + basis)).ravel()
+    records['funding'] = funding.ravel()
+    return records, list(symbols)
+
+def load_tick_sources(directory: str, start: Optional[float] = None, end: Optional[float] = None) -> List[TickSource]:
+    """Memory-map every tick log in a directory (optionally only those overlapping [start, end])"""
+    sources = []
+    for path in list_tick_files(directory, start, end):
+        reader = TickLogReader(path)
+        records = reader.records
+        if start is not None or end is not None:
+            lo = np.searchsorted(records['ts'], start) if start is not None else 0
+            hi = np.searchsorted(records['ts'], end, side='right') if end is not None else len(records)
+            records = records[lo:hi]
+        sources.append((records, reader.symbols))
+    return sources
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay ticks through the arbitrage bot")
+    parser.add_argument('--ticks', help="Directory of tick log files to replay")
+    parser.add_argument('--symbols', type=int, default=10, help="Synthetic symbols when --ticks is not given")
+    parser.add_argument('--hours', type=float, default=24.0, help="Synthetic duration in hours")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--step', type=float, default=1.0, help="Replay step (coalescing window) in seconds")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if args.ticks:
+        sources = load_tick_sources(args.ticks)
+    else:
+        symbols = [f"SYN{i}USD" for i in range(args.symbols)]
+        start = datetime(2025, 1, 1).timestamp()
+        sources = [synthetic_ticks(symbols, start, args.hours * 3600, seed=args.seed)]
+
+    result = asyncio.run(Backtester(step_seconds=args.step).run(sources))
+    for key, value in asdict(result).items():
+        logger.info(f"{key:<20}{value:>16,.4f}" if isinstance(value, float) else f"{key:<20}{value:>16,}")
+    logger.info(f"{'speedup':<20}{result.speedup:>15,.0f}x")
+
+if __name__ == "__main__":
+    main()
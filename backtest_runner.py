@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Parallel parameter sweeps over many days of ticks
+
+Each (day, parameter set) pair is one job run by backtest.Backtester in a
+worker process. Jobs carry tick file paths only: every worker memory-maps
+the files itself, so the page cache holds one copy of each day however many
+workers replay it, and nothing but paths and result rows is pickled.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import argparse
+import itertools
+import tempfile
+from datetime import datetime, timezone
+from dataclasses import dataclass, asdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    from tabulate import tabulate
+except ImportError:  # optional: plain-text table fallback
+    tabulate = None
+
+import config
+from backtest import Backtester, synthetic_ticks
+from tick_log import TickLogReader, list_tick_files, write_tick_file
+
+logger = logging.getLogger(__name__)
+
+# config attributes a sweep may vary; the engine reads them at call time
+SWEEP_PARAMETERS = ('MIN_PROFITABLE_APR', 'MIN_POSITIVE_FUNDING_RATE', 'MAX_SLIPPAGE_PERCENT', 'POSITION_SIZE_QUOTE')
+
+@dataclass(frozen=True)
+class BacktestJob:
+    """One replay: a day's tick files under one parameter set"""
+    day: str
+    paths: Tuple[str, ...]
+    parameters: Tuple[Tuple[str, float], ...]
+
+def parameter_grid(**values: Sequence[float]) -> List[Dict[str, float]]:
+    """Cartesian product of per-parameter values, e.g. MIN_PROFITABLE_APR=[10, 20]"""
+    unknown = set(values) - set(SWEEP_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Cannot sweep {', '.join(sorted(unknown))}; choose from {', '.join(SWEEP_PARAMETERS)}")
+    names = list(values)
+    return [dict(zip(names, combination)) for combination in itertools.product(*(values[n] for n in names))]
+
+def tick_files_by_day(directory: str, start: Optional[float] = None, end: Optional[float] = None) -> Dict[str, List[str]]:
+    """Group tick files by the UTC day of their first tick (recorder files never span midnight)"""
+    days: Dict[str, List[str]] = {}
+    for path in list_tick_files(directory, start, end):
+        time_range = TickLogReader(path).time_range()
+        if time_range is None:
+            continue
+        day = datetime.fromtimestamp(time_range[0], timezone.utc).strftime('%Y-%m-%d')
+        days.setdefault(day, []).append(path)
+    return days
+
+def write_synthetic_days(directory: str, days: int, symbols: Sequence[str], seed: int = 0,
+                         start: Optional[float] = None) -> Dict[str, List[str]]:
+    """Generate one synthetic tick file per day so workers can share them like recorded ones"""
+    start = start if start is not None else datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+    result = {}
+    for i in range(days):
+        day_start = start + i * 86400
+        records, names = synthetic_ticks(symbols, day_start, 86400, seed=seed + i)
+        day = datetime.fromtimestamp(day_start, timezone.utc).strftime('%Y-%m-%d')
+        result[day] = [write_tick_file(os.path.join(directory, f"synthetic_{day}"), records, names)]
+    return result
+
+def build_jobs(days: Dict[str, List[str]], grid: List[Dict[str, float]]) -> List[BacktestJob]:
+    return [
+        BacktestJob(day, tuple(paths), tuple(sorted(parameters.items())))
+        for parameters in grid
+        for day, paths in sorted(days.items())
+    ]
+
+def _init_worker():
+    """Keep worker processes quiet; only errors reach the parent's terminal"""
+    logging.getLogger().setLevel(logging.ERROR)
+
+def run_job(job: BacktestJob) -> Dict:
+    """Replay one job in the current process and return a flat result row"""
+    row = {'day': job.day, **dict(job.parameters)}
+    # Pool workers run many jobs: restore config afterwards so a job's parameters never leak into the next
+    originals = {name: getattr(config, name) for name, _ in job.parameters}
+    try:
+        for name, value in job.parameters:
+            setattr(config, name, value)
+        sources = []
+        for path in job.paths:
+            reader = TickLogReader(path)
+            sources.append((reader.records, reader.symbols))
+        result = asyncio.run(Backtester(quiet=True).run(sources))
+        row.update(asdict(result))
+    except Exception as e:
+        logger.error(f"Backtest {job.day} {dict(job.parameters)} failed: {e}")
+        row['error'] = str(e)
+    finally:
+        for name, value in originals.items():
+            setattr(config, name, value)
+    return row
+
+def run_jobs(jobs: List[BacktestJob], workers: Optional[int] = None) -> List[Dict]:
+    """Run jobs across a process pool, logging progress as they finish"""
+    workers = workers or os.cpu_count() or 1
+    rows = []
+    start = time.perf_counter()
+    if workers == 1:
+        for job in jobs:
+            rows.append(run_job(job))
+        return rows
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(run_job, job) for job in jobs]
+        for done, future in enumerate(as_completed(futures), 1):
+            rows.append(future.result())
+            if done % max(len(jobs) // 20, 1) == 0 or done == len(jobs):
+                logger.info(f"⏱️ {done}/{len(jobs)} backtests done in {time.perf_counter() - start:.1f}s")
+    return rows
+
+def aggregate(rows: List[Dict]) -> List[Dict]:
+    """One row per parameter set, summed over days and sorted by total PnL"""
+    groups: Dict[tuple, List[Dict]] = {}
+    for row in rows:
+        key = tuple((name, row[name]) for name in SWEEP_PARAMETERS if name in row)
+        groups.setdefault(key, []).append(row)
+
+    table = []
+    for key, group in groups.items():
+        ok = [row for row in group if 'error' not in row]
+        daily = [row['total_pnl'] for row in ok]
+        table.append({
+            **dict(key),
+            'days': len(ok),
+            'errors': len(group) - len(ok),
+            'positions': sum(row['positions_opened'] for row in ok),
+            'fills': sum(row['fills'] for row in ok),
+            'fees': sum(row['fees'] for row in ok),
+            'funding_pnl': sum(row['funding_pnl'] for row in ok),
+            'trading_pnl': sum(row['trading_pnl'] for row in ok),
+            'total_pnl': sum(daily),
+            'mean_daily_pnl': sum(daily) / len(daily) if daily else 0.0,
+            'worst_day_pnl': min(daily) if daily else 0.0,
+        })
+    table.sort(key=lambda row: row['total_pnl'], reverse=True)
+    return table
+
+def format_table(table: List[Dict]) -> str:
+    """Render aggregated rows with tabulate when available, else fixed-width columns"""
+    if not table:
+        return "(no results)"
+    headers = list(table[0])
+
+    def cell(header: str, value) -> str:
+        if header in SWEEP_PARAMETERS:
+            return f"{value:g}"
+        return f"{value:,.2f}" if isinstance(value, float) else str(value)
+
+    cells = [[cell(h, row[h]) for h in headers] for row in table]
+    if tabulate is not None:
+        return tabulate(cells, headers=headers, disable_numparse=True, stralign='right')
+
+    widths = [max(len(h), *(len(r[i]) for r in cells)) for i, h in enumerate(headers)]
+    lines = ["  ".join(h.rjust(w) for h, w in zip(headers, widths)),
+             "  ".join("-" * w for w in widths)]
+    lines += ["  ".join(c.rjust(w) for c, w in zip(r, widths)) for r in cells]
+    return "\n".join(lines)
+
+def _floats(text: str) -> List[float]:
+    return [float(value) for value in text.split(',') if value.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep strategy parameters over days of ticks in parallel")
+    parser.add_argument('--ticks', help="Directory of tick log files (grouped by UTC day)")
+    parser.add_argument('--synthetic-days', type=int, default=3, help="Synthetic days when --ticks is not given")
+    parser.add_argument('--symbols', type=int, default=10, help="Synthetic symbols per day")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--apr', type=_floats, default=[config.MIN_PROFITABLE_APR], help="MIN_PROFITABLE_APR values, comma separated")
+    parser.add_argument('--funding', type=_floats, default=[config.MIN_POSITIVE_FUNDING_RATE], help="MIN_POSITIVE_FUNDING_RATE values")
+    parser.add_argument('--slippage', type=_floats, default=[config.MAX_SLIPPAGE_PERCENT], help="MAX_SLIPPAGE_PERCENT values")
+    parser.add_argument('--size', type=_floats, default=[config.POSITION_SIZE_QUOTE], help="POSITION_SIZE_QUOTE values")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    grid = parameter_grid(MIN_PROFITABLE_APR=args.apr, MIN_POSITIVE_FUNDING_RATE=args.funding,
+                          MAX_SLIPPAGE_PERCENT=args.slippage, POSITION_SIZE_QUOTE=args.size)
+
+    with tempfile.TemporaryDirectory(prefix='synthetic_ticks_') as scratch:
+        if args.ticks:
+            days = tick_files_by_day(args.ticks)
+        else:
+            symbols = [f"SYN{i}USD" for i in range(args.symbols)]
+            days = write_synthetic_days(scratch, args.synthetic_days, symbols, seed=args.seed)
+        if not days:
+            logger.error("❌ No tick files to replay")
+            return
+
+        jobs = build_jobs(days, grid)
+        logger.info(f"🚀 Running {len(jobs)} backtests ({len(days)} days x {len(grid)} parameter sets)")
+        start = time.perf_counter()
+        rows = run_jobs(jobs, args.workers)
+        logger.info(f"✅ Finished in {time.perf_counter() - start:.1f}s\n")
+        print(format_table(aggregate(rows)))
+
+if __name__ == "__main__":
+    main()
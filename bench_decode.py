@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: Delta Exchange frame decoding
+Compares the stdlib json.loads + dict/float() path against the typed decoders
+in delta_messages for each market data channel
+"""
+
+import json
+import time
+import logging
+
+import delta_messages
+from delta_messages import decode_frame
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+SAMPLE_FRAMES = {
+    'l1_orderbook': {
+        'type': 'l1_orderbook', 'symbol': 'BTCUSD', 'best_bid': '100123.5', 'best_ask': '100124.0',
+        'bid_qty': '1520', 'ask_qty': '870', 'last_sequence_no': 1671700000000000, 'timestamp': 1671700000000000
+    },
+    'v2/ticker': {
+        'type': 'v2/ticker', 'symbol': 'BTCUSD', 'open': 99800.0, 'high': 100500.0, 'low': 99500.0,
+        'close': 100123.5, 'mark_price': '100130.2', 'funding_rate': '0.0125', 'volume': 15234.0,
+        'turnover_usd': 1523400000.0, 'oi': '3150', 'product_id': 27, 'timestamp': 1671700000000000,
+        'quotes': {'best_bid': '100123.5', 'best_ask': '100124.0', 'bid_size': '1520', 'ask_size': '870'}
+    },
+    'all_trades': {
+        'type': 'all_trades', 'symbol': 'BTCUSD', 'price': '100123.5', 'size': 12,
+        'buyer_role': 'taker', 'seller_role': 'maker', 'timestamp': 1671700000000000
+    },
+    'mark_price': {
+        'type': 'mark_price', 'symbol': 'MARK:BTCUSD', 'price': '100130.2', 'mark_price': '100130.2',
+        'timestamp': 1671700000000000
+    },
+    'candlestick_1m': {
+        'type': 'candlestick_1m', 'symbol': 'MARK:BTCUSD', 'resolution': '1m', 'open': 100100.0,
+        'high': 100150.0, 'low': 100090.0, 'close': 100130.2, 'volume': 42, 'candle_start_time': 1671699960000000,
+        'timestamp': 1671700000000000
+    },
+}
+
+# Fields each channel handler needs, in the shape the old dict handlers read them
+NUMERIC_FIELDS = {
+    channel: [field for field, ftype in fields if ftype is float]
+    for channel, (_, fields) in delta_messages.CHANNEL_FIELDS.items()
+}
+
+def stdlib_path(raw: bytes, channel: str):
+    """What _on_websocket_message did before: json.loads, then .get + float() per field"""
+    data = json.loads(raw)
+    symbol = data.get('symbol')
+    values = []
+    for field in NUMERIC_FIELDS[channel]:
+        value = data.get(field)
+        values.append(float(value) if value else None)
+    return symbol, values
+
+def typed_path(raw: bytes, channel: str):
+    """decode_frame straight into a struct; fields are already numeric"""
+    msg = decode_frame(raw)
+    return msg.symbol, [getattr(msg, field) for field in NUMERIC_FIELDS[channel]]
+
+def time_per_call(func, raw: bytes, channel: str, iterations: int) -> float:
+    """Mean nanoseconds per call"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(raw, channel)
+    return (time.perf_counter() - start) / iterations * 1e9
+
+def main(iterations: int = 200000):
+    backend = 'msgspec' if delta_messages.msgspec else ('orjson' if delta_messages.orjson else 'json')
+    logger.info(f"Decoder backend: {backend} ({iterations:,} iterations per channel)")
+    logger.info(f"{'channel':<16}{'stdlib ns':>12}{'typed ns':>12}{'speedup':>10}")
+
+    for channel, frame in SAMPLE_FRAMES.items():
+        raw = json.dumps(frame).encode()
+        assert stdlib_path(raw, channel) == typed_path(raw, channel), channel
+
+        baseline = time_per_call(stdlib_path, raw, channel, iterations)
+        typed = time_per_call(typed_path, raw, channel, iterations)
+        logger.info(f"{channel:<16}{baseline:>12.0f}{typed:>12.0f}{baseline / typed:>9.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency benchmark: ingest throughput, scan time and tick-to-order
+
+Runs against local_exchange.py (in a child process), never the network:
+  - throughput: frames applied per second, offline (pre-rendered frames fed
+    to _process_websocket_batch) and over the local WebSocket feed
+  - scan: full-universe find_arbitrage_opportunities for 1/10/100/330 symbols,
+    cold (memo cleared) and warm (memo hits)
+  - tick-to-order: from a frame entering _on_websocket_message to the first
+    order request leaving place_order, through the real evaluator and bot
+
+Results are written as JSON; --compare prints the change against an earlier run.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import platform
+import subprocess
+import multiprocessing
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import aiohttp
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+import config
+from api_client import CoinSwitchClient
+from logic_engine import ArbitrageLogicEngine
+from main import ArbitrageBot
+from backtest import BacktestClient, SimulatedClock, synthetic_ticks
+from local_exchange import LocalExchange, serve
+from performance_utils import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+UNIVERSE_SIZES = (1, 10, 100, 330)
+
+# (metric path, True if higher is better) for --compare
+HEADLINE_METRICS = (
+    ('throughput.offline_msgs_per_s', True),
+    ('throughput.websocket_msgs_per_s', True),
+    *((f'scan.{n}.cold_p50_ms', False) for n in UNIVERSE_SIZES),
+    *((f'scan.{n}.warm_p50_ms', False) for n in UNIVERSE_SIZES),
+    ('tick_to_order.p50_ms', False),
+    ('tick_to_order.p99_ms', False),
+)
+
+def _histogram_stats(histogram: LatencyHistogram) -> Dict:
+    stats = histogram.get_stats()
+    if not stats:
+        return {'count': 0}
+    return {key: stats[key] for key in ('count', 'avg_ms', 'min_ms', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms')}
+
+def _use_local_exchange(port: int, symbols: List[str]):
+    """Point config at the local exchange in live mode, with a throwaway signing key"""
+    config.DEMO_MODE = False
+    config.WS_URL = f"ws://127.0.0.1:{port}"
+    config.BASE_URL = f"http://127.0.0.1:{port}"
+    config.API_KEY = 'bench'
+    config.API_SECRET = Ed25519PrivateKey.generate().private_bytes(
+        serialization.Encoding.Raw, serialization.PrivateFormat.Raw, serialization.NoEncryption()
+    ).hex()
+    config.TARGET_SYMBOLS = list(symbols)
+
+def _run_exchange(port: int, symbols: List[str], rate: float, order_latency: float):
+    logging.basicConfig(level=logging.WARNING)
+    exchange = LocalExchange(symbols=symbols, port=port, rate=rate, order_latency=order_latency)
+    try:
+        asyncio.run(serve(exchange, stats_interval=3600))
+    except KeyboardInterrupt:
+        pass
+
+class ExchangeProcess:
+    """local_exchange.py in a child process, so it does not share the client's event loop"""
+
+    def __init__(self, port: int, symbols: List[str], rate: float = 0.0, order_latency: float = 0.001):
+        self.port = port
+        self.process = multiprocessing.Process(
+            target=_run_exchange, args=(port, symbols, rate, order_latency), daemon=True
+        )
+
+    async def __aenter__(self):
+        self.process.start()
+        deadline = time.time() + 10
+        async with aiohttp.ClientSession() as session:
+            while time.time() < deadline:
+                try:
+                    async with session.get(f"http://127.0.0.1:{self.port}/stats") as response:
+                        if response.status == 200:
+                            return self
+                except aiohttp.ClientError:
+                    await asyncio.sleep(0.05)
+        raise RuntimeError(f"Local exchange did not start on port {self.port}")
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.process.terminate()
+        self.process.join(5)
+
+async def bench_offline_throughput(frames: int = 200_000, symbols: int = 10) -> float:
+    """Frames/s through decode, fold and apply, with no sockets involved"""
+    exchange = LocalExchange(symbols=[f"SYM{i}USD" for i in range(symbols)])
+    rendered = exchange.render_frames(frames)
+    client = CoinSwitchClient()
+    try:
+        batch = config.INGEST_MAX_BATCH
+        start = time.perf_counter()
+        for i in range(0, len(rendered), batch):
+            await client._process_websocket_batch(rendered[i:i + batch])
+        return len(rendered) / (time.perf_counter() - start)
+    finally:
+        await client.cleanup()
+
+async def bench_websocket_throughput(port: int, duration: float = 5.0, rate: float = 50_000,
+                                     symbols: int = 10) -> Dict:
+    """Frames/s applied by the live client from the local exchange's feed"""
+    names = [f"SYM{i}USD" for i in range(symbols)]
+    _use_local_exchange(port, names)
+    async with ExchangeProcess(port, names, rate=rate):
+        client = CoinSwitchClient()
+        await client.initialize()
+        try:
+            # Let the subscriptions settle before measuring
+            await asyncio.sleep(1.0)
+            count, start = client.ingest_messages, time.perf_counter()
+            batches = client.ingest_batches
+            await asyncio.sleep(duration)
+            elapsed = time.perf_counter() - start
+            applied = client.ingest_messages - count
+            return {
+                'offered_msgs_per_s': rate,
+                'msgs_per_s': applied / elapsed,
+                'avg_batch': applied / max(client.ingest_batches - batches, 1),
+            }
+        finally:
+            await client.cleanup()
+
+async def bench_scan(sizes=UNIVERSE_SIZES, iterations: int = 50) -> Dict:
+    """Full-universe opportunity scan time per universe size"""
+    results = {}
+    for size in sizes:
+        symbols = [f"SYM{i}USD" for i in range(size)]
+        records, _ = synthetic_ticks(symbols, time.time(), 1.0, seed=size)
+        client = BacktestClient(SimulatedClock(time.time()), symbols)
+        try:
+            client.apply_records(records, np.arange(size, dtype=np.intp))
+            engine = ArbitrageLogicEngine(client)
+            engine._has_started = True
+
+            cold, warm = LatencyHistogram(), LatencyHistogram()
+            profitable = 0
+            for _ in range(iterations):
+                engine.clear_memo()
+                start = time.perf_counter()
+                profitable = len(await engine.find_arbitrage_opportunities())
+                cold.record((time.perf_counter() - start) * 1e6)
+
+                start = time.perf_counter()
+                await engine.find_arbitrage_opportunities()
+                warm.record((time.perf_counter() - start) * 1e6)
+
+            results[str(size)] = {
+                'profitable': profitable,
+                'cold_p50_ms': cold.percentile(50) / 1000,
+                'cold_p99_ms': cold.percentile(99) / 1000,
+                'warm_p50_ms': warm.percentile(50) / 1000,
+                'warm_p99_ms': warm.percentile(99) / 1000,
+            }
+        finally:
+            await client.cleanup()
+    return results
+
+class _OrderProbeClient(CoinSwitchClient):
+    """Stamps the moment the first order request of a trade leaves place_order"""
+
+    def __init__(self):
+        super().__init__()
+        self.tick_started: Optional[float] = None
+        self.order_sent = asyncio.Event()
+        self.latency = LatencyHistogram()
+
+    async def _make_request(self, method, endpoint, params=None, data=None):
+        if method == 'POST' and endpoint.endswith('/order') and self.tick_started is not None:
+            self.latency.record((time.perf_counter() - self.tick_started) * 1e6)
+            self.tick_started = None
+            self.order_sent.set()
+        return await super()._make_request(method, endpoint, params, data)
+
+def _frames_for(symbol: str, price: float, funding: float, sequence_no: int) -> List[str]:
+    """A ticker plus a 20-level book for one symbol; funding decides whether it is an opportunity"""
+    step = price * 0.0001
+    size = 25000.0 / price
+    now = int(time.time() * 1_000_000)
+    return [
+        json.dumps({'type': 'l2_updates', 'action': 'snapshot', 'symbol': symbol, 'sequence_no': sequence_no,
+                    'bids': [[str(price - step * i), str(size)] for i in range(1, 21)],
+                    'asks': [[str(price + step * i), str(size)] for i in range(1, 21)], 'timestamp': now}),
+        json.dumps({'type': 'v2/ticker', 'symbol': symbol, 'close': str(price), 'mark_price': str(price * 1.001),
+                    'funding_rate': str(funding), 'volume': '1', 'timestamp': now}),
+    ]
+
+async def bench_tick_to_order(port: int, iterations: int = 200, symbols: int = 10) -> Dict:
+    """Latency from an opportunity-creating frame to its first order request, through the real bot"""
+    names = [f"SYM{i}USD" for i in range(symbols)]
+    _use_local_exchange(port, names)
+    quiet_funding = config.MIN_POSITIVE_FUNDING_RATE / 10
+    hot_funding = config.MIN_POSITIVE_FUNDING_RATE * 5
+
+    async with ExchangeProcess(port, names):
+        client = _OrderProbeClient()
+        client.trading_pairs = names
+        for i, symbol in enumerate(names):
+            await client._process_websocket_batch(_frames_for(symbol, 30000.0 + i, quiet_funding, 1))
+
+        bot = ArbitrageBot()
+        bot.api_client = client
+        bot.logic_engine = ArbitrageLogicEngine(client)
+        bot.logic_engine._has_started = True
+        bot.running = True
+        bot._evaluator_task = asyncio.create_task(bot._run_opportunity_evaluator())
+        # The reset tick's own evaluation can be debounced behind the trade's, and the next
+        # sample must not be debounced behind that one: allow two debounce periods between samples
+        settle = config.OPPORTUNITY_COALESCE_WINDOW_SECONDS + 2 * config.OPPORTUNITY_DEBOUNCE_SECONDS + 0.02
+        timeouts = 0
+        try:
+            await asyncio.sleep(settle)
+            for i in range(iterations):
+                symbol = names[i % len(names)]
+                price = 30000.0 + i % len(names)
+                hot = json.dumps({'type': 'v2/ticker', 'symbol': symbol, 'close': str(price),
+                                  'mark_price': str(price * 1.001), 'funding_rate': str(hot_funding),
+                                  'volume': '1', 'timestamp': int(time.time() * 1_000_000)})
+                client.order_sent.clear()
+                client.tick_started = time.perf_counter()
+                await client._on_websocket_message(hot)
+                try:
+                    await asyncio.wait_for(client.order_sent.wait(), timeout=2.0)
+                except asyncio.TimeoutError:
+                    client.tick_started = None
+                    timeouts += 1
+
+                # Let the trade finish, then make the symbol uninteresting again for its next turn
+                async with bot._opportunity_lock:
+                    bot.active_positions.clear()
+                await client._on_websocket_message(hot.replace(str(hot_funding), str(quiet_funding)))
+                await asyncio.sleep(settle)
+        finally:
+            bot.running = False
+            bot._evaluator_task.cancel()
+            await client.cleanup()
+
+    stats = _histogram_stats(client.latency)
+    stats['timeouts'] = timeouts
+    return stats
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def _lookup(results: Dict, path: str) -> Optional[float]:
+    value = results
+    for key in path.split('.'):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+def compare(previous: Dict, current: Dict):
+    """Log headline metrics side by side with the change, flagging regressions over 10%"""
+    logger.info(f"Compared with {previous.get('commit') or 'previous run'} ({previous.get('timestamp')})")
+    for path, higher_is_better in HEADLINE_METRICS:
+        old, new = _lookup(previous, path), _lookup(current, path)
+        if old is None or new is None or not old:
+            continue
+        change = (new - old) / old
+        worse = change < -0.1 if higher_is_better else change > 0.1
+        logger.info(f"{'⚠️' if worse else '  '} {path:<32}{old:>14,.3f} -> {new:>14,.3f}  ({change:+.1%})")
+
+async def run(args) -> Dict:
+    results = {
+        'timestamp': datetime.now().isoformat(),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'cpu_count': os.cpu_count(),
+    }
+
+    logger.info("⏱️ Ingest throughput...")
+    results['throughput'] = {'offline_msgs_per_s': await bench_offline_throughput(args.frames)}
+    websocket = await bench_websocket_throughput(args.port, args.duration, args.rate)
+    results['throughput']['websocket_msgs_per_s'] = websocket['msgs_per_s']
+    results['throughput']['websocket'] = websocket
+
+    logger.info("⏱️ Scan time per universe size...")
+    results['scan'] = await bench_scan(iterations=args.scan_iterations)
+
+    logger.info("⏱️ Tick-to-order latency...")
+    results['tick_to_order'] = await bench_tick_to_order(args.port + 1, args.orders)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Tick-to-order latency benchmark against a local exchange")
+    parser.add_argument('--output', default='bench_latency.json', help="Where to write the JSON results")
+    parser.add_argument('--compare', help="Earlier results file to compare against")
+    parser.add_argument('--port', type=int, default=8790, help="Local exchange port (and port + 1)")
+    parser.add_argument('--frames', type=int, default=200_000, help="Frames for the offline throughput run")
+    parser.add_argument('--rate', type=float, default=50_000, help="Offered msgs/s for the WebSocket run")
+    parser.add_argument('--duration', type=float, default=5.0, help="Seconds to measure WebSocket throughput")
+    parser.add_argument('--scan-iterations', type=int, default=50)
+    parser.add_argument('--orders', type=int, default=200, help="Tick-to-order samples")
+    args = parser.parse_args()
+
+    # Only the benchmark's own lines; the client and bot log every tick and trade at INFO
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    logger.setLevel(logging.INFO)
+
+    results = asyncio.run(run(args))
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    throughput = results['throughput']
+    logger.info(f"\nIngest: {throughput['offline_msgs_per_s']:,.0f} msgs/s offline, "
+                f"{throughput['websocket_msgs_per_s']:,.0f} msgs/s over WebSocket")
+    for size, scan in results['scan'].items():
+        logger.info(f"Scan {size:>4} symbols: cold p50 {scan['cold_p50_ms']:.3f} ms, warm p50 {scan['warm_p50_ms']:.3f} ms")
+    tick = results['tick_to_order']
+    logger.info(f"Tick-to-order: p50 {tick.get('p50_ms', 0):.3f} ms, p99 {tick.get('p99_ms', 0):.3f} ms "
+                f"({tick['count']} orders, {tick['timeouts']} timeouts)")
+    logger.info(f"📄 Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+if __name__ == "__main__":
+    sys.exit(main())
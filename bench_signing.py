@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: REST request signing cost per order
+Compares the old per-call key parsing in _generate_signature against
+RequestSigner (key parsed once), single and batched
+"""
+
+import json
+import time
+import logging
+import urllib.parse
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+import config
+from signing import RequestSigner
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+ORDER_PATH = '/trade/api/v2/order'
+ORDER_BODY = json.dumps({'symbol': 'BTCUSDT', 'side': 'buy', 'quantity': '0.01', 'type': 'limit', 'price': '100100.0'})
+
+def benchmark_secret() -> str:
+    """Configured secret if it is a usable Ed25519 key, else a throwaway one"""
+    try:
+        Ed25519PrivateKey.from_private_bytes(bytes.fromhex(config.API_SECRET or ''))
+        return config.API_SECRET
+    except ValueError:
+        return Ed25519PrivateKey.generate().private_bytes(
+            serialization.Encoding.Raw, serialization.PrivateFormat.Raw, serialization.NoEncryption()
+        ).hex()
+
+def sign_uncached(api_secret: str, timestamp: str, method: str, path: str, params=None, body: str = "") -> str:
+    """What _generate_signature did before: parse the key on every call"""
+    if method.upper() == 'GET' and params:
+        query = urllib.parse.urlencode(params)
+        full_path = path + ('?' if '?' not in path else '&') + query
+        message_str = method.upper() + urllib.parse.unquote_plus(full_path) + timestamp
+    else:
+        message_str = method.upper() + path + timestamp + body
+    private_key = Ed25519PrivateKey.from_private_bytes(bytes.fromhex(api_secret))
+    return private_key.sign(message_str.encode('utf-8')).hex()
+
+def time_per_order(func, iterations: int, orders_per_call: int = 1) -> float:
+    """Mean microseconds per signed order"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / (iterations * orders_per_call) * 1e6
+
+def main(iterations: int = 20000):
+    api_secret = benchmark_secret()
+    signer = RequestSigner(config.API_KEY, api_secret)
+    timestamp = signer.timestamp()
+    legs = [('POST', ORDER_PATH, None, ORDER_BODY), ('POST', '/trade/api/v2/futures/order', None, ORDER_BODY)]
+
+    # Same key, same message -> same signature (Ed25519 is deterministic)
+    assert sign_uncached(api_secret, timestamp, 'POST', ORDER_PATH, body=ORDER_BODY) == \
+        signer.sign(timestamp, 'POST', ORDER_PATH, body=ORDER_BODY)
+
+    before = time_per_order(lambda: sign_uncached(api_secret, timestamp, 'POST', ORDER_PATH, body=ORDER_BODY), iterations)
+    after = time_per_order(lambda: signer.sign(timestamp, 'POST', ORDER_PATH, body=ORDER_BODY), iterations)
+    batch = time_per_order(lambda: signer.sign_batch(legs, timestamp), iterations, len(legs))
+    headers = time_per_order(lambda: signer.headers('POST', ORDER_PATH, body=ORDER_BODY), iterations)
+
+    logger.info(f"Signing cost per order ({iterations:,} iterations)")
+    logger.info(f"{'parse key per call (before)':<32}{before:>8.1f} µs")
+    logger.info(f"{'RequestSigner.sign':<32}{after:>8.1f} µs  ({before / after:.2f}x)")
+    logger.info(f"{'RequestSigner.sign_batch (2 legs)':<32}{batch:>8.1f} µs  ({before / batch:.2f}x)")
+    logger.info(f"{'RequestSigner.headers':<32}{headers:>8.1f} µs")
+
+    stats = signer.get_stats()
+    logger.info(f"Signer metric: {stats['count']} samples, p50 {stats['p50_ms'] * 1000:.1f} µs, "
+                f"p99 {stats['p99_ms'] * 1000:.1f} µs, max {stats['max_ms'] * 1000:.1f} µs")
+
+if __name__ == "__main__":
+    main()
@@ -14,13 +14,13 @@ ENVIRONMENT = os.getenv("ENVIRONMENT", "demo")  # Default to demo mode
 DEMO_MODE = ENVIRONMENT == "demo"
 USE_MOCK_DATA = DEMO_MODE  # Use simulated data when in demo mode
 
-# Base URLs (Updated for Delta Exchange API)
-BASE_URL = "https://api.delta.exchange"
+# Base URLs (Updated for Delta Exchange API); override to point at local_exchange.py
+BASE_URL = os.getenv("DELTA_BASE_URL", "https://api.delta.exchange")
 SPOT_BASE_URL = "https://api.delta.exchange"
 FUTURES_BASE_URL = "https://api.delta.exchange"
 NAMESPACE = "/delta"
 # WebSocket URLs (Updated for Delta Exchange)
-WS_URL = "wss://socket.india.delta.exchange"
+WS_URL = os.getenv("DELTA_WS_URL", "wss://socket.india.delta.exchange")
 WS_TESTNET_URL = "wss://socket-ind.testnet.deltaex.org"
 
 
@@ -29,6 +29,51 @@ CONNECTION_POOL_SIZE = 10
 MAX_RETRIES = 3
 REQUEST_TIMEOUT = 10.0
 
+# Market Data
+MARKET_STATE_CAPACITY = 512  # Initial symbol slots in the market state store
+INGEST_MAX_BATCH = 1000  # Max WebSocket frames folded into one market state write
+WS_SUBSCRIBE_MAX_FRAME_BYTES = 16 * 1024  # Split subscribe requests into frames no larger than this
+WS_SUBSCRIBE_MAX_SYMBOLS = 500  # Max symbols in one channel entry of a subscribe frame
+WS_SHARD_COUNT = int(os.getenv("WS_SHARD_COUNT", "1"))  # Market data connections (symbols are split across them)
+WS_SHARD_REBALANCE_INTERVAL = 10.0  # Seconds between shard rate reports / rebalance checks
+WS_SHARD_LAG_FRAMES = 5000  # Undecoded frames on a shard that count as lagging
+WS_SHARD_IMBALANCE_RATIO = 1.5  # Rebalance when a shard carries this much more than the average
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))  # Processes decoding market data (>1 uses shared memory)
+INGEST_WORKER_POLL_SECONDS = 0.001  # How often the bot checks shared memory for worker updates
+SHARED_BOOK_DEPTH = 20  # L2 levels per side published to shared memory by ingest workers
+
+# Trading universe (see universe.py); when disabled the bot trades TARGET_SYMBOLS
+UNIVERSE_ENABLED = os.getenv("UNIVERSE_ENABLED", "false").lower() == "true"
+UNIVERSE_PAIRS_FILE = os.getenv("UNIVERSE_PAIRS_FILE", "pairs.json")  # Exchange pair list, reloaded when it changes
+UNIVERSE_EXCHANGE = "coinswitchx"  # Key of the pair list inside the file
+UNIVERSE_SYMBOL_QUOTE = "USD"  # BTC/INR is traded as BTCUSD
+UNIVERSE_REFRESH_INTERVAL = 300.0  # Seconds between universe re-selections
+UNIVERSE_MIN_VOLUME_USD = float(os.getenv("UNIVERSE_MIN_VOLUME_USD", "1000000"))  # 24h turnover to be added
+UNIVERSE_KEEP_RATIO = 0.5  # Subscribed symbols stay until turnover drops below this share of the minimum
+UNIVERSE_MIN_FUNDING_RATE = 0.0  # Funding rate needed to be added
+UNIVERSE_MAX_SYMBOLS = int(os.getenv("UNIVERSE_MAX_SYMBOLS", "400"))
+
+# Tick capture (binary, replayable; see tick_log.py)
+TICK_LOG_ENABLED = os.getenv("TICK_LOG_ENABLED", "false").lower() == "true"
+TICK_LOG_DIR = os.getenv("TICK_LOG_DIR", "ticks")
+TICK_LOG_MAX_FILE_BYTES = 256 * 1024 * 1024  # Roll over to a new file past this size (and daily)
+TICK_LOG_BUFFER_RECORDS = 4096  # Ticks buffered in memory between writes
+# Each (symbol, field) is recorded at most once per interval, and only when its value changed,
+# as a 20-byte record. The worst case is symbols * 5 fields / interval * 20 B: at 1s that is
+# ~11 MB/h for 30 symbols and ~144 MB/h for 400 (typically about half, as funding rarely moves),
+# whatever the message rate. 0 writes every change at the end of its ingest batch.
+TICK_LOG_MIN_INTERVAL_SECONDS = float(os.getenv("TICK_LOG_MIN_INTERVAL_SECONDS", "1.0"))
+
+# Hot-path logging (per-tick market data lines, per channel)
+HOT_PATH_LOG_SAMPLE_EVERY = 100  # Log one in every N messages
+HOT_PATH_LOG_MAX_PER_SECOND = 5  # And never more than this many lines per second
+
+# Opportunity Detection (event-driven, re-scores only symbols that changed)
+OPPORTUNITY_DEBOUNCE_SECONDS = 0.05  # Minimum gap between two evaluations
+OPPORTUNITY_COALESCE_WINDOW_SECONDS = 0.005  # Wait this long after a tick for the rest of a burst
+OPPORTUNITY_FULL_SCAN_INTERVAL = 30  # Safety-net full universe scan (seconds)
+OPPORTUNITY_MEMO_MAX_ENTRIES = 4096  # Memoized scan results kept (LRU beyond this)
+
 # Trading Strategy
 TARGET_SYMBOLS = ['BTCUSD']  # Delta Exchange uses BTCUSD format
 MIN_PROFITABLE_APR = 10.0
@@ -39,7 +84,12 @@ MAX_OPEN_POSITIONS = 3
 # Risk Management
 MAX_SLIPPAGE_PERCENT = 0.5
 MIN_LIQUIDITY_QUOTE = 50000.0
+# Reject spot/mark/funding older than this when scanning and validating (0 disables; demo data is static)
+MAX_DATA_AGE_SECONDS = 0.0 if DEMO_MODE else float(os.getenv("MAX_DATA_AGE_SECONDS", "30"))
 
 # Validation
 if not DEMO_MODE and (not API_KEY or not API_SECRET):
     raise ValueError("Please set DELTA_API_KEY and DELTA_API_SECRET in .env file for production mode")
+if not DEMO_MODE and UNIVERSE_ENABLED and INGEST_WORKERS > 1:
+    # Worker processes own a fixed slice of a fixed shared symbol table; symbols the universe adds later would be dropped
+    raise ValueError("UNIVERSE_ENABLED cannot be combined with INGEST_WORKERS > 1; use WS_SHARD_COUNT to spread the load instead")
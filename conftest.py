@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test doubles shared by the unit tests (pytest loads this file automatically)
+"""
+
+import json
+
+import pytest
+
+from market_state import MarketStateStore
+
+class FakeSocket:
+    """Records the frames sent on it (JSON frames decoded)"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, frame):
+        self.sent.append(json.loads(frame) if isinstance(frame, (str, bytes)) else frame)
+
+class FakeClient:
+    """
+    Just enough of CoinSwitchClient for the bot, the logic engine, the shard
+    manager and the universe manager.
+
+    Orders fill immediately; cancels fail and get_order reports order_status
+    (None = unreachable). Subscriptions are sent on the socket as (action,
+    channels) tuples, and /v2/tickers serves the tickers dict.
+    """
+
+    def __init__(self, trading_pairs, order_status=None, tickers=None):
+        self.trading_pairs = list(trading_pairs)
+        self.market_state = MarketStateStore(self.trading_pairs)
+        self.order_books = {}
+        self.shard_manager = None
+        self.delta_ws = None
+        self.order_status = order_status
+        self.tickers = tickers or {}
+        self.orders = []
+        self.cancels = 0
+        self.scanned = []
+
+    async def place_order(self, symbol, side, quantity, price=None, exchange_type='spot'):
+        self.orders.append((symbol, side, quantity, exchange_type))
+        return {'orderId': f"ORD{len(self.orders)}", 'status': 'FILLED'}
+
+    async def cancel_order(self, order_id, exchange_type='spot'):
+        self.cancels += 1
+        return None
+
+    async def get_order(self, order_id, exchange_type='spot'):
+        return self.order_status
+
+    async def get_market_snapshot(self, symbols=None):
+        self.scanned.append(list(symbols))
+        return self.market_state.snapshot(symbols)
+
+    def get_order_book(self, symbol):
+        return self.order_books.get(self.market_state.lookup(symbol))
+
+    def _channels_for(self, symbols):
+        return {'l2_updates': list(symbols)}
+
+    async def _subscribe_channels(self, ws, channels, action="subscribe"):
+        await ws.send((action, channels))
+
+    async def _make_request(self, method, path, params=None):
+        return {'result': [
+            {'symbol': symbol, 'turnover_usd': str(turnover), 'funding_rate': str(funding)}
+            for symbol, (turnover, funding) in self.tickers.items()
+        ]}
+
+@pytest.fixture
+def make_client():
+    """FakeClient factory: make_client(trading_pairs, order_status=None, tickers=None)"""
+    return FakeClient
+
+@pytest.fixture
+def make_socket():
+    """FakeSocket factory"""
+    return FakeSocket
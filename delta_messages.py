@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Typed decoders for Delta Exchange WebSocket market data channels
+
+Frames for the channels below are decoded straight into compact structs with
+numeric fields (prices arrive as JSON strings and are converted here, once).
+Anything else - subscription acks, errors, unknown channels - falls back to a
+plain dict. msgspec is used when installed, then orjson, then the stdlib.
+"""
+
+import json
+import logging
+from collections import namedtuple
+from typing import Any, Dict, Optional, Union
+
+try:
+    import msgspec
+except ImportError:  # optional speed-up
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# channel -> (struct name, [(field, type)]); unlisted fields are ignored
+CHANNEL_FIELDS = {
+    'l1_orderbook': ('L1Orderbook', [
+        ('symbol', str), ('best_bid', float), ('best_ask', float),
+        ('bid_qty', float), ('ask_qty', float), ('timestamp', int)
+    ]),
+    'v2/ticker': ('Ticker', [
+        ('symbol', str), ('close', float), ('mark_price', float), ('funding_rate', float),
+        ('volume', float), ('timestamp', int)
+    ]),
+    'all_trades': ('Trade', [
+        ('symbol', str), ('price', float), ('size', float), ('timestamp', int)
+    ]),
+    'mark_price': ('MarkPrice', [
+        ('symbol', str), ('price', float), ('mark_price', float), ('timestamp', int)
+    ]),
+    'candlestick_1m': ('Candlestick', [
+        ('symbol', str), ('open', float), ('high', float), ('low', float), ('close', float),
+        ('volume', float), ('candle_start_time', int), ('timestamp', int)
+    ]),
+    # Levels stay as [price, size] string pairs; order_book.parse_levels converts them
+    'l2_updates': ('L2Update', [
+        ('symbol', str), ('action', str), ('bids', list), ('asks', list),
+        ('sequence_no', int), ('timestamp', int)
+    ]),
+}
+
+def _make_struct(name: str, channel: str, fields):
+    """Build a struct class for one channel (msgspec Struct, else a namedtuple)"""
+    if msgspec is not None:
+        return msgspec.defstruct(
+            name,
+            [(field, Optional[ftype], None) for field, ftype in fields],
+            tag=channel,
+            tag_field='type',
+            omit_defaults=True
+        )
+    return namedtuple(name, [field for field, _ in fields], defaults=(None,) * len(fields))
+
+STRUCTS = {channel: _make_struct(name, channel, fields) for channel, (name, fields) in CHANNEL_FIELDS.items()}
+L1Orderbook = STRUCTS['l1_orderbook']
+Ticker = STRUCTS['v2/ticker']
+Trade = STRUCTS['all_trades']
+MarkPrice = STRUCTS['mark_price']
+Candlestick = STRUCTS['candlestick_1m']
+L2Update = STRUCTS['l2_updates']
+
+DeltaMessage = Union[Any, Dict]
+
+if msgspec is not None:
+    # strict=False lets "12345.5" decode into a float field
+    _typed_decoder = msgspec.json.Decoder(Union[tuple(STRUCTS.values())], strict=False)
+    _generic_loads = msgspec.json.decode
+    DecodeError = msgspec.DecodeError
+else:
+    _typed_decoder = None
+    _generic_loads = orjson.loads if orjson is not None else json.loads
+    DecodeError = ValueError  # json.JSONDecodeError and orjson.JSONDecodeError both subclass it
+
+def _coerce(value, ftype):
+    """Convert one field; a value that does not parse ('-', 'n/a') becomes None rather than failing the frame"""
+    if value is None or value == '':
+        return None
+    try:
+        return ftype(value)
+    except (TypeError, ValueError):
+        return None
+
+def from_dict(data: Any) -> DeltaMessage:
+    """Convert an already-decoded message to its struct, or return it unchanged"""
+    if not isinstance(data, dict):
+        return data
+    channel = data.get('type')
+    spec = CHANNEL_FIELDS.get(channel) if isinstance(channel, str) else None
+    if spec is None:
+        return data
+    values = {field: _coerce(data.get(field), ftype) for field, ftype in spec[1]}
+    return STRUCTS[channel](**values)
+
+def decode_frame(raw: Union[str, bytes]) -> DeltaMessage:
+    """Decode a WebSocket frame into a typed struct, or a dict for other messages"""
+    if _typed_decoder is not None:
+        try:
+            return _typed_decoder.decode(raw)
+        except msgspec.ValidationError:
+            # Unknown type or unexpected field shape: take the generic path
+            return from_dict(_generic_loads(raw))
+    return from_dict(_generic_loads(raw))
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Multi-process market data ingest into shared-memory market state
+
+Each worker process owns a slice of the symbols: it runs its own WebSocket
+connection(s), decodes frames and writes the results (and its top-of-book
+L2 levels) straight into a SharedMarketState block. The bot process reads
+that block in place and is woken when any worker applies a batch, so JSON
+decoding scales with cores while the trading logic stays single-threaded.
+"""
+
+import time
+import asyncio
+import logging
+import multiprocessing
+from typing import Dict, List, Optional
+
+import config
+from api_client import CoinSwitchClient
+from shared_state import SharedMarketState, MAX_WRITERS
+from ws_shards import ShardedConnectionManager
+
+logger = logging.getLogger(__name__)
+
+# Workers are spawned, not forked, so runtime config changes are passed explicitly
+_WORKER_SETTINGS = (
+    'WS_URL', 'INGEST_MAX_BATCH', 'SHARED_BOOK_DEPTH',
+    'WS_SHARD_COUNT', 'WS_SHARD_REBALANCE_INTERVAL', 'WS_SHARD_LAG_FRAMES', 'WS_SHARD_IMBALANCE_RATIO',
+    'WS_SUBSCRIBE_MAX_FRAME_BYTES', 'WS_SUBSCRIBE_MAX_SYMBOLS',
+    'TICK_LOG_ENABLED', 'TICK_LOG_DIR', 'TICK_LOG_MAX_FILE_BYTES', 'TICK_LOG_BUFFER_RECORDS',
+    'TICK_LOG_MIN_INTERVAL_SECONDS',
+)
+
+class _WorkerClient(CoinSwitchClient):
+    """Ingest-only client: writes to shared memory and publishes its L2 books there too"""
+
+    def _parse_delta_l2_update(self, msg):
+        update = super()._parse_delta_l2_update(msg)
+        book = self.order_books.get(self.market_state.lookup(msg.symbol))
+        if book is not None:
+            if book.is_synced:
+                depth = self.market_state.book_depth
+                self.market_state.write_book(msg.symbol, book.bids.levels(depth), book.asks.levels(depth))
+            else:
+                # Out of sync until the resync snapshot: let the bot see no book rather than a stale one
+                self.market_state.write_book(msg.symbol, [], [])
+        return update
+
+async def _run_worker(index: int, shm_name: str, symbols: List[str], owned: List[str]):
+    state = SharedMarketState(symbols, name=shm_name, writer_index=index, book_depth=config.SHARED_BOOK_DEPTH)
+    client = _WorkerClient()
+    client.market_state = state
+    client.trading_pairs = list(owned)
+    if client.tick_recorder:
+        client.tick_recorder.prefix = f"ticks_w{index}"
+
+    manager = ShardedConnectionManager(client, config.WS_SHARD_COUNT)
+    client.shard_manager = manager
+    try:
+        await manager.run()
+    finally:
+        await client.cleanup()
+        state.close()
+
+def _worker_main(index: int, shm_name: str, symbols: List[str], owned: List[str],
+                 settings: Dict, log_level: int):
+    """Process entry point"""
+    logging.basicConfig(level=log_level, format=f'%(asctime)s - ingest[{index}] - %(levelname)s - %(message)s')
+    for name, value in settings.items():
+        setattr(config, name, value)
+    try:
+        asyncio.run(_run_worker(index, shm_name, symbols, owned))
+    except KeyboardInterrupt:
+        pass
+
+class IngestWorkerPool:
+    """
+    Starts the workers for a CoinSwitchClient and swaps its market state for
+    the shared one.
+
+    Symbols are dealt round-robin so each worker gets a similar share. A
+    watcher task polls the workers' batch counters every poll_interval
+    seconds and sets the client's market_data_event when any moved, and
+    restarts a worker that died.
+    """
+
+    def __init__(self, client, workers: int = None, poll_interval: float = None):
+        self.client = client
+        self.workers = min(max(workers or config.INGEST_WORKERS, 1), MAX_WRITERS)
+        self.poll_interval = poll_interval or config.INGEST_WORKER_POLL_SECONDS
+        self.state: Optional[SharedMarketState] = None
+        self._symbols: List[str] = []
+        self._slices: List[List[str]] = []
+        self._processes: List[Optional[multiprocessing.Process]] = []
+        self._context = multiprocessing.get_context('spawn')
+        self._watcher: Optional[asyncio.Task] = None
+        self.restarts = 0
+
+    def start(self):
+        self._symbols = list(dict.fromkeys(self.client.trading_pairs))
+        self.state = SharedMarketState(self._symbols, book_depth=config.SHARED_BOOK_DEPTH)
+        self.state.on_update = self.client.market_data_event.set
+        self.client.market_state = self.state
+
+        self._slices = [self._symbols[i::self.workers] for i in range(self.workers)]
+        self._processes = [self._spawn(index) for index in range(self.workers)]
+        self._watcher = asyncio.create_task(self._watch())
+        logger.info(f"🧵 Ingesting {len(self._symbols)} symbols in {self.workers} worker processes "
+                    f"(shared memory {self.state.name})")
+
+    def _spawn(self, index: int) -> Optional[multiprocessing.Process]:
+        if not self._slices[index]:
+            return None
+        settings = {name: getattr(config, name) for name in _WORKER_SETTINGS}
+        process = self._context.Process(
+            target=_worker_main,
+            args=(index, self.state.name, self._symbols, self._slices[index], settings,
+                  logging.getLogger().getEffectiveLevel()),
+            name=f"ingest-{index}",
+            daemon=True
+        )
+        process.start()
+        return process
+
+    async def _watch(self):
+        """Turn worker batch counters into market_data_event wake-ups; restart dead workers"""
+        last_counter = self.state.write_counter()
+        last_health_check = time.monotonic()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            counter = self.state.write_counter()
+            if counter != last_counter:
+                last_counter = counter
+                self.client.market_data_event.set()
+
+            now = time.monotonic()
+            if now - last_health_check >= 1.0:
+                last_health_check = now
+                for index, process in enumerate(self._processes):
+                    if process is not None and process.exitcode is not None:
+                        logger.error(f"❌ Ingest worker {index} exited with code {process.exitcode}, restarting")
+                        self._processes[index] = self._spawn(index)
+                        self.restarts += 1
+
+    async def stop(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+        for process in self._processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self._processes:
+            if process is not None:
+                process.join(5)
+        self._processes = []
+        if self.state is not None:
+            self.state.close()
+            self.state = None
+
+    def get_stats(self) -> List[Dict]:
+        """Per-worker liveness, symbol count and batches applied"""
+        counts = self.state._writer_counts if self.state is not None else None
+        return [
+            {
+                'worker': index,
+                'alive': process is not None and process.is_alive(),
+                'symbols': len(self._slices[index]),
+                'batches': int(counts[index]) if counts is not None else 0,
+            }
+            for index, process in enumerate(self._processes)
+        ]
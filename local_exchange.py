@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Delta Exchange WebSocket feed and the order REST API
+
+Speaks the same subscribe protocol as socket.india.delta.exchange and streams
+v2/ticker, l1_orderbook, all_trades, mark_price, candlestick_1m and l2_updates
+frames for a random-walk market at a configurable rate, so the full client can
+be load-tested with no network. The /trade/api/v2 order, cancel, order status
+and portfolio endpoints answer after a configurable latency.
+
+Point the client at it with:
+    ENVIRONMENT=live DELTA_WS_URL=ws://127.0.0.1:8765 DELTA_BASE_URL=http://127.0.0.1:8765
+"""
+
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import itertools
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web, WSMsgType
+
+import config
+
+logger = logging.getLogger(__name__)
+
+CHANNELS = ('v2/ticker', 'l1_orderbook', 'all_trades', 'mark_price', 'candlestick_1m', 'l2_updates')
+
+class _SymbolMarket:
+    """Random-walk prices for one symbol"""
+
+    def __init__(self, symbol: str, rng: random.Random):
+        self.symbol = symbol
+        self.rng = rng
+        self.price = rng.uniform(10.0, 100000.0)
+        self.tick_size = self.price * 0.0001
+        self.basis = 0.001
+        self.funding = 0.012
+        self.volume = 0.0
+
+    def step(self):
+        self.price *= 1 + self.rng.gauss(0.0, 0.0001)
+        self.basis += self.rng.gauss(0.0, 0.00001)
+        self.funding += self.rng.gauss(0.0, 0.00001)
+
+    @property
+    def bid(self) -> float:
+        return self.price - self.tick_size
+
+    @property
+    def ask(self) -> float:
+        return self.price + self.tick_size
+
+    @property
+    def mark(self) -> float:
+        return self.price * (1 + self.basis)
+
+    def ladder(self, depth: int) -> Tuple[Dict[float, float], Dict[float, float]]:
+        """depth levels a side on the tick grid, sizes worth roughly 25k quote each"""
+        top = int(self.price / self.tick_size)
+        size = round(25000.0 / self.price, 6)
+        bids = {round((top - i) * self.tick_size, 8): size for i in range(1, depth + 1)}
+        asks = {round((top + i) * self.tick_size, 8): size for i in range(1, depth + 1)}
+        return bids, asks
+
+class _Subscription:
+    """One (channel, symbol) a connection subscribed to; l2 keeps its own sequence and last ladder"""
+    __slots__ = ('channel', 'symbol', 'market', 'sequence_no', 'bids', 'asks')
+
+    def __init__(self, channel: str, symbol: str, market: _SymbolMarket):
+        self.channel = channel
+        self.symbol = symbol
+        self.market = market
+        self.sequence_no = 0
+        self.bids: Dict[float, float] = {}
+        self.asks: Dict[float, float] = {}
+
+def _levels(levels: Dict[float, float]) -> List[List[str]]:
+    return [[str(price), str(size)] for price, size in levels.items()]
+
+def _diff(old: Dict[float, float], new: Dict[float, float]) -> Dict[float, float]:
+    """Levels that changed between two ladders; removed levels get size 0"""
+    changed = {price: size for price, size in new.items() if old.get(price) != size}
+    changed.update((price, 0) for price in old if price not in new)
+    return changed
+
+class LocalExchange:
+    """
+    aiohttp server emulating the exchange for load and latency tests.
+
+    Each WebSocket connection gets `rate` market data frames per second,
+    spread round-robin over its subscriptions and sent in small bursts every
+    `send_interval` seconds. Orders fill at the simulated price (limit orders
+    only if marketable, otherwise they rest until cancelled) after
+    order_latency plus up to latency_jitter seconds.
+    """
+
+    def __init__(self, symbols: Optional[List[str]] = None, host: str = '127.0.0.1', port: int = 8765,
+                 rate: float = 1000.0, order_latency: float = 0.005, latency_jitter: float = 0.0,
+                 book_depth: int = 20, send_interval: float = 0.005, seed: int = 0):
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.order_latency = order_latency
+        self.latency_jitter = latency_jitter
+        self.book_depth = book_depth
+        self.send_interval = send_interval
+        self.rng = random.Random(seed)
+        self.markets: Dict[str, _SymbolMarket] = {
+            symbol: _SymbolMarket(symbol, self.rng) for symbol in (symbols or config.TARGET_SYMBOLS)
+        }
+
+        self._order_ids = itertools.count(1)
+        self.orders: Dict[str, Dict] = {}
+        self._runner: Optional[web.AppRunner] = None
+        self._connections: Dict[web.WebSocketResponse, List[_Subscription]] = {}
+
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.orders_received = 0
+        self.connections_total = 0
+
+        self.app = web.Application()
+        self.app.add_routes([
+            web.get('/', self._handle_websocket),
+            web.post('/trade/api/v2/order', self._handle_place_order),
+            web.post('/trade/api/v2/futures/order', self._handle_place_order),
+            web.delete('/trade/api/v2/order/{order_id}', self._handle_cancel_order),
+            web.delete('/trade/api/v2/futures/order/{order_id}', self._handle_cancel_order),
+            web.get('/trade/api/v2/order/{order_id}', self._handle_get_order),
+            web.get('/trade/api/v2/futures/order/{order_id}', self._handle_get_order),
+            web.get('/trade/api/v2/user/portfolio', self._handle_portfolio),
+            web.get('/v2/tickers', self._handle_tickers),
+            web.get('/stats', self._handle_stats),
+        ])
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"🏁 Local exchange listening on {self.ws_url} ({len(self.markets)} symbols, {self.rate:,.0f} msgs/s per connection)")
+
+    async def stop(self):
+        for ws in list(self._connections):
+            await ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    def get_stats(self) -> Dict:
+        return {
+            'connections': len(self._connections),
+            'connections_total': self.connections_total,
+            'frames_sent': self.frames_sent,
+            'frames_skipped': self.frames_skipped,
+            'orders_received': self.orders_received,
+            'open_orders': sum(1 for order in self.orders.values() if order['status'] == 'OPEN'),
+        }
+
+    def render_frames(self, count: int, channels: Tuple[str, ...] = CHANNELS[:5]) -> List[str]:
+        """Pre-render market data frames round-robin over symbols and channels (for offline benchmarks)"""
+        subscriptions = [_Subscription(channel, symbol, market)
+                         for symbol, market in self.markets.items() for channel in channels]
+        return [self._frame(subscriptions[i % len(subscriptions)]) for i in range(count)]
+
+    # WebSocket feed
+
+    async def _handle_websocket(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(heartbeat=20)
+        await ws.prepare(request)
+        subscriptions: List[_Subscription] = []
+        self._connections[ws] = subscriptions
+        self.connections_total += 1
+        sender = asyncio.create_task(self._stream(ws, subscriptions))
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                try:
+                    await self._handle_control(ws, json.loads(msg.data), subscriptions)
+                except (ValueError, KeyError, TypeError) as e:
+                    await ws.send_str(json.dumps({'type': 'error', 'message': f"Bad request: {e}"}))
+        finally:
+            sender.cancel()
+            self._connections.pop(ws, None)
+        return ws
+
+    async def _handle_control(self, ws: web.WebSocketResponse, message: Dict, subscriptions: List[_Subscription]):
+        """subscribe / unsubscribe frames, acknowledged with a 'subscriptions' frame"""
+        action = message.get('type')
+        if action not in ('subscribe', 'unsubscribe'):
+            await ws.send_str(json.dumps({'type': 'error', 'message': f"Unknown request type {action!r}"}))
+            return
+
+        for channel in message['payload']['channels']:
+            name = channel['name']
+            if name not in CHANNELS:
+                await ws.send_str(json.dumps({'type': 'error', 'message': f"Unknown channel {name!r}"}))
+                continue
+            symbols = channel.get('symbols', [])
+            if action == 'unsubscribe':
+                subscriptions[:] = [s for s in subscriptions if not (s.channel == name and s.symbol in symbols)]
+                continue
+            for symbol in symbols:
+                market = self.markets.get(symbol[5:] if symbol.startswith('MARK:') else symbol)
+                if market is None or any(s.channel == name and s.symbol == symbol for s in subscriptions):
+                    continue
+                subscription = _Subscription(name, symbol, market)
+                subscriptions.append(subscription)
+                if name == 'l2_updates':
+                    await ws.send_str(self._l2_frame(subscription, snapshot=True))
+
+        channels: Dict[str, List[str]] = {}
+        for s in subscriptions:
+            channels.setdefault(s.channel, []).append(s.symbol)
+        await ws.send_str(json.dumps({
+            'type': 'subscriptions',
+            'channels': [{'name': name, 'symbols': symbols} for name, symbols in channels.items()]
+        }))
+
+    async def _stream(self, ws: web.WebSocketResponse, subscriptions: List[_Subscription]):
+        """Send `rate` frames per second round-robin over the connection's subscriptions"""
+        start = time.perf_counter()
+        sent = 0
+        position = 0
+        burst = max(int(self.rate * self.send_interval * 2), 1)
+        try:
+            while not ws.closed:
+                await asyncio.sleep(self.send_interval)
+                if not subscriptions:
+                    start, sent = time.perf_counter(), 0
+                    continue
+                due = int((time.perf_counter() - start) * self.rate) - sent
+                if due > burst:
+                    # Falling behind (slow reader or busy loop): skip the backlog rather than flood
+                    self.frames_skipped += due - burst
+                    sent += due - burst
+                    due = burst
+                for _ in range(due):
+                    position = (position + 1) % len(subscriptions)
+                    await ws.send_str(self._frame(subscriptions[position]))
+                sent += due
+                self.frames_sent += due
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+
+    def _frame(self, subscription: _Subscription) -> str:
+        market = subscription.market
+        market.step()
+        channel = subscription.channel
+        timestamp = int(time.time() * 1_000_000)
+        if channel == 'v2/ticker':
+            market.volume += 1
+            return json.dumps({
+                'type': channel, 'symbol': subscription.symbol, 'close': str(market.price),
+                'mark_price': str(market.mark), 'funding_rate': str(market.funding),
+                'volume': str(market.volume), 'timestamp': timestamp
+            })
+        if channel == 'l1_orderbook':
+            return json.dumps({
+                'type': channel, 'symbol': subscription.symbol, 'best_bid': str(market.bid),
+                'best_ask': str(market.ask), 'bid_qty': '1.0', 'ask_qty': '1.0', 'timestamp': timestamp
+            })
+        if channel == 'all_trades':
+            return json.dumps({
+                'type': channel, 'symbol': subscription.symbol, 'price': str(market.price),
+                'size': str(round(self.rng.uniform(0.001, 1.0), 6)), 'timestamp': timestamp
+            })
+        if channel == 'mark_price':
+            return json.dumps({
+                'type': channel, 'symbol': subscription.symbol, 'price': str(market.mark),
+                'mark_price': str(market.mark), 'timestamp': timestamp
+            })
+        if channel == 'candlestick_1m':
+            price = market.mark if subscription.symbol.startswith('MARK:') else market.price
+            return json.dumps({
+                'type': channel, 'symbol': subscription.symbol, 'open': str(price), 'high': str(price),
+                'low': str(price), 'close': str(price), 'volume': str(market.volume),
+                'candle_start_time': timestamp - timestamp % 60_000_000, 'timestamp': timestamp
+            })
+        return self._l2_frame(subscription, snapshot=False)
+
+    def _l2_frame(self, subscription: _Subscription, snapshot: bool) -> str:
+        """Full book on subscribe, then only the levels that changed since this connection's last frame"""
+        bids, asks = subscription.market.ladder(self.book_depth)
+        if snapshot:
+            bid_levels, ask_levels = bids, asks
+        else:
+            bid_levels, ask_levels = _diff(subscription.bids, bids), _diff(subscription.asks, asks)
+        subscription.bids, subscription.asks = bids, asks
+        subscription.sequence_no += 1
+        return json.dumps({
+            'type': 'l2_updates', 'action': 'snapshot' if snapshot else 'update',
+            'symbol': subscription.symbol, 'bids': _levels(bid_levels), 'asks': _levels(ask_levels),
+            'sequence_no': subscription.sequence_no, 'timestamp': int(time.time() * 1_000_000)
+        })
+
+    # REST API
+
+    async def _delay(self):
+        latency = self.order_latency + (self.rng.uniform(0.0, self.latency_jitter) if self.latency_jitter else 0.0)
+        if latency > 0:
+            await asyncio.sleep(latency)
+
+    @staticmethod
+    def _authorized(request: web.Request) -> bool:
+        headers = request.headers
+        return all(headers.get(name) for name in ('X-AUTH-APIKEY', 'X-AUTH-SIGNATURE', 'X-AUTH-EPOCH'))
+
+    async def _handle_place_order(self, request: web.Request) -> web.Response:
+        self.orders_received += 1
+        await self._delay()
+        if not self._authorized(request):
+            return web.json_response({'error': 'Missing authentication headers'}, status=401)
+        try:
+            order = await request.json()
+            symbol, side, quantity = order['symbol'], order['side'], float(order['quantity'])
+            limit = float(order['price']) if order.get('price') else None
+        except (ValueError, KeyError, TypeError) as e:
+            return web.json_response({'error': f"Bad order: {e}"}, status=400)
+
+        market = self.markets.get(symbol)
+        if market is None or side not in ('buy', 'sell'):
+            return web.json_response({'error': f"Unknown symbol or side: {symbol} {side}"}, status=400)
+
+        futures = request.path.startswith('/trade/api/v2/futures')
+        fill_price = market.mark if futures else (market.ask if side == 'buy' else market.bid)
+        marketable = limit is None or (fill_price <= limit if side == 'buy' else fill_price >= limit)
+        order_id = f"LOCAL_{next(self._order_ids)}"
+        result = {
+            'orderId': order_id,
+            'symbol': symbol,
+            'side': side,
+            'quantity': quantity,
+            'price': fill_price if marketable else limit,
+            'status': 'FILLED' if marketable else 'OPEN',
+            'filledQty': quantity if marketable else 0.0,
+            'exchange_type': 'futures' if futures else 'spot',
+            'timestamp': time.time()
+        }
+        self.orders[order_id] = result
+        return web.json_response(result)
+
+    async def _handle_cancel_order(self, request: web.Request) -> web.Response:
+        await self._delay()
+        if not self._authorized(request):
+            return web.json_response({'error': 'Missing authentication headers'}, status=401)
+        order = self.orders.get(request.match_info['order_id'])
+        if order is None or order['status'] != 'OPEN':
+            return web.json_response({'error': 'Order not open'}, status=404)
+        order['status'] = 'CANCELLED'
+        return web.json_response(order)
+
+    async def _handle_get_order(self, request: web.Request) -> web.Response:
+        await self._delay()
+        if not self._authorized(request):
+            return web.json_response({'error': 'Missing authentication headers'}, status=401)
+        order = self.orders.get(request.match_info['order_id'])
+        if order is None:
+            return web.json_response({'error': 'Unknown order'}, status=404)
+        return web.json_response(order)
+
+    async def _handle_portfolio(self, request: web.Request) -> web.Response:
+        await self._delay()
+        if not self._authorized(request):
+            return web.json_response({'error': 'Missing authentication headers'}, status=401)
+        return web.json_response({'data': [{'currency': 'USD', 'balance': '1000000.0', 'locked': '0.0'}]})
+
+    async def _handle_tickers(self, request: web.Request) -> web.Response:
+        """Public perpetual tickers in Delta's GET /v2/tickers shape"""
+        return web.json_response({'success': True, 'result': [
+            {
+                'symbol': market.symbol, 'mark_price': str(market.mark), 'funding_rate': str(market.funding),
+                'volume': market.volume, 'turnover_usd': market.volume * market.price
+            }
+            for market in self.markets.values()
+        ]})
+
+    async def _handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.get_stats())
+
+async def serve(exchange: LocalExchange, stats_interval: float = 5.0):
+    """Run until cancelled, logging throughput every stats_interval seconds"""
+    async with exchange:
+        last_frames, last_time = 0, time.perf_counter()
+        while True:
+            await asyncio.sleep(stats_interval)
+            now = time.perf_counter()
+            stats = exchange.get_stats()
+            rate = (stats['frames_sent'] - last_frames) / (now - last_time)
+            last_frames, last_time = stats['frames_sent'], now
+            logger.info(f"📊 {stats['connections']} connections, {rate:,.0f} msgs/s, {stats['orders_received']} orders")
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Delta Exchange stand-in for load and latency tests")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--symbols', default=','.join(config.TARGET_SYMBOLS), help="Comma separated symbols")
+    parser.add_argument('--rate', type=float, default=1000.0, help="Market data frames per second per connection")
+    parser.add_argument('--order-latency-ms', type=float, default=5.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    exchange = LocalExchange(
+        symbols=[s.strip() for s in args.symbols.split(',') if s.strip()],
+        host=args.host, port=args.port, rate=args.rate,
+        order_latency=args.order_latency_ms / 1000, latency_jitter=args.jitter_ms / 1000, seed=args.seed
+    )
+    try:
+        asyncio.run(serve(exchange))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Logging helpers for the market data hot path
+"""
+
+import time
+import queue
+import atexit
+import logging
+import logging.handlers
+from typing import Dict, List, Optional
+
+class _LazyMessage:
+    """str.format-style message that is only rendered if a handler writes it"""
+    __slots__ = ('fmt', 'args')
+
+    def __init__(self, fmt: str, args: tuple):
+        self.fmt = fmt
+        self.args = args
+
+    def __str__(self) -> str:
+        return self.fmt.format(*self.args) if self.args else self.fmt
+
+class _ChannelState:
+    __slots__ = ('seen', 'window_start', 'window_count', 'suppressed')
+
+    def __init__(self):
+        self.seen = 0
+        self.window_start = 0.0
+        self.window_count = 0
+        self.suppressed = 0
+
+class HotPathLogger:
+    """
+    Sampled, rate-limited, lazily formatted logging for per-tick code paths.
+
+    Each channel (e.g. 'v2/ticker') logs only one in every sample_every calls
+    and at most max_per_second lines per second; 0 disables either limit.
+    Messages use str.format placeholders and are rendered by the handler, so
+    a dropped or disabled line costs a level check and a counter bump.
+    """
+
+    def __init__(self, logger: logging.Logger, sample_every: int = 1, max_per_second: int = 0):
+        self.logger = logger
+        self.sample_every = max(int(sample_every), 1)
+        self.max_per_second = max(int(max_per_second), 0)
+        self._channels: Dict[str, _ChannelState] = {}
+
+    def log(self, level: int, channel: str, fmt: str, *args):
+        """Log fmt.format(*args) on a channel, subject to sampling and rate limits"""
+        if not self.logger.isEnabledFor(level):
+            return
+
+        state = self._channels.get(channel)
+        if state is None:
+            state = self._channels[channel] = _ChannelState()
+        state.seen += 1
+
+        if self.sample_every > 1 and (state.seen - 1) % self.sample_every:
+            state.suppressed += 1
+            return
+
+        if self.max_per_second:
+            now = time.monotonic()
+            if now - state.window_start >= 1.0:
+                state.window_start = now
+                state.window_count = 0
+            if state.window_count >= self.max_per_second:
+                state.suppressed += 1
+                return
+            state.window_count += 1
+
+        if state.suppressed:
+            fmt = fmt + " (+{} suppressed)"
+            args = args + (state.suppressed,)
+            state.suppressed = 0
+        self.logger.log(level, _LazyMessage(fmt, args))
+
+    def debug(self, channel: str, fmt: str, *args):
+        self.log(logging.DEBUG, channel, fmt, *args)
+
+    def info(self, channel: str, fmt: str, *args):
+        self.log(logging.INFO, channel, fmt, *args)
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Calls seen and lines currently suppressed per channel"""
+        return {
+            channel: {'seen': state.seen, 'suppressed': state.suppressed}
+            for channel, state in self._channels.items()
+        }
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that hands the record over as-is.
+
+    The stock prepare() renders the message on the calling thread; here the
+    listener thread does it, so formatting and file I/O both stay off the
+    event loop. Safe because the queue never leaves the process.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+
+def start_queue_logging(logger: logging.Logger, handlers: List[logging.Handler]) -> logging.handlers.QueueListener:
+    """Route logger through an in-memory queue drained by a background thread"""
+    global _queue_listener
+    stop_queue_logging()
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    logger.addHandler(_DeferredQueueHandler(log_queue))
+
+    _queue_listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _queue_listener.start()
+    return _queue_listener
+
+def stop_queue_logging():
+    """Flush and stop the background logging thread, if running"""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+atexit.register(stop_queue_logging)
@@ -5,6 +5,10 @@ from typing import Dict, List, Optional, Tuple
 import config
 import time
 
+import numpy as np
+
+from performance_utils import SimpleCache
+
 logger = logging.getLogger(__name__)
 
 class ArbitrageLogicEngine:
@@ -15,10 +19,19 @@ class ArbitrageLogicEngine:
     def __init__(self, api_client):
         self.api_client = api_client
         self._has_started = False  # Add a flag to manage the initial startup delay
+        self.clock = time.time  # Replaced by a simulated clock when backtesting
         
-        # Simple caching for performance
-        self.opportunity_cache = {}
-        self.cache_expiry = 10  # seconds
+        # Scan results memoized on (symbol, market state version, funding window): per-slot
+        # columns hold what the memo check needs, full dicts are kept only for profitable symbols
+        self.opportunity_cache = SimpleCache(
+            default_ttl=8 * 3600,  # one funding period; the key changes after that anyway
+            max_entries=config.OPPORTUNITY_MEMO_MAX_ENTRIES
+        )
+        self._memo_seq = np.full(0, -1, dtype=np.int64)  # version scanned, -1 = never
+        self._memo_net_profit = np.full(0, np.nan)
+        self._memo_static = np.zeros(0, dtype=bool)
+        self._memo_profitable = np.zeros(0, dtype=bool)
+        self._memo_funding: Optional[datetime] = None
         
         # Precomputed fee rates
         self.fee_rates = {
@@ -69,8 +82,8 @@ class ArbitrageLogicEngine:
                 'error': str(e)
             }
     
-    async def assess_liquidity(self, symbol: str) -> Dict:
-        """Simple liquidity assessment"""
+    async def assess_liquidity(self, symbol: str, position_size: float = None) -> Dict:
+        """Order-book liquidity assessment for both legs at the given position size"""
         try:
             # Get basic ticker data
             spot_price = await self.api_client.get_spot_price(symbol)
@@ -79,19 +92,57 @@ class ArbitrageLogicEngine:
             if not spot_price or not futures_price:
                 return {'is_liquid': False, 'reason': 'Missing price data'}
             
-            # Simple check - assume sufficient liquidity if we have current prices
-            # In a real implementation, you'd check order book depth
-            return {
-                'is_liquid': True,
-                'spot_price': spot_price,
-                'futures_price': futures_price,
-                'estimated_liquidity': config.MIN_LIQUIDITY_QUOTE  # Simplified
-            }
+            position_size = config.POSITION_SIZE_QUOTE if position_size is None else position_size
+            return self._book_liquidity(symbol, spot_price, futures_price, position_size)
             
         except Exception as e:
             logger.error(f"Error assessing liquidity for {symbol}: {e}")
             return {'is_liquid': False, 'reason': str(e)}
     
+    def _book_liquidity(self, symbol: str, spot_price: float, futures_price: float, position_size: float) -> Dict:
+        """
+        Walk the L2 book for the futures sell leg.
+        
+        Only the perpetual's book is streamed (l2_updates); there is no spot
+        book, so the spot leg's slippage is not estimated rather than priced
+        off the wrong book. slippage_cost is the futures leg's VWAP slippage
+        as a fraction, directly comparable with net_profit_percent.
+        """
+        liquidity = {
+            'is_liquid': False,
+            'spot_price': spot_price,
+            'futures_price': futures_price,
+            'estimated_liquidity': 0.0
+        }
+        book = self.api_client.get_order_book(symbol)
+        if book is None:
+            liquidity['reason'] = 'No order book'
+            return liquidity
+        
+        max_slippage = config.MAX_SLIPPAGE_PERCENT / 100
+        futures_fill = book.estimate_fill('sell', position_size)
+        estimated_liquidity = book.depth('sell', max_slippage)
+        
+        liquidity.update({
+            'estimated_liquidity': estimated_liquidity,
+            'futures_vwap': futures_fill['vwap'],
+            'futures_slippage': futures_fill['slippage'],
+            'levels': futures_fill['levels']
+        })
+        
+        if not futures_fill['fully_filled']:
+            liquidity['reason'] = 'Book too thin for position size'
+            return liquidity
+        
+        liquidity['slippage_cost'] = futures_fill['slippage']
+        if futures_fill['slippage'] > max_slippage:
+            liquidity['reason'] = 'Slippage above limit'
+        elif estimated_liquidity < config.MIN_LIQUIDITY_QUOTE:
+            liquidity['reason'] = 'Insufficient depth'
+        else:
+            liquidity['is_liquid'] = True
+        return liquidity
+    
     async def assess_risk(self, symbol: str, position_size: float) -> Dict:
         """Simple risk assessment"""
         try:
@@ -130,24 +181,180 @@ class ArbitrageLogicEngine:
                 'error': str(e)
             }
     
-    def _get_cache_key(self, symbol: str) -> str:
-        """Generate cache key for opportunity"""
-        return f"opportunity_{symbol}_{int(time.time() / self.cache_expiry)}"
+    def _get_cache_key(self, slot: int, version: int, next_funding: datetime) -> Tuple:
+        """Memo key for an opportunity: it stays valid until the symbol's market data changes"""
+        return (int(slot), int(version), next_funding)
+    
+    def _memo_for(self, capacity: int, next_funding: datetime):
+        """Size the memo columns for capacity slots; a new funding window invalidates them all"""
+        if next_funding != self._memo_funding:
+            self._memo_seq[:] = -1
+            self._memo_funding = next_funding
+        size = len(self._memo_seq)
+        if capacity > size:
+            grow = capacity - size
+            self._memo_seq = np.concatenate([self._memo_seq, np.full(grow, -1, dtype=np.int64)])
+            self._memo_net_profit = np.concatenate([self._memo_net_profit, np.full(grow, np.nan)])
+            self._memo_static = np.concatenate([self._memo_static, np.zeros(grow, dtype=bool)])
+            self._memo_profitable = np.concatenate([self._memo_profitable, np.zeros(grow, dtype=bool)])
+    
+    def clear_memo(self):
+        """Forget every memoized scan result"""
+        self._memo_seq[:] = -1
+        self.opportunity_cache.clear()
     
     async def _wait_for_data(self, timeout=30):
         """Waits for the first piece of data to arrive on WebSockets."""
         logger.info("Waiting for initial market data...")
         start_time = time.time()
         while time.time() - start_time < timeout:
-            if self.api_client.spot_prices and self.api_client.futures_data:
+            if self.api_client.has_market_data():
                 logger.info("Initial market data received.")
                 return True
             await asyncio.sleep(1)
         logger.warning("Timeout waiting for initial market data.")
         return False
 
-    async def find_arbitrage_opportunities(self) -> List[Dict]:
-        """Find arbitrage opportunities across all symbols"""
+    def _next_funding_time(self, now: Optional[datetime] = None) -> Tuple[datetime, float]:
+        """Next 8-hourly funding time and the hours remaining until it"""
+        now = now or datetime.fromtimestamp(self.clock())
+        next_funding_hour = ((now.hour // 8) + 1) * 8
+        if next_funding_hour >= 24:
+            next_funding = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        else:
+            next_funding = now.replace(hour=next_funding_hour, minute=0, second=0, microsecond=0)
+        
+        hours_to_funding = (next_funding - now).total_seconds() / 3600
+        return next_funding, hours_to_funding
+
+    def _risk_factors(self, symbol: str, spot_price: float, position_size: float, trading_pairs) -> List[str]:
+        """Human-readable risk factors, matching assess_risk"""
+        risk_factors = []
+        if position_size > config.POSITION_SIZE_QUOTE * 2:
+            risk_factors.append('Large position size')
+        if symbol not in trading_pairs:
+            risk_factors.append('Symbol not in target list')
+        if spot_price < 100:
+            risk_factors.append('Low price - high volatility risk')
+        return risk_factors
+
+    def scan_universe(self, symbols: List[str], spot: np.ndarray, futures: np.ndarray,
+                      funding: np.ndarray, hours_to_funding, next_funding: Optional[datetime] = None,
+                      position_size: float = None,
+                      data_ts: Optional[np.ndarray] = None) -> Tuple[List[Dict], Dict[str, np.ndarray]]:
+        """
+        Vectorized version of analyze_symbol_opportunity for a whole universe.
+        
+        Takes per-symbol arrays (NaN for missing data) and computes basis, net
+        profit, APR and every filter mask in one NumPy pass; order books are
+        only walked for the symbols that survive it. Returns the ranked
+        profitable opportunities plus the raw result columns.
+        
+        data_ts, if given, is the receive time of each symbol's oldest input;
+        symbols older than MAX_DATA_AGE_SECONDS fail the static checks.
+        """
+        position_size = config.POSITION_SIZE_QUOTE if position_size is None else position_size
+        spot = np.asarray(spot, dtype=np.float64)
+        futures = np.asarray(futures, dtype=np.float64)
+        funding = np.asarray(funding, dtype=np.float64)
+        hours = np.broadcast_to(np.asarray(hours_to_funding, dtype=np.float64), spot.shape)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Profitability (same formulas as calculate_profitability)
+            total_fees = (self.fee_rates['spot_taker'] + self.fee_rates['futures_taker']) * 2
+            expected_funding = funding * np.maximum(1.0, hours / 8)
+            net_profit = expected_funding - total_fees
+            basis = (futures - spot) / spot
+            annualized = np.where(hours > 0, (net_profit * 365 * 24) / hours, 0.0)
+            
+            # Missing/zero prices count as missing market data (and as illiquid)
+            has_data = (spot > 0) & (futures > 0) & ~np.isnan(funding)
+            
+            max_age = config.MAX_DATA_AGE_SECONDS
+            if data_ts is not None and max_age > 0:
+                is_stale = np.asarray(data_ts, dtype=np.float64) < self.clock() - max_age
+            else:
+                is_stale = np.zeros(spot.shape, dtype=bool)
+            
+            # Risk (same scoring as assess_risk)
+            risk_score = np.zeros(spot.shape)
+            if position_size > config.POSITION_SIZE_QUOTE * 2:
+                risk_score += 0.3
+            trading_pairs = set(self.api_client.trading_pairs)
+            risk_score += np.fromiter((s not in trading_pairs for s in symbols), dtype=bool, count=len(symbols)) * 0.5
+            risk_score += (spot < 100) * 0.2
+            
+            passes_static_checks = (
+                has_data &
+                ~is_stale &
+                (risk_score < 0.7) &
+                (funding > config.MIN_POSITIVE_FUNDING_RATE)
+            )
+            is_profitable = passes_static_checks & (net_profit > 0) & (annualized > config.MIN_PROFITABLE_APR)
+        
+        columns = {
+            'has_data': has_data,
+            'is_stale': is_stale,
+            'basis': basis,
+            'net_profit_percent': net_profit,
+            'annualized_return': annualized,
+            'risk_score': np.minimum(risk_score, 1.0),
+            'passes_static_checks': passes_static_checks,
+            'is_profitable': is_profitable
+        }
+        
+        # Book walks only for candidates that passed everything else
+        liquidity = {}
+        for i in np.flatnonzero(is_profitable):
+            symbol_liquidity = self._book_liquidity(symbols[i], float(spot[i]), float(futures[i]), position_size)
+            if symbol_liquidity['is_liquid'] and symbol_liquidity['slippage_cost'] < net_profit[i]:
+                liquidity[i] = symbol_liquidity
+            else:
+                is_profitable[i] = False
+                passes_static_checks[i] = False
+        
+        # Only the survivors are materialised as dicts, best APR first
+        candidates = np.flatnonzero(is_profitable)
+        ranked = candidates[np.argsort(-annualized[candidates], kind='stable')]
+        timestamp = self.clock()
+        next_funding_time = next_funding.isoformat() if next_funding else None
+        
+        opportunities = []
+        for i in ranked:
+            symbol = symbols[i]
+            opportunities.append({
+                'symbol': symbol,
+                'timestamp': timestamp,
+                'spot_price': float(spot[i]),
+                'futures_price': float(futures[i]),
+                'funding_rate': float(funding[i]),
+                'hours_to_funding': float(hours[i]),
+                'next_funding_time': next_funding_time,
+                'net_profit_percent': float(net_profit[i]),
+                'annualized_return': float(annualized[i]),
+                'total_fees': total_fees,
+                'basis': float(basis[i]),
+                'liquidity': liquidity[i],
+                'risk': {
+                    'risk_score': float(columns['risk_score'][i]),
+                    'risk_factors': self._risk_factors(symbol, float(spot[i]), position_size, trading_pairs),
+                    'is_acceptable': True,
+                    'max_position_size': config.POSITION_SIZE_QUOTE
+                },
+                'is_profitable': True
+            })
+        
+        return opportunities, columns
+
+    async def find_arbitrage_opportunities(self, symbols: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Find arbitrage opportunities across all symbols (or only the given ones).
+        
+        Results are memoized per symbol on its market state version and the
+        funding window, so an opportunity is reused exactly until a price,
+        mark or funding update for that symbol lands. Only the time-dependent
+        part (APR against hours to funding) is re-derived on reuse.
+        """
         if not self._has_started:
             if await self._wait_for_data():
                 self._has_started = True
@@ -163,48 +370,91 @@ class ArbitrageLogicEngine:
             logger.warning("No trading pairs available in the API client to analyze.")
             return opportunities
 
-        for symbol in trading_pairs:
+        market_state = self.api_client.market_state
+        if symbols is not None:
+            # Match by slot: dirty symbols come back canonical, trading_pairs may use another spelling
+            lookup = market_state.lookup
+            tradable = {lookup(symbol): symbol for symbol in trading_pairs}
+            tradable.pop(None, None)
+            trading_pairs = list(dict.fromkeys(
+                tradable[slot] for slot in map(lookup, symbols) if slot in tradable
+            ))
+        
+        next_funding, hours_to_funding = self._next_funding_time()
+        
+        # Serve memoized symbols whose inputs have not changed, batch-scan the rest. The version
+        # and APR checks run over whole columns; dicts are only touched for memoized opportunities.
+        slots = np.fromiter(map(market_state.slot, trading_pairs), dtype=np.intp, count=len(trading_pairs))
+        self._memo_for(len(market_state.registry), next_funding)
+        versions = market_state.versions_at(slots)
+        hit = self._memo_seq[slots] == versions
+        net_profit = self._memo_net_profit[slots]
+        with np.errstate(invalid='ignore'):
+            annualized = (net_profit * 365 * 24) / hours_to_funding if hours_to_funding > 0 else np.zeros(len(slots))
+            apr_ok = (net_profit > 0) & (annualized > config.MIN_PROFITABLE_APR)
+        profitable = self._memo_profitable[slots]
+        # Symbols that became profitable with time alone need a full result
+        rescan = ~hit | (~profitable & self._memo_static[slots] & apr_ok)
+        
+        memo_hits = []
+        for i in np.flatnonzero(hit & profitable & apr_ok):
+            cached_opp = self.opportunity_cache.get(self._get_cache_key(slots[i], versions[i], next_funding))
+            if cached_opp is None:
+                rescan[i] = True
+                continue
+            refreshed = dict(cached_opp)
+            refreshed['hours_to_funding'] = hours_to_funding
+            refreshed['annualized_return'] = float(annualized[i])
+            memo_hits.append(refreshed)
+        
+        # An unchanged version can still mean a feed went quiet: drop hits whose inputs aged out
+        if memo_hits and config.MAX_DATA_AGE_SECONDS > 0:
+            stale = market_state.snapshot([opp['symbol'] for opp in memo_hits]).stale(
+                config.MAX_DATA_AGE_SECONDS, self.clock()
+            )
+            fresh = []
+            for opportunity, is_stale in zip(memo_hits, stale):
+                if is_stale:
+                    logger.debug(f"⏰ Skipping {opportunity['symbol']}: market data older than {config.MAX_DATA_AGE_SECONDS}s")
+                else:
+                    fresh.append(opportunity)
+            memo_hits = fresh
+        opportunities.extend(memo_hits)
+        
+        to_scan = [trading_pairs[i] for i in np.flatnonzero(rescan)]
+        if to_scan:
             try:
-                # Check cache first
-                cache_key = self._get_cache_key(symbol)
-                if cache_key in self.opportunity_cache:
-                    cached_opp = self.opportunity_cache[cache_key]
-                    if cached_opp.get('is_profitable'):
-                        opportunities.append(cached_opp)
-                    continue
-                
-                # Log current market data for debugging
-                spot_price = await self.api_client.get_spot_price(symbol)
-                futures_data = await self.api_client.get_futures_data(symbol)
-                funding_rate = await self.api_client.get_funding_rate(symbol)
+                # One consistent read of every symbol instead of per-symbol getter calls
+                snapshot = await self.api_client.get_market_snapshot(to_scan)
                 
-                logger.info(f"🔍 Scanning {symbol}:")
-                logger.info(f"  📊 Spot Price: {spot_price}")
-                logger.info(f"  📈 Futures Data: {futures_data}")
-                logger.info(f"  📊 Funding Rate: {funding_rate}")
-                
-                # Analyze opportunity
-                opportunity = await self.analyze_symbol_opportunity(symbol)
+                scan_start = time.perf_counter()
+                found, columns = self.scan_universe(
+                    to_scan, snapshot.spot_price(), snapshot.mark, snapshot.funding,
+                    hours_to_funding, next_funding, data_ts=snapshot.data_ts()
+                )
+                scan_ms = (time.perf_counter() - scan_start) * 1000
+                logger.info(f"🔍 Scanned {len(to_scan)} symbols in {scan_ms:.3f}ms: {len(found)} profitable")
                 
-                # Cache the result
-                self.opportunity_cache[cache_key] = opportunity
+                # Memoize against the exact versions the snapshot read. Everything but the APR test
+                # is kept, so reuse can re-check it as time passes.
+                scanned = snapshot.slots
+                self._memo_seq[scanned] = snapshot.seq
+                self._memo_net_profit[scanned] = columns['net_profit_percent']
+                self._memo_static[scanned] = columns['passes_static_checks']
+                self._memo_profitable[scanned] = columns['is_profitable']
+                position = {to_scan[i]: i for i in np.flatnonzero(columns['is_profitable'])}
+                for opportunity in found:
+                    i = position[opportunity['symbol']]
+                    self.opportunity_cache.set(self._get_cache_key(scanned[i], snapshot.seq[i], next_funding), opportunity)
                 
-                # Clean old cache entries
-                if len(self.opportunity_cache) > 100:
-                    oldest_keys = list(self.opportunity_cache.keys())[:50]
-                    for key in oldest_keys:
-                        del self.opportunity_cache[key]
+                if logger.isEnabledFor(logging.INFO):
+                    for opportunity in found:
+                        logger.info(f"💰 Found profitable opportunity for {opportunity['symbol']}: {opportunity['annualized_return']:.2%} APR")
+                        logger.debug(f"  💰 Opportunity Details: {opportunity}")
+                opportunities.extend(found)
                 
-                if opportunity.get('is_profitable'):
-                    opportunities.append(opportunity)
-                    logger.info(f"💰 Found profitable opportunity for {symbol}: {opportunity.get('expected_apr', 0):.2%} APR")
-                    logger.info(f"  💰 Opportunity Details: {opportunity}")
-                else:
-                    logger.info(f"❌ No profitable opportunity found for {symbol}")
-                    
             except Exception as e:
-                logger.error(f"Error analyzing {symbol}: {e}")
-                continue
+                logger.error(f"Error scanning {len(to_scan)} symbols: {e}")
         
         # Sort by profitability
         opportunities.sort(key=lambda x: x.get('annualized_return', 0), reverse=True)
@@ -232,14 +482,7 @@ class ArbitrageLogicEngine:
                 }
             
             # Calculate time to next funding
-            now = datetime.now()
-            next_funding_hour = ((now.hour // 8) + 1) * 8
-            if next_funding_hour >= 24:
-                next_funding = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
-            else:
-                next_funding = now.replace(hour=next_funding_hour, minute=0, second=0, microsecond=0)
-            
-            hours_to_funding = (next_funding - now).total_seconds() / 3600
+            next_funding, hours_to_funding = self._next_funding_time()
             
             # Calculate profitability
             profitability = await self.calculate_profitability(
@@ -253,7 +496,7 @@ class ArbitrageLogicEngine:
             # Combine analysis
             opportunity = {
                 'symbol': symbol,
-                'timestamp': time.time(),
+                'timestamp': self.clock(),
                 'spot_price': spot_price,
                 'futures_price': futures_price,
                 'funding_rate': funding_rate,
@@ -265,6 +508,8 @@ class ArbitrageLogicEngine:
                 'is_profitable': (
                     profitability.get('is_profitable', False) and
                     liquidity.get('is_liquid', False) and
+                    # A fill that eats the whole edge is not an opportunity
+                    liquidity.get('slippage_cost', 0) < profitability.get('net_profit_percent', 0) and
                     risk.get('is_acceptable', False) and
                     funding_rate > config.MIN_POSITIVE_FUNDING_RATE
                 )
@@ -312,6 +557,13 @@ class ArbitrageLogicEngine:
         try:
             symbol = opportunity['symbol']
             
+            # Prices that stopped updating cannot confirm anything
+            if config.MAX_DATA_AGE_SECONDS > 0:
+                age = self.clock() - self.api_client.market_state.snapshot([symbol]).data_ts()[0]
+                if age > config.MAX_DATA_AGE_SECONDS:
+                    logger.warning(f"Stale market data for {symbol}: oldest input is {age:.1f}s old")
+                    return False
+            
             # Re-check current prices
             current_spot = await self.api_client.get_spot_price(symbol)
             current_futures_data = await self.api_client.get_futures_data(symbol)
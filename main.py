@@ -9,10 +9,28 @@ from dataclasses import dataclass, asdict
 import config
 from api_client import CoinSwitchClient
 from logic_engine import ArbitrageLogicEngine
-from performance_utils import SimpleProfiler
+from performance_utils import SimpleProfiler, cache
+from symbols import normalize
+from log_utils import start_queue_logging
 
 logger = logging.getLogger(__name__)
 
+# Order statuses after which nothing more can fill
+FILLED_STATUSES = ('FILLED', 'EXECUTED')
+CLOSED_STATUSES = FILLED_STATUSES + ('CANCELLED', 'CANCELED', 'REJECTED', 'EXPIRED')
+
+def _order_status(order: Dict) -> str:
+    return str(order.get('status', '')).upper()
+
+def _filled_quantity(order: Dict, quantity: float) -> float:
+    """Quantity of an order that has filled, never more than was ordered"""
+    if _order_status(order) in FILLED_STATUSES:
+        return quantity
+    try:
+        return min(float(order.get('filledQty') or 0), quantity)
+    except (TypeError, ValueError):
+        return 0.0
+
 @dataclass
 class Position:
     """Simple position tracking"""
@@ -26,6 +44,8 @@ class Position:
     spot_order_id: str
     futures_order_id: str
     status: str = "ACTIVE"
+    spot_closed: bool = False
+    futures_closed: bool = False
 
 @dataclass
 class BotStats:
@@ -45,6 +65,7 @@ class ArbitrageBot:
         self.api_client = None
         self.logic_engine = None
         self.profiler = SimpleProfiler()
+        self.clock = time.time  # Replaced by a simulated clock when backtesting
         
         # Position tracking
         self.active_positions: Dict[str, Position] = {}
@@ -56,6 +77,10 @@ class ArbitrageBot:
         # Performance tracking
         self.last_opportunity_check = 0
         self.last_position_check = 0
+        
+        # Event-driven opportunity evaluation
+        self._evaluator_task: Optional[asyncio.Task] = None
+        self._opportunity_lock = asyncio.Lock()
     
     async def initialize(self):
         """Initialize the trading bot"""
@@ -65,10 +90,16 @@ class ArbitrageBot:
             # Initialize API client
             self.api_client = CoinSwitchClient()
             await self.api_client.initialize()
+            if self.api_client.universe:
+                # Never unsubscribe a symbol we hold a position in
+                self.api_client.universe.pinned = lambda: [p.symbol for p in self.active_positions.values()]
             
             # Initialize logic engine
             self.logic_engine = ArbitrageLogicEngine(self.api_client)
             
+            # Expire shared cache entries in the background rather than on access
+            cache.start_expiry()
+            
             logger.info("✓ Bot initialized successfully")
             
         except Exception as e:
@@ -80,6 +111,11 @@ class ArbitrageBot:
         try:
             self.running = False
             
+            if self._evaluator_task and not self._evaluator_task.done():
+                self._evaluator_task.cancel()
+            
+            await cache.stop_expiry()
+            
             if self.api_client:
                 await self.api_client.cleanup()
             
@@ -96,6 +132,9 @@ class ArbitrageBot:
             
             logger.info("🚀 Starting Arbitrage Bot")
             
+            # React to market data as it arrives
+            self._evaluator_task = asyncio.create_task(self._run_opportunity_evaluator())
+            
             # Start main trading loop
             await self._run_trading_loop()
             
@@ -110,8 +149,8 @@ class ArbitrageBot:
         """Main trading loop"""
         while self.running:
             try:
-                # Check for new opportunities
-                if time.time() - self.last_opportunity_check > 30:  # Check every 30 seconds
+                # Safety-net full scan; ticks are handled by the evaluator as they arrive
+                if time.time() - self.last_opportunity_check > config.OPPORTUNITY_FULL_SCAN_INTERVAL:
                     await self._check_opportunities()
                     self.last_opportunity_check = time.time()
                 
@@ -130,18 +169,60 @@ class ArbitrageBot:
                 logger.error(f"Error in trading loop: {e}")
                 await asyncio.sleep(10)
     
-    async def _check_opportunities(self):
-        """Check for arbitrage opportunities"""
+    async def _run_opportunity_evaluator(self):
+        """Re-score symbols as soon as their market data changes"""
+        market_data_event = self.api_client.market_data_event
+        market_state = self.api_client.market_state
+        
+        while self.running:
+            try:
+                await market_data_event.wait()
+                
+                # Let the rest of a burst land so it is scored in one pass
+                if config.OPPORTUNITY_COALESCE_WINDOW_SECONDS > 0:
+                    await asyncio.sleep(config.OPPORTUNITY_COALESCE_WINDOW_SECONDS)
+                
+                # Debounce: never evaluate more often than the configured gap
+                wait = self.last_opportunity_check + config.OPPORTUNITY_DEBOUNCE_SECONDS - time.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                
+                market_data_event.clear()
+                dirty_symbols = market_state.drain_dirty()
+                if dirty_symbols:
+                    await self._check_opportunities(dirty_symbols)
+                    self.last_opportunity_check = time.time()
+                    
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in opportunity evaluator: {e}")
+                await asyncio.sleep(1)
+    
+    async def _check_opportunities(self, symbols: Optional[List[str]] = None):
+        """Check for arbitrage opportunities (all symbols, or only the given ones)"""
+        async with self._opportunity_lock:
+            await self._check_opportunities_locked(symbols)
+    
+    async def _check_opportunities_locked(self, symbols: Optional[List[str]] = None):
         start_time = self.profiler.start_operation("opportunity_check")
         
         try:
             # Skip if we have max positions
             if len(self.active_positions) >= config.MAX_OPEN_POSITIONS:
-                logger.info(f"Max positions reached ({config.MAX_OPEN_POSITIONS})")
+                logger.debug(f"Max positions reached ({config.MAX_OPEN_POSITIONS})")
                 return
             
+            # Never scan a symbol we already hold: one position per symbol
+            held = self._held_symbols()
+            if held:
+                candidates = self.api_client.trading_pairs if symbols is None else symbols
+                symbols = [symbol for symbol in candidates if normalize(symbol) not in held]
+                if not symbols:
+                    return
+            
             # Find opportunities
-            opportunities = await self.logic_engine.find_arbitrage_opportunities()
+            opportunities = await self.logic_engine.find_arbitrage_opportunities(symbols)
             
             if not opportunities:
                 logger.debug("No profitable opportunities found")
@@ -158,6 +239,13 @@ class ArbitrageBot:
         finally:
             self.profiler.end_operation("opportunity_check", start_time)
     
+    def _held_symbols(self) -> set:
+        """Canonical symbols with an open or half-closed position"""
+        return {
+            normalize(position.symbol) for position in self.active_positions.values()
+            if position.status in ("ACTIVE", "CLOSING")
+        }
+    
     async def _execute_arbitrage(self, opportunity: Dict):
         """Execute an arbitrage trade"""
         start_time = self.profiler.start_operation("trade_execution")
@@ -165,6 +253,10 @@ class ArbitrageBot:
         try:
             symbol = opportunity['symbol']
             
+            if normalize(symbol) in self._held_symbols():
+                logger.info(f"Already holding a position in {symbol}, skipping")
+                return
+            
             # Final validation
             if not await self.logic_engine.validate_opportunity(opportunity):
                 logger.warning(f"Opportunity validation failed for {symbol}")
@@ -180,36 +272,40 @@ class ArbitrageBot:
                 return
             
             # Generate trade ID
-            trade_id = f"ARB_{symbol.replace('/', '')}_{int(time.time())}"
+            trade_id = f"ARB_{symbol.replace('/', '')}_{int(self.clock() * 1000)}"
             
             logger.info(f"Executing arbitrage for {symbol} (Trade ID: {trade_id})")
             
-            # Place spot buy order
-            spot_order = await self.api_client.place_order(
-                symbol=symbol,
-                side='buy',
-                quantity=position_sizes['spot_quantity'],
-                price=opportunity['spot_price'] * 1.001,  # Slight premium for execution
-                exchange_type='spot'
-            )
-            
-            if not spot_order:
-                logger.error("Failed to place spot order")
-                return
-            
-            # Place futures sell order
-            futures_order = await self.api_client.place_order(
-                symbol=symbol,
-                side='sell',
-                quantity=position_sizes['futures_quantity'],
-                price=opportunity['futures_price'] * 0.999,  # Slight discount for execution
-                exchange_type='futures'
+            # Fire both legs together so the legging window is one round-trip, not two
+            spot_order, futures_order = await asyncio.gather(
+                self._place_leg(
+                    symbol=symbol,
+                    side='buy',
+                    quantity=position_sizes['spot_quantity'],
+                    price=opportunity['spot_price'] * 1.001,  # Slight premium for execution
+                    exchange_type='spot'
+                ),
+                self._place_leg(
+                    symbol=symbol,
+                    side='sell',
+                    quantity=position_sizes['futures_quantity'],
+                    price=opportunity['futures_price'] * 0.999,  # Slight discount for execution
+                    exchange_type='futures'
+                )
             )
             
-            if not futures_order:
-                logger.error("Failed to place futures order")
-                # Cancel spot order
-                await self.api_client.cancel_order(spot_order['orderId'], symbol, 'spot')
+            if not spot_order or not futures_order:
+                failed = [name for name, order in (('spot', spot_order), ('futures', futures_order)) if not order]
+                logger.error(f"Failed to place {' and '.join(failed)} order for {trade_id}")
+                # Unwind whichever leg did go through
+                await self._compensate_legs(symbol, [
+                    (order, exchange_type, side, quantity)
+                    for order, exchange_type, side, quantity in (
+                        (spot_order, 'spot', 'buy', position_sizes['spot_quantity']),
+                        (futures_order, 'futures', 'sell', position_sizes['futures_quantity'])
+                    )
+                    if order
+                ])
                 return
             
             # Create position record
@@ -217,7 +313,7 @@ class ArbitrageBot:
                 trade_id=trade_id,
                 symbol=symbol,
                 position_size=position_sizes['spot_quantity'],
-                entry_time=datetime.now(),
+                entry_time=datetime.fromtimestamp(self.clock()),
                 entry_spot_price=opportunity['spot_price'],
                 entry_futures_price=opportunity['futures_price'],
                 funding_rate=opportunity['funding_rate'],
@@ -242,8 +338,8 @@ class ArbitrageBot:
             
             for trade_id, position in self.active_positions.items():
                 try:
-                    # Check if position should be closed
-                    should_close = await self._should_close_position(position)
+                    # Finish unwinding half-closed positions, otherwise check if it should close
+                    should_close = position.status == "CLOSING" or await self._should_close_position(position)
                     
                     if should_close:
                         positions_to_close.append(trade_id)
@@ -264,7 +360,7 @@ class ArbitrageBot:
         """Determine if a position should be closed"""
         try:
             # Close after 8 hours (one funding period)
-            time_open = datetime.now() - position.entry_time
+            time_open = datetime.fromtimestamp(self.clock()) - position.entry_time
             if time_open > timedelta(hours=24):
                 logger.info(f"Position {position.trade_id} held for {time_open}, closing")
                 return True
@@ -292,23 +388,30 @@ class ArbitrageBot:
             
             logger.info(f"Closing position: {trade_id}")
             
-            # Close spot position (sell)
-            spot_close_order = await self.api_client.place_order(
-                symbol=position.symbol,
-                side='sell',
-                quantity=position.position_size,
-                exchange_type='spot'
-            )
-            
-            # Close futures position (buy)
-            futures_close_order = await self.api_client.place_order(
-                symbol=position.symbol,
-                side='buy',
-                quantity=position.position_size,
-                exchange_type='futures'
-            )
-            
-            if spot_close_order and futures_close_order:
+            # Close whichever legs are still open, both at once
+            legs = []
+            if not position.spot_closed:
+                legs.append(self._place_leg(
+                    symbol=position.symbol,
+                    side='sell',
+                    quantity=position.position_size,
+                    exchange_type='spot'
+                ))
+            if not position.futures_closed:
+                legs.append(self._place_leg(
+                    symbol=position.symbol,
+                    side='buy',
+                    quantity=position.position_size,
+                    exchange_type='futures'
+                ))
+            
+            results = iter(await asyncio.gather(*legs))
+            if not position.spot_closed:
+                position.spot_closed = bool(next(results))
+            if not position.futures_closed:
+                position.futures_closed = bool(next(results))
+            
+            if position.spot_closed and position.futures_closed:
                 # Mark position as closed
                 position.status = "CLOSED"
                 
@@ -321,13 +424,90 @@ class ArbitrageBot:
                 
                 logger.info(f"✓ Position closed: {trade_id}")
             else:
-                logger.error(f"Failed to close position: {trade_id}")
+                # A half-closed position is retried on the next monitoring pass
+                position.status = "CLOSING"
+                open_legs = [name for name, closed in (('spot', position.spot_closed), ('futures', position.futures_closed)) if not closed]
+                logger.error(f"Failed to close {' and '.join(open_legs)} leg of position: {trade_id}")
                 
         except Exception as e:
             logger.error(f"Error closing position {trade_id}: {e}")
         finally:
             self.profiler.end_operation("position_closing", start_time)
     
+    async def _place_leg(self, symbol: str, side: str, quantity: float, price: float = None,
+                         exchange_type: str = 'spot') -> Optional[Dict]:
+        """Place one leg of a trade, recording its submit-to-ack latency"""
+        start_time = self.profiler.start_operation(f"order_ack_{exchange_type}")
+        try:
+            return await self.api_client.place_order(
+                symbol=symbol,
+                side=side,
+                quantity=quantity,
+                price=price,
+                exchange_type=exchange_type
+            )
+        except Exception as e:
+            logger.error(f"Error placing {exchange_type} {side} order for {symbol}: {e}")
+            return None
+        finally:
+            self.profiler.end_operation(f"order_ack_{exchange_type}", start_time)
+    
+    async def _compensate_legs(self, symbol: str, legs: List[tuple]):
+        """Unwind filled legs of a failed trade, all at once ([(order, exchange_type, side, quantity)])"""
+        results = await asyncio.gather(
+            *(self._compensate_leg(symbol, *leg) for leg in legs),
+            return_exceptions=True
+        )
+        for (order, exchange_type, _, _), result in zip(legs, results):
+            if result is not True:
+                logger.error(f"⚠️ Could not unwind {exchange_type} order {order.get('orderId')} for {symbol}: "
+                             f"{result if isinstance(result, Exception) else 'no response'}")
+    
+    async def _compensate_leg(self, symbol: str, order: Dict, exchange_type: str, side: str, quantity: float) -> bool:
+        """Cancel whatever is still resting of an order and trade out of whatever has filled"""
+        order_id = order['orderId']
+        resolved = True
+        
+        if _order_status(order) in FILLED_STATUSES:
+            filled = quantity
+        else:
+            cancelled = await self.api_client.cancel_order(order_id, exchange_type)
+            if cancelled:
+                logger.info(f"Cancelled {exchange_type} order {order_id} for {symbol}")
+                # Whatever filled before the cancel landed still has to be unwound
+                filled = _filled_quantity(cancelled, quantity) if isinstance(cancelled, dict) else 0.0
+            else:
+                # The cancel may have lost a race against a fill, or part of one: find out before trading
+                status = await self.api_client.get_order(order_id, exchange_type)
+                if not status:
+                    logger.error(f"🚨 Cannot confirm {exchange_type} order {order_id} for {symbol} after a failed cancel; "
+                                 f"not reversing blind, check this position manually")
+                    return False
+                filled = _filled_quantity(status, quantity)
+                if _order_status(status) not in CLOSED_STATUSES:
+                    # Partially filled and still resting: take the rest off the book first
+                    if await self.api_client.cancel_order(order_id, exchange_type):
+                        logger.info(f"Cancelled the unfilled rest of {exchange_type} order {order_id} for {symbol}")
+                    else:
+                        logger.error(f"🚨 Could not cancel the unfilled rest of {exchange_type} order {order_id} "
+                                     f"for {symbol}; check this order manually")
+                        resolved = False
+        
+        if filled <= 0:
+            return resolved
+        
+        # Reverse only what actually filled, at market
+        reverse_side = 'sell' if side == 'buy' else 'buy'
+        reverse_order = await self._place_leg(
+            symbol=symbol,
+            side=reverse_side,
+            quantity=filled,
+            exchange_type=exchange_type
+        )
+        if reverse_order:
+            logger.info(f"Reversed {filled} of {exchange_type} {side} for {symbol} with order {reverse_order.get('orderId')}")
+        return bool(reverse_order) and resolved
+    
     async def _update_stats(self):
         """Update bot statistics"""
         try:
@@ -348,11 +528,34 @@ class ArbitrageBot:
             logger.info(f"Active Positions: {self.stats.active_positions}")
             logger.info(f"Total Trades: {self.stats.total_trades}")
             
-            # Log profiler metrics
-            for operation, metrics in self.profiler.metrics.items():
-                if metrics:
-                    avg_time = sum(m.duration_ms for m in metrics) / len(metrics)
-                    logger.info(f"{operation}: avg {avg_time:.1f}ms ({len(metrics)} samples)")
+            # Log profiler tail latencies over the last 5 minutes; the tail is what costs fills
+            for operation, stats in self.profiler.get_all_stats(window_seconds=300).items():
+                if stats:
+                    logger.info(f"{operation}: p50 {stats['p50_ms']:.1f}ms, p99 {stats['p99_ms']:.1f}ms, "
+                                f"p99.9 {stats['p999_ms']:.1f}ms, max {stats['max_ms']:.1f}ms ({stats['count']} samples)")
+            
+            if self.api_client and config.MAX_DATA_AGE_SECONDS > 0:
+                stale = self.api_client.market_state.stale_symbols(config.MAX_DATA_AGE_SECONDS, ('mark', 'funding'))
+                if stale:
+                    logger.info(f"Stale symbols (no mark/funding for {config.MAX_DATA_AGE_SECONDS:.0f}s): {len(stale)}")
+            
+            shard_manager = self.api_client.shard_manager if self.api_client else None
+            if shard_manager:
+                for shard in shard_manager.get_stats():
+                    logger.info(f"Shard {shard['shard']}: {shard['msgs_per_s']:,.0f} msgs/s, {shard['symbols']} symbols, "
+                                f"backlog {shard['backlog']}, {shard['reconnects']} reconnects")
+            
+            universe = self.api_client.universe if self.api_client else None
+            if universe:
+                stats = universe.get_stats()
+                logger.info(f"Universe: {stats['symbols']} of {stats['candidates']} candidate symbols "
+                            f"(+{stats['last_added']} / -{stats['last_removed']} at the last refresh)")
+            
+            ingest_pool = self.api_client.ingest_pool if self.api_client else None
+            if ingest_pool:
+                for worker in ingest_pool.get_stats():
+                    logger.info(f"Ingest worker {worker['worker']}: {'up' if worker['alive'] else 'DOWN'}, "
+                                f"{worker['symbols']} symbols, {worker['batches']:,} batches")
             
             logger.info("=" * 30)
             
@@ -386,18 +589,19 @@ def setup_logging():
             logger.removeHandler(handler)
         logger.setLevel(logging.DEBUG)
         
-        # Add console handler
+        # Console handler
         console_handler = logging.StreamHandler()
         console_handler.setLevel(logging.INFO)
         console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
         
-        # Add file handler
+        # File handler
         log_file = os.path.join(log_dir, f'bot_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log')
         file_handler = logging.FileHandler(log_file)
         file_handler.setLevel(logging.DEBUG)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        
+        # Both are fed from a queue so formatting and file I/O run off the event loop
+        start_queue_logging(logger, [console_handler, file_handler])
         
         # Set specific log levels for noisy libraries
         logging.getLogger('asyncio').setLevel(logging.WARNING)
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Columnar market state store for the trading bot
+"""
+
+import time
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from dataclasses import dataclass
+
+import numpy as np
+
+from symbols import SymbolRegistry
+
+logger = logging.getLogger(__name__)
+
+# Value columns, in storage order
+FIELDS = ('bid', 'ask', 'last', 'mark', 'funding')
+FIELD_INDEX = {name: i for i, name in enumerate(FIELDS)}
+BID, ASK, LAST, MARK, FUNDING = range(len(FIELDS))
+
+@dataclass
+class MarketSnapshot:
+    """Point-in-time copy of the market state for a set of symbols"""
+    symbols: List[str]
+    slots: np.ndarray
+    bid: np.ndarray
+    ask: np.ndarray
+    last: np.ndarray
+    mark: np.ndarray
+    funding: np.ndarray
+    update_ts: np.ndarray
+    seq: np.ndarray
+    field_ts: np.ndarray  # (symbols x fields) receive time of each value, 0 if never written
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def spot_price(self) -> np.ndarray:
+        """Spot price per symbol: last trade, else mid, else whichever side is quoted"""
+        bid = np.where(self.bid > 0, self.bid, np.nan)
+        ask = np.where(self.ask > 0, self.ask, np.nan)
+        spot = np.where(self.last > 0, self.last, (bid + ask) / 2)
+        spot = np.where(np.isnan(spot), ask, spot)
+        return np.where(np.isnan(spot), bid, spot)
+
+    def spot_ts(self) -> np.ndarray:
+        """Receive time of the field(s) spot_price() used for each symbol (0 if none)"""
+        ts = self.field_ts
+        has_bid, has_ask = self.bid > 0, self.ask > 0
+        quote_ts = np.where(has_ask, ts[:, ASK], np.where(has_bid, ts[:, BID], 0.0))
+        quote_ts = np.where(has_bid & has_ask, np.minimum(ts[:, BID], ts[:, ASK]), quote_ts)
+        return np.where(self.last > 0, ts[:, LAST], quote_ts)
+
+    def data_ts(self) -> np.ndarray:
+        """Receive time of the oldest input a funding arb scan uses (spot, mark, funding)"""
+        return np.minimum(self.spot_ts(), np.minimum(self.field_ts[:, MARK], self.field_ts[:, FUNDING]))
+
+    def stale(self, max_age: float, now: Optional[float] = None) -> np.ndarray:
+        """Mask of symbols whose spot, mark or funding is older than max_age seconds"""
+        now = time.time() if now is None else now
+        return self.data_ts() < now - max_age
+
+class MarketStateStore:
+    """
+    Array-backed market state keyed by symbol slot.
+
+    Every symbol gets a fixed slot the first time it is seen: its ID in the
+    SymbolRegistry, so any alias (BTC/USD, MARK:BTCUSD) lands in the same
+    row and hot paths can write by ID directly. Values live
+    in a (slots x fields) float64 array with NaN meaning "not received yet", so
+    a whole-universe snapshot is a handful of array copies.
+
+    Each slot carries a seqlock counter: a writer makes it odd before touching
+    the row and even again afterwards. Readers never block; they copy the row
+    and retry if the counter was odd or moved underneath them, so a bid from
+    one tick is never paired with an ask from the next. There is a single
+    writer (the ingest path), readers can be anywhere.
+
+    Written slots are also flagged dirty until drain_dirty() collects them,
+    and on_update (if set) is called after every write so consumers can react
+    to changes instead of polling.
+
+    Next to every value sit two timestamps: when it was received and, if the
+    writer passed one, when the exchange stamped it. Several feeds write the
+    same field (last comes from trades, tickers and the L1 mid), so age is
+    tracked per field rather than per row.
+    """
+
+    def __init__(self, symbols: Iterable[str] = (), capacity: int = 64, max_read_retries: int = 100,
+                 registry: Optional[SymbolRegistry] = None):
+        self.registry = registry if registry is not None else SymbolRegistry()
+        capacity = max(int(capacity), len(self.registry), 1)
+        self._values = np.full((capacity, len(FIELDS)), np.nan)
+        self._update_ts = np.zeros(capacity)
+        self._field_ts = np.zeros((capacity, len(FIELDS)))
+        self._exchange_ts = np.zeros((capacity, len(FIELDS)))
+        self._seq = np.zeros(capacity, dtype=np.int64)
+        self._dirty = np.zeros(capacity, dtype=bool)
+        self.max_read_retries = max_read_retries
+        self.torn_reads = 0
+        self.on_update: Optional[Callable[[], None]] = None
+
+        for symbol in symbols:
+            self.slot(symbol)
+
+    def __len__(self) -> int:
+        return len(self.registry)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.registry
+
+    @property
+    def symbols(self) -> List[str]:
+        """Canonical symbols in slot order"""
+        return self.registry.names
+
+    @property
+    def capacity(self) -> int:
+        return self._values.shape[0]
+
+    def slot(self, symbol: str) -> int:
+        """Get the slot index for a symbol, assigning a new one if needed"""
+        slot = self.registry.register(symbol)
+        if slot >= self.capacity:
+            self._grow(max(self.capacity * 2, slot + 1))
+        return slot
+
+    def lookup(self, symbol: str) -> Optional[int]:
+        """Slot index of a symbol under any alias, or None (never assigns)"""
+        return self.registry.id(symbol)
+
+    def _grow(self, capacity: int):
+        """Reallocate the columns with room for more symbols"""
+        values = np.full((capacity, len(FIELDS)), np.nan)
+        values[:self.capacity] = self._values
+        update_ts = np.zeros(capacity)
+        update_ts[:self.capacity] = self._update_ts
+        field_ts = np.zeros((capacity, len(FIELDS)))
+        field_ts[:self.capacity] = self._field_ts
+        exchange_ts = np.zeros((capacity, len(FIELDS)))
+        exchange_ts[:self.capacity] = self._exchange_ts
+        seq = np.zeros(capacity, dtype=np.int64)
+        seq[:self.capacity] = self._seq
+        dirty = np.zeros(capacity, dtype=bool)
+        dirty[:self.capacity] = self._dirty
+
+        self._values, self._update_ts, self._seq, self._dirty = values, update_ts, seq, dirty
+        self._field_ts, self._exchange_ts = field_ts, exchange_ts
+        logger.debug(f"Market state grown to {capacity} slots")
+
+    def _notify(self):
+        if self.on_update is not None:
+            self.on_update()
+
+    def _write(self, symbol: str, fields: Dict[str, float], timestamp: float,
+               exchange_ts: Optional[Dict[str, float]] = None):
+        self._write_slot(self.slot(symbol), fields, timestamp, exchange_ts)
+
+    def _write_slot(self, slot: int, fields: Dict[str, float], timestamp: float,
+                    exchange_ts: Optional[Dict[str, float]] = None):
+        row = self._values[slot]
+        row_ts = self._field_ts[slot]
+        self._seq[slot] += 1  # odd: write in progress
+        for name, value in fields.items():
+            index = FIELD_INDEX[name]
+            row[index] = value
+            row_ts[index] = timestamp
+        if exchange_ts:
+            row_exchange_ts = self._exchange_ts[slot]
+            for name, value in exchange_ts.items():
+                row_exchange_ts[FIELD_INDEX[name]] = value
+        self._update_ts[slot] = timestamp
+        self._seq[slot] += 1  # even: row is consistent again
+        self._dirty[slot] = True
+
+    def update(self, symbol: str, timestamp: Optional[float] = None, **fields: float):
+        """Write one or more fields for a symbol"""
+        if not fields:
+            return
+        self._write(symbol, fields, timestamp if timestamp is not None else time.time())
+        self._notify()
+
+    def update_many(self, updates: Dict[str, Dict[str, float]], timestamp: Optional[float] = None,
+                    exchange_ts: Optional[Dict[str, Dict[str, float]]] = None):
+        """
+        Write fields for many symbols at once ({symbol: {field: value}}).
+        
+        exchange_ts optionally carries the exchange's own time (epoch seconds)
+        for the same values, in the same {symbol: {field: ts}} shape.
+        """
+        timestamp = timestamp if timestamp is not None else time.time()
+        exchange_ts = exchange_ts or {}
+        for symbol, fields in updates.items():
+            if fields:
+                self._write(symbol, fields, timestamp, exchange_ts.get(symbol))
+        if updates:
+            self._notify()
+
+    def update_by_slot(self, updates: Dict[int, Dict[str, float]], timestamp: Optional[float] = None,
+                       exchange_ts: Optional[Dict[int, Dict[str, float]]] = None):
+        """update_many for callers that already resolved symbols to slots ({slot: {field: value}})"""
+        timestamp = timestamp if timestamp is not None else time.time()
+        exchange_ts = exchange_ts or {}
+        for slot, fields in updates.items():
+            if fields:
+                self._write_slot(slot, fields, timestamp, exchange_ts.get(slot))
+        if updates:
+            self._notify()
+
+    def update_column(self, field: str, symbols: List[str], values: np.ndarray,
+                      timestamp: Optional[float] = None):
+        """Write a single field for many symbols from an array"""
+        slots = np.fromiter((self.slot(s) for s in symbols), dtype=np.intp, count=len(symbols))
+        self.update_slots(field, slots, values, timestamp)
+
+    def update_slots(self, field: str, slots: np.ndarray, values: np.ndarray,
+                     timestamp: Optional[float] = None):
+        """Write a single field for already-assigned slots (slots must be unique)"""
+        timestamp = timestamp if timestamp is not None else time.time()
+        index = FIELD_INDEX[field]
+        self._seq[slots] += 1
+        self._values[slots, index] = values
+        self._field_ts[slots, index] = timestamp
+        self._update_ts[slots] = timestamp
+        self._seq[slots] += 1
+        self._dirty[slots] = True
+        self._notify()
+
+    def drain_dirty(self) -> List[str]:
+        """Return the symbols written since the last drain and clear their flags"""
+        slots = np.flatnonzero(self._dirty[:len(self.registry)])
+        self._dirty[slots] = False
+        name = self.registry.name
+        return [name(i) for i in slots]
+
+    def _read_slot(self, slot: int):
+        """Seqlock read of one row; returns (values, update_ts, seq, field_ts) or None if torn"""
+        for _ in range(self.max_read_retries):
+            seq = self._seq[slot]
+            if not seq & 1:
+                values = self._values[slot].copy()
+                update_ts = self._update_ts[slot]
+                field_ts = self._field_ts[slot].copy()
+                if self._seq[slot] == seq:
+                    return values, update_ts, seq, field_ts
+            # Let a writer on another thread finish its update before retrying
+            time.sleep(0)
+        self.torn_reads += 1
+        logger.warning(f"Torn read on market state slot {slot} after {self.max_read_retries} retries")
+        return None
+
+    def version(self, symbol: str) -> int:
+        """Get the write version of a symbol (0 if never written)"""
+        slot = self.registry.id(symbol)
+        return 0 if slot is None else int(self._seq[slot])
+
+    def version_at(self, slot: int) -> int:
+        """version() for an already-resolved slot"""
+        return int(self._seq[slot])
+
+    def versions_at(self, slots: np.ndarray) -> np.ndarray:
+        """version_at() for an array of slots, in one read"""
+        return self._seq[slots]
+
+    def get(self, symbol: str) -> Optional[Dict[str, float]]:
+        """Get all fields for a symbol, or None if it has never been written"""
+        slot = self.registry.id(symbol)
+        if slot is None:
+            return None
+        result = self._read_slot(slot)
+        if result is None:
+            return None
+        values, update_ts, seq, _ = result
+        state = {name: float(values[i]) for i, name in enumerate(FIELDS)}
+        state['update_ts'] = float(update_ts)
+        state['seq'] = int(seq)
+        return state
+
+    def get_field(self, symbol: str, field: str) -> Optional[float]:
+        """Get a single field for a symbol, or None if it is not set"""
+        slot = self.registry.id(symbol)
+        if slot is None:
+            return None
+        # A single float64 load cannot tear, so no seqlock round-trip is needed
+        value = self._values[slot, FIELD_INDEX[field]]
+        return None if np.isnan(value) else float(value)
+
+    def field_timestamps(self, symbol: str) -> Optional[Dict[str, Tuple[float, float]]]:
+        """(received, exchange) time per field for a symbol; 0 where unknown"""
+        slot = self.registry.id(symbol)
+        if slot is None:
+            return None
+        received, exchange = self._field_ts[slot], self._exchange_ts[slot]
+        return {name: (float(received[i]), float(exchange[i])) for i, name in enumerate(FIELDS)}
+
+    def stale_mask(self, max_age: float, fields: Iterable[str] = FIELDS,
+                   now: Optional[float] = None) -> np.ndarray:
+        """
+        Mask over all symbols (slot order) where any of the given fields is
+        older than max_age seconds or was never received. One comparison over
+        the timestamp columns, however large the universe.
+        """
+        now = time.time() if now is None else now
+        columns = [FIELD_INDEX[name] for name in fields]
+        oldest = self._field_ts[:len(self.registry), columns].min(axis=1)
+        return oldest < now - max_age
+
+    def stale_symbols(self, max_age: float, fields: Iterable[str] = FIELDS,
+                      now: Optional[float] = None) -> List[str]:
+        """Symbols with any of the given fields older than max_age seconds"""
+        name = self.registry.name
+        return [name(i) for i in np.flatnonzero(self.stale_mask(max_age, fields, now))]
+
+    def has_data(self, field: str) -> bool:
+        """Check whether any symbol has a value for the given field"""
+        count = len(self.registry)
+        return bool(np.any(~np.isnan(self._values[:count, FIELD_INDEX[field]])))
+
+    def snapshot(self, symbols: Optional[Iterable[str]] = None) -> MarketSnapshot:
+        """Copy the state of the given symbols (default: all) in one call"""
+        if symbols is None:
+            names = self.registry.names
+            slots = np.arange(len(names), dtype=np.intp)
+        else:
+            names = list(symbols)
+            slots = np.fromiter((self.slot(s) for s in names), dtype=np.intp, count=len(names))
+
+        seq = self._seq[slots]
+        values = self._values[slots]
+        update_ts = self._update_ts[slots]
+        field_ts = self._field_ts[slots]
+
+        # Re-read any row a writer touched while we were copying
+        torn = np.flatnonzero((seq & 1) | (self._seq[slots] != seq))
+        for i in torn:
+            result = self._read_slot(slots[i])
+            if result is None:
+                values[i] = np.nan
+                continue
+            values[i], update_ts[i], seq[i], field_ts[i] = result
+
+        return MarketSnapshot(
+            symbols=names,
+            slots=slots,
+            bid=values[:, BID],
+            ask=values[:, ASK],
+            last=values[:, LAST],
+            mark=values[:, MARK],
+            funding=values[:, FUNDING],
+            update_ts=update_ts,
+            seq=seq,
+            field_ts=field_ts
+        )
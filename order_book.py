@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+L2 order book maintenance and fill-cost estimation
+"""
+
+import time
+import logging
+from operator import mul
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Level = Tuple[float, float]  # (price, size)
+
+class BookSide:
+    """
+    One side of a book as parallel sorted arrays, best level first.
+
+    Prices are stored as sort keys (ask price, or negated bid price) so both
+    sides ascend and bisect finds a level in O(log n); inserting or removing
+    a level is a single list insert/delete.
+    """
+
+    __slots__ = ('is_bid', 'keys', 'sizes')
+
+    def __init__(self, is_bid: bool):
+        self.is_bid = is_bid
+        self.keys: List[float] = []
+        self.sizes: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _key(self, price: float) -> float:
+        return -price if self.is_bid else price
+
+    def price_at(self, index: int) -> float:
+        key = self.keys[index]
+        return -key if self.is_bid else key
+
+    def clear(self):
+        self.keys.clear()
+        self.sizes.clear()
+
+    def load(self, levels: Iterable[Level]):
+        """Replace the side with a full set of (price, size) levels"""
+        book = sorted((self._key(price), size) for price, size in levels if size > 0)
+        self.keys = [key for key, _ in book]
+        self.sizes = [size for _, size in book]
+
+    def set_level(self, price: float, size: float):
+        """Set the size at a price; size 0 removes the level"""
+        key = self._key(price)
+        i = bisect_left(self.keys, key)
+        exists = i < len(self.keys) and self.keys[i] == key
+        if size > 0:
+            if exists:
+                self.sizes[i] = size
+            else:
+                self.keys.insert(i, key)
+                self.sizes.insert(i, size)
+        elif exists:
+            del self.keys[i]
+            del self.sizes[i]
+
+    def best(self) -> Optional[Level]:
+        if not self.keys:
+            return None
+        return self.price_at(0), self.sizes[0]
+
+    def levels(self, depth: Optional[int] = None) -> List[Level]:
+        """Best-first (price, size) levels"""
+        count = len(self.keys) if depth is None else min(depth, len(self.keys))
+        return [(self.price_at(i), self.sizes[i]) for i in range(count)]
+
+    def walk(self, quote_amount: float) -> Tuple[float, float, float, int]:
+        """
+        Consume up to quote_amount of notional from the best level outward.
+
+        Returns (base filled, quote filled, worst price touched, levels touched);
+        only the levels actually needed are visited.
+        """
+        base_filled = 0.0
+        quote_filled = 0.0
+        worst_price = 0.0
+        touched = 0
+        for i in range(len(self.keys)):
+            if quote_filled >= quote_amount:
+                break
+            price = self.price_at(i)
+            level_quote = price * self.sizes[i]
+            take = min(level_quote, quote_amount - quote_filled)
+            base_filled += take / price
+            quote_filled += take
+            worst_price = price
+            touched += 1
+        return base_filled, quote_filled, worst_price, touched
+
+    def depth_within(self, max_price_move: float) -> float:
+        """Quote notional resting within max_price_move (fraction) of the best price"""
+        if not self.keys:
+            return 0.0
+        best_key = self.keys[0]
+        # Keys ascend away from the touch on both sides
+        limit_key = best_key + abs(best_key) * max_price_move
+        end = bisect_right(self.keys, limit_key)
+        # Every key on a side has the same sign, so |sum(key * size)| is the notional
+        return abs(sum(map(mul, self.keys[:end], self.sizes[:end])))
+
+class OrderBook:
+    """L2 book for one symbol, built from a snapshot and kept current by deltas"""
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.bids = BookSide(is_bid=True)
+        self.asks = BookSide(is_bid=False)
+        self.sequence_no: Optional[int] = None
+        self.update_ts = 0.0
+        self.is_synced = False
+        # A resync was requested for the current gap; further deltas are dropped quietly until the snapshot
+        self.resync_pending = False
+
+    def apply_snapshot(self, bids: Iterable[Level], asks: Iterable[Level],
+                       sequence_no: Optional[int] = None, timestamp: Optional[float] = None):
+        """Replace the whole book"""
+        self.bids.load(bids)
+        self.asks.load(asks)
+        self.sequence_no = sequence_no
+        self.update_ts = timestamp if timestamp is not None else time.time()
+        self.is_synced = True
+        self.resync_pending = False
+
+    def apply_delta(self, bids: Iterable[Level], asks: Iterable[Level],
+                    sequence_no: Optional[int] = None, timestamp: Optional[float] = None) -> bool:
+        """
+        Apply changed levels (size 0 deletes). Returns False, and marks the book
+        out of sync until the next snapshot, if a sequence number was skipped.
+        A delta the book already covers (sequence at or below its own, e.g. a
+        frame still queued on a connection the symbol moved off) is ignored.
+        """
+        if not self.is_synced:
+            return False
+        if sequence_no is not None and self.sequence_no is not None and sequence_no <= self.sequence_no:
+            return True
+        if sequence_no is not None and self.sequence_no is not None and sequence_no != self.sequence_no + 1:
+            logger.warning(f"⚠️ {self.symbol} order book sequence gap: {self.sequence_no} -> {sequence_no}, waiting for snapshot")
+            self.is_synced = False
+            return False
+
+        for price, size in bids:
+            self.bids.set_level(price, size)
+        for price, size in asks:
+            self.asks.set_level(price, size)
+        if sequence_no is not None:
+            self.sequence_no = sequence_no
+        self.update_ts = timestamp if timestamp is not None else time.time()
+        return True
+
+    def await_snapshot(self):
+        """Treat the book as out of sync, without requesting a resync, until the next snapshot"""
+        self.is_synced = False
+        self.resync_pending = True
+
+    def best_bid(self) -> Optional[float]:
+        best = self.bids.best()
+        return best[0] if best else None
+
+    def best_ask(self) -> Optional[float]:
+        best = self.asks.best()
+        return best[0] if best else None
+
+    def top_of_book(self) -> Dict[str, float]:
+        """Best bid/ask as market state fields"""
+        fields = {}
+        bid, ask = self.best_bid(), self.best_ask()
+        if bid:
+            fields['bid'] = bid
+        if ask:
+            fields['ask'] = ask
+        return fields
+
+    def vwap(self, side: str, quote_amount: float) -> Optional[float]:
+        """Average price to buy or sell quote_amount of notional, or None if the book is too thin"""
+        estimate = self.estimate_fill(side, quote_amount)
+        return estimate['vwap'] if estimate['fully_filled'] else None
+
+    def estimate_fill(self, side: str, quote_amount: float) -> Dict:
+        """
+        Cost of a market order for quote_amount of notional.
+
+        side is the order side: 'buy' walks the asks, 'sell' walks the bids.
+        slippage is the VWAP's distance from the best price as a fraction.
+        """
+        book_side = self.asks if side == 'buy' else self.bids
+        best = book_side.best()
+        if best is None or quote_amount <= 0:
+            return {'vwap': None, 'best_price': None, 'slippage': None, 'filled_quote': 0.0,
+                    'levels': 0, 'fully_filled': False}
+
+        base_filled, quote_filled, worst_price, touched = book_side.walk(quote_amount)
+        vwap = quote_filled / base_filled if base_filled else None
+        best_price = best[0]
+        return {
+            'vwap': vwap,
+            'best_price': best_price,
+            'worst_price': worst_price,
+            'slippage': abs(vwap - best_price) / best_price if vwap else None,
+            'filled_quote': quote_filled,
+            'levels': touched,
+            'fully_filled': quote_filled >= quote_amount * (1 - 1e-9)
+        }
+
+    def depth(self, side: str, max_price_move: float) -> float:
+        """Quote notional available to a buy/sell order within max_price_move of the touch"""
+        return (self.asks if side == 'buy' else self.bids).depth_within(max_price_move)
+
+def parse_levels(levels) -> List[Level]:
+    """Normalise Delta level lists ([price, size] pairs or {'limit_price'/'price', 'size'} dicts)"""
+    parsed = []
+    for level in levels or ():
+        if isinstance(level, dict):
+            price = level.get('limit_price', level.get('price'))
+            size = level.get('size', level.get('depth'))
+        else:
+            price, size = level[0], level[1]
+        parsed.append((float(price), float(size)))
+    return parsed
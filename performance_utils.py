@@ -4,25 +4,158 @@ Simplified performance utilities for trading bot
 """
 
 import time
+import asyncio
 import logging
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Set, Tuple
 
 logger = logging.getLogger(__name__)
 
-@dataclass
-class LatencyMetric:
-    """Simple latency tracking"""
-    operation: str
-    duration_ms: float
-    timestamp: float
+class LatencyHistogram:
+    """
+    Fixed-memory log-linear latency histogram (HDR-style), in microseconds.
+
+    Values below 2**sub_bucket_bits are counted exactly; above that every
+    power-of-two range is split into 2**(sub_bucket_bits - 1) linear buckets,
+    so any reported percentile is within ~1.6% (default 7 bits) of the true
+    value. Recording is an index computation and a list increment.
+    """
+
+    def __init__(self, max_value_us: int = 3_600_000_000, sub_bucket_bits: int = 7):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.half_count = self.sub_bucket_count >> 1
+        self.max_value_us = max_value_us
+        self.reset()
+
+    def reset(self):
+        """Drop all recorded values"""
+        self.counts = [0] * (self._index(self.max_value_us) + 1)
+        self.count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = 0
+
+    def _index(self, value: int) -> int:
+        if value < self.sub_bucket_count:
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        return self.sub_bucket_count + (shift - 1) * self.half_count + (value >> shift) - self.half_count
+
+    def _value_at(self, index: int) -> float:
+        """Midpoint of the value range covered by a bucket"""
+        if index < self.sub_bucket_count:
+            return float(index)
+        shift, offset = divmod(index - self.sub_bucket_count, self.half_count)
+        shift += 1
+        sub = offset + self.half_count
+        return ((sub << shift) + ((sub + 1) << shift) - 1) / 2
+
+    def record(self, value_us: float):
+        """Record one value in microseconds (clamped to [0, max_value_us])"""
+        value = int(value_us)
+        if value < 0:
+            value = 0
+        elif value > self.max_value_us:
+            value = self.max_value_us
+        
+        if value < self.sub_bucket_count:
+            self.counts[value] += 1
+        else:
+            shift = value.bit_length() - self.sub_bucket_bits
+            self.counts[self.sub_bucket_count + (shift - 1) * self.half_count + (value >> shift) - self.half_count] += 1
+        
+        self.count += 1
+        self.total_us += value
+        if value > self.max_us:
+            self.max_us = value
+        if self.min_us is None or value < self.min_us:
+            self.min_us = value
+
+    def merge(self, other: 'LatencyHistogram'):
+        """Add another histogram's counts into this one (same layout)"""
+        if not other.count:
+            return
+        counts = self.counts
+        for i, n in enumerate(other.counts):
+            if n:
+                counts[i] += n
+        self.count += other.count
+        self.total_us += other.total_us
+        if self.min_us is None or other.min_us < self.min_us:
+            self.min_us = other.min_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, percent: float) -> float:
+        """Value (µs) at or below which the given percentage of samples fall"""
+        if not self.count:
+            return 0.0
+        target = max(1, int(round(self.count * percent / 100.0)))
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(max(self._value_at(i), self.min_us), self.max_us)
+        return float(self.max_us)
+
+    def percentiles(self, percents: List[float]) -> List[float]:
+        """Several percentiles in a single pass over the buckets"""
+        if not self.count:
+            return [0.0] * len(percents)
+        targets = sorted((max(1, int(round(self.count * p / 100.0))), i) for i, p in enumerate(percents))
+        results = [float(self.max_us)] * len(percents)
+        seen = 0
+        t = 0
+        for i, n in enumerate(self.counts):
+            if not n:
+                continue
+            seen += n
+            while t < len(targets) and seen >= targets[t][0]:
+                results[targets[t][1]] = min(max(self._value_at(i), self.min_us), self.max_us)
+                t += 1
+            if t == len(targets):
+                break
+        return results
+
+    def get_stats(self) -> Dict:
+        """Count, mean, min, max and tail percentiles, in milliseconds"""
+        if not self.count:
+            return {}
+        p50, p90, p99, p999 = self.percentiles([50, 90, 99, 99.9])
+        return {
+            'count': self.count,
+            'avg_ms': self.total_us / self.count / 1000,
+            'min_ms': self.min_us / 1000,
+            'max_ms': self.max_us / 1000,
+            'p50_ms': p50 / 1000,
+            'p90_ms': p90 / 1000,
+            'p99_ms': p99 / 1000,
+            'p999_ms': p999 / 1000,
+            'total_samples': self.count
+        }
+
+class _OperationStats:
+    """Rolling per-window histograms for one operation, folded into a lifetime total"""
+    __slots__ = ('total', 'current', 'window_start', 'windows')
+
+    def __init__(self, now: float, max_windows: int):
+        self.total = LatencyHistogram()
+        self.current = LatencyHistogram()
+        self.window_start = now
+        self.windows: Deque[Tuple[float, LatencyHistogram]] = deque(maxlen=max_windows)
 
 class SimpleProfiler:
-    """Basic profiler for tracking operation performance"""
+    """
+    Histogram-backed profiler for tracking operation latency.
+
+    Memory per operation is fixed (a lifetime histogram plus up to max_windows
+    window_seconds-long rollups), and end_operation is O(1).
+    """
     
-    def __init__(self, max_samples: int = 1000):
-        self.metrics: Dict[str, List[LatencyMetric]] = {}
-        self.max_samples = max_samples
+    def __init__(self, window_seconds: float = 60.0, max_windows: int = 60):
+        self.window_seconds = window_seconds
+        self.max_windows = max_windows
+        self.operations: Dict[str, _OperationStats] = {}
         
     def start_operation(self, operation: str) -> float:
         """Start timing an operation"""
@@ -31,80 +164,246 @@ class SimpleProfiler:
     def end_operation(self, operation: str, start_time: float):
         """End timing an operation"""
         end_time = time.perf_counter()
-        duration_ms = (end_time - start_time) * 1000
-        
-        metric = LatencyMetric(
-            operation=operation,
-            duration_ms=duration_ms,
-            timestamp=time.time()
-        )
-        
-        if operation not in self.metrics:
-            self.metrics[operation] = []
-        
-        self.metrics[operation].append(metric)
+        self.record(operation, (end_time - start_time) * 1e6, end_time)
+    
+    def record(self, operation: str, duration_us: float, now: Optional[float] = None):
+        """Record a latency measured elsewhere (microseconds)"""
+        now = time.perf_counter() if now is None else now
+        stats = self.operations.get(operation)
+        if stats is None:
+            stats = self.operations[operation] = _OperationStats(now, self.max_windows)
+        elif now - stats.window_start >= self.window_seconds:
+            self._roll_window(stats, now)
         
-        # Keep only recent samples
-        if len(self.metrics[operation]) > self.max_samples:
-            self.metrics[operation].pop(0)
+        stats.current.record(duration_us)
     
-    def get_stats(self, operation: str) -> Dict:
-        """Get statistics for an operation"""
-        if operation not in self.metrics or not self.metrics[operation]:
+    def _roll_window(self, stats: _OperationStats, now: float):
+        """Close the current window and start a new one"""
+        if stats.current.count:
+            stats.total.merge(stats.current)
+            stats.windows.append((stats.window_start, stats.current))
+            stats.current = LatencyHistogram()
+        stats.window_start = now
+    
+    def get_stats(self, operation: str, window_seconds: Optional[float] = None) -> Dict:
+        """Get statistics for an operation, lifetime or over roughly the last window_seconds"""
+        stats = self.operations.get(operation)
+        if stats is None:
             return {}
+        now = time.perf_counter()
+        if now - stats.window_start >= self.window_seconds:
+            self._roll_window(stats, now)
         
-        durations = [m.duration_ms for m in self.metrics[operation]]
+        rollup = LatencyHistogram()
+        rollup.merge(stats.current)
+        if window_seconds is None:
+            rollup.merge(stats.total)
+            return rollup.get_stats()
         
-        return {
-            'count': len(durations),
-            'avg_ms': sum(durations) / len(durations),
-            'min_ms': min(durations),
-            'max_ms': max(durations),
-            'total_samples': len(durations)
-        }
+        cutoff = now - window_seconds
+        for window_start, histogram in reversed(stats.windows):
+            if window_start + self.window_seconds < cutoff:
+                break
+            rollup.merge(histogram)
+        return rollup.get_stats()
     
-    def get_all_stats(self) -> Dict:
+    def get_all_stats(self, window_seconds: Optional[float] = None) -> Dict:
         """Get statistics for all operations"""
-        return {op: self.get_stats(op) for op in self.metrics.keys()}
+        return {op: self.get_stats(op, window_seconds) for op in self.operations.keys()}
+    
+    def reset(self, operation: Optional[str] = None):
+        """Forget recorded samples for one or all operations"""
+        if operation is None:
+            self.operations.clear()
+        else:
+            self.operations.pop(operation, None)
+
+class _CacheEntry:
+    __slots__ = ('value', 'expires_at', 'bucket')
+
+    def __init__(self, value: Any, expires_at: float, bucket: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.bucket = bucket
 
 class SimpleCache:
-    """Basic TTL cache for performance"""
+    """
+    Bounded LRU cache with per-entry TTL.
+
+    Entries live in an OrderedDict in recency order, so hits and evictions of
+    the least recently used entry are O(1). Expiry is tracked on a hashed
+    timer wheel of tick_seconds buckets: clear_expired() only visits buckets
+    whose time has come instead of scanning every entry, and can run in the
+    background via start_expiry(). Expired entries are also dropped on read.
+    get_or_compute() coalesces concurrent misses on the same key into a single
+    call of the factory.
+    """
     
-    def __init__(self, default_ttl: float = 300.0):
-        self.cache: Dict[str, Dict] = {}
+    def __init__(self, default_ttl: float = 300.0, max_entries: int = 1024,
+                 tick_seconds: float = 1.0, wheel_size: int = 512):
+        self.cache: 'OrderedDict[Hashable, _CacheEntry]' = OrderedDict()
         self.default_ttl = default_ttl
+        self.max_entries = max(int(max_entries), 1)
+        self.tick_seconds = tick_seconds
+        self._wheel: List[Set[Hashable]] = [set() for _ in range(wheel_size)]
+        self._wheel_tick = int(time.monotonic() / tick_seconds)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._expiry_task: Optional[asyncio.Task] = None
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+    
+    def __len__(self) -> int:
+        return len(self.cache)
     
-    def get(self, key: str) -> Optional[any]:
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self.cache.get(key)
+        return entry is not None and entry.expires_at > time.monotonic()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
         """Get cached value if not expired"""
-        if key not in self.cache:
+        entry = self.cache.get(key)
+        if entry is None:
+            self.misses += 1
             return None
         
-        entry = self.cache[key]
-        if time.time() - entry['timestamp'] > entry['ttl']:
-            del self.cache[key]
+        if entry.expires_at <= time.monotonic():
+            self._remove(key, entry)
+            self.expirations += 1
+            self.misses += 1
             return None
         
-        return entry['value']
-    
-    def set(self, key: str, value: any, ttl: Optional[float] = None):
-        """Set cached value with TTL"""
-        self.cache[key] = {
-            'value': value,
-            'timestamp': time.time(),
-            'ttl': ttl or self.default_ttl
-        }
+        self.cache.move_to_end(key)
+        self.hits += 1
+        return entry.value
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Set cached value with TTL, evicting the least recently used entry if full"""
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        # Bucket for the tick after expiry, so the entry is due when that bucket is swept
+        bucket = (int(expires_at / self.tick_seconds) + 1) % len(self._wheel)
+        
+        entry = self.cache.get(key)
+        if entry is not None:
+            self._wheel[entry.bucket].discard(key)
+            entry.value, entry.expires_at, entry.bucket = value, expires_at, bucket
+            self.cache.move_to_end(key)
+        else:
+            self.cache[key] = _CacheEntry(value, expires_at, bucket)
+            while len(self.cache) > self.max_entries:
+                old_key, old_entry = self.cache.popitem(last=False)
+                self._wheel[old_entry.bucket].discard(old_key)
+                self.evictions += 1
+        self._wheel[bucket].add(key)
+    
+    def delete(self, key: Hashable):
+        """Remove an entry if present"""
+        entry = self.cache.get(key)
+        if entry is not None:
+            self._remove(key, entry)
+    
+    def clear(self):
+        """Remove all entries"""
+        self.cache.clear()
+        for bucket in self._wheel:
+            bucket.clear()
     
-    def clear_expired(self):
-        """Clear expired cache entries"""
-        current_time = time.time()
-        expired_keys = []
+    def _remove(self, key: Hashable, entry: _CacheEntry):
+        del self.cache[key]
+        self._wheel[entry.bucket].discard(key)
+    
+    def clear_expired(self) -> int:
+        """Advance the timer wheel to now, dropping entries that have expired"""
+        now = time.monotonic()
+        now_tick = int(now / self.tick_seconds)
+        # After a long pause one full turn of the wheel covers every bucket
+        first_tick = max(self._wheel_tick + 1, now_tick - len(self._wheel) + 1)
+        removed = 0
+        
+        for tick in range(first_tick, now_tick + 1):
+            bucket = self._wheel[tick % len(self._wheel)]
+            for key in [k for k in bucket if self.cache[k].expires_at <= now]:
+                del self.cache[key]
+                bucket.discard(key)
+                removed += 1
+            # Anything left has a TTL longer than the wheel and waits for another turn
+        
+        self._wheel_tick = max(self._wheel_tick, now_tick)
+        self.expirations += removed
+        return removed
+    
+    async def get_or_compute(self, key: Hashable, factory: Callable[[], Awaitable[Any]],
+                             ttl: Optional[float] = None) -> Any:
+        """Return the cached value, or await factory() once for all concurrent callers and cache it"""
+        value = self.get(key)
+        if value is not None:
+            return value
         
-        for key, entry in self.cache.items():
-            if current_time - entry['timestamp'] > entry['ttl']:
-                expired_keys.append(key)
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
         
-        for key in expired_keys:
-            del self.cache[key]
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await factory()
+        except BaseException as e:
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                # Waiters get the exception; mark it retrieved so it is not reported twice
+                future.exception()
+            else:
+                future.cancel()
+            raise
+        else:
+            # None means "no data" everywhere in the bot, so it is not cached
+            if value is not None:
+                self.set(key, value, ttl)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+    
+    def start_expiry(self, interval: Optional[float] = None):
+        """Sweep expired entries in the background on the running event loop"""
+        if self._expiry_task is None or self._expiry_task.done():
+            self._expiry_task = asyncio.create_task(self._run_expiry(interval or self.tick_seconds))
+    
+    async def stop_expiry(self):
+        """Stop the background sweeper"""
+        if self._expiry_task is not None:
+            self._expiry_task.cancel()
+            try:
+                await self._expiry_task
+            except asyncio.CancelledError:
+                pass
+            self._expiry_task = None
+    
+    async def _run_expiry(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.clear_expired()
+            except Exception as e:
+                logger.error(f"Error clearing expired cache entries: {e}")
+    
+    def get_stats(self) -> Dict:
+        """Size and hit/miss/eviction counters"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.cache),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'coalesced': self.coalesced
+        }
 
 # Create global instances for easy access
 profiler = SimpleProfiler()
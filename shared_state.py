@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Market state in a multiprocessing.shared_memory block
+
+Ingest worker processes write, the bot process reads, nobody copies: the
+value, timestamp and sequence columns of MarketStateStore are NumPy views
+over one shared block, so every existing reader (get, snapshot, version)
+works unchanged in the bot process.
+"""
+
+import time
+import logging
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from market_state import MarketStateStore, FIELDS
+from order_book import OrderBook, Level
+from symbols import SymbolRegistry
+
+logger = logging.getLogger(__name__)
+
+MAX_WRITERS = 64
+
+def _layout(capacity: int, book_depth: int) -> List[Tuple[str, np.dtype, tuple]]:
+    """(name, dtype, shape) of every array in the block, in order"""
+    return [
+        ('values', np.dtype(np.float64), (capacity, len(FIELDS))),
+        ('update_ts', np.dtype(np.float64), (capacity,)),
+        ('field_ts', np.dtype(np.float64), (capacity, len(FIELDS))),
+        ('exchange_ts', np.dtype(np.float64), (capacity, len(FIELDS))),
+        ('seq', np.dtype(np.int64), (capacity,)),
+        # One notification counter per writer process, bumped after every applied batch
+        ('writer_counts', np.dtype(np.int64), (MAX_WRITERS,)),
+        # Top book_depth (price, size) levels per side, NaN padded, with their own seqlock
+        ('book_levels', np.dtype(np.float64), (capacity, 2, book_depth, 2)),
+        ('book_seq', np.dtype(np.int64), (capacity,)),
+    ]
+
+def shared_size(capacity: int, book_depth: int) -> int:
+    return sum(dtype.itemsize * int(np.prod(shape)) for _, dtype, shape in _layout(capacity, book_depth))
+
+class SharedMarketState(MarketStateStore):
+    """
+    MarketStateStore whose columns live in shared memory.
+
+    The symbol table is fixed when the block is created and every process
+    attaches with the same list, so a symbol has the same slot everywhere;
+    writes for symbols outside it are dropped. Each slot must have a single
+    writer process (workers own disjoint symbol slices), which keeps the
+    per-slot seqlock valid across processes on x86's in-order stores.
+
+    Changes are detected from sequence numbers rather than dirty flags, so
+    the reader never has to write to memory a worker is writing.
+    """
+
+    def __init__(self, symbols: Iterable[str], name: Optional[str] = None, writer_index: Optional[int] = None,
+                 book_depth: int = 20, max_read_retries: int = 100):
+        # Same list, same registration order: a symbol has the same ID in every process
+        registry = SymbolRegistry(symbols)
+        capacity = max(len(registry), 1)
+        self.book_depth = book_depth
+        self.writer_index = writer_index
+        self._owner = name is None
+        size = shared_size(capacity, book_depth)
+        if self._owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            # Workers started by multiprocessing share the creator's resource tracker, which
+            # keeps one entry per name, so attaching leaves ownership (and unlink) with the creator
+            self._shm = shared_memory.SharedMemory(name=name)
+
+        arrays = {}
+        offset = 0
+        for field, dtype, shape in _layout(capacity, book_depth):
+            arrays[field] = np.ndarray(shape, dtype=dtype, buffer=self._shm.buf, offset=offset)
+            offset += arrays[field].nbytes
+        if self._owner:
+            arrays['values'].fill(np.nan)
+            arrays['book_levels'].fill(np.nan)
+            for field in ('update_ts', 'field_ts', 'exchange_ts', 'seq', 'writer_counts', 'book_seq'):
+                arrays[field].fill(0)
+
+        self.registry = registry
+        self._values = arrays['values']
+        self._update_ts = arrays['update_ts']
+        self._field_ts = arrays['field_ts']
+        self._exchange_ts = arrays['exchange_ts']
+        self._seq = arrays['seq']
+        self._writer_counts = arrays['writer_counts']
+        self._book_levels = arrays['book_levels']
+        self._book_seq = arrays['book_seq']
+        # Process-local: what this reader has already drained, and books it has rebuilt
+        self._dirty = np.zeros(capacity, dtype=bool)
+        self._drained_seq = np.zeros(capacity, dtype=np.int64)
+        self._books: Dict[int, Tuple[int, OrderBook]] = {}
+
+        self.max_read_retries = max_read_retries
+        self.torn_reads = 0
+        self.dropped_writes = 0
+        self.on_update = None
+
+    @property
+    def name(self) -> str:
+        """Shared memory block name, for attaching from another process"""
+        return self._shm.name
+
+    def slot(self, symbol: str) -> int:
+        slot = self.registry.id(symbol)
+        if slot is None:
+            raise KeyError(f"{symbol} is not in the shared market state")
+        return slot
+
+    def _grow(self, capacity: int):
+        raise RuntimeError("Shared market state has a fixed symbol table")
+
+    def _write(self, symbol: str, fields: Dict[str, float], timestamp: float,
+               exchange_ts: Optional[Dict[str, float]] = None):
+        if self.registry.id(symbol) is None:
+            self.dropped_writes += 1
+            return
+        super()._write(symbol, fields, timestamp, exchange_ts)
+
+    def _notify(self):
+        # Writers signal the reader through their counter; callbacks are process-local
+        if self.writer_index is not None:
+            self._writer_counts[self.writer_index] += 1
+        elif self.on_update is not None:
+            self.on_update()
+
+    def write_counter(self) -> int:
+        """Sum of all writers' batch counters; changes whenever any worker applied something"""
+        return int(self._writer_counts.sum())
+
+    def drain_dirty(self) -> List[str]:
+        """Symbols whose sequence moved since this process last drained them"""
+        count = len(self.registry)
+        seq = self._seq[:count].copy()
+        # Rows mid-write (odd) are picked up by the next drain, after the writer's notification
+        changed = np.flatnonzero((seq != self._drained_seq[:count]) & ((seq & 1) == 0))
+        self._drained_seq[changed] = seq[changed]
+        name = self.registry.name
+        return [name(i) for i in changed]
+
+    def write_book(self, symbol: str, bids: List[Level], asks: List[Level]):
+        """Publish the top levels of a symbol's book (best first)"""
+        slot = self.registry.id(symbol)
+        if slot is None:
+            return
+        depth = self.book_depth
+        levels = self._book_levels[slot]
+        self._book_seq[slot] += 1
+        levels.fill(np.nan)
+        if bids:
+            levels[0, :min(len(bids), depth)] = bids[:depth]
+        if asks:
+            levels[1, :min(len(asks), depth)] = asks[:depth]
+        self._book_seq[slot] += 1
+
+    def book(self, symbol: str) -> Optional[OrderBook]:
+        """Order book rebuilt from the published levels, cached until they change"""
+        slot = self.registry.id(symbol)
+        if slot is None:
+            return None
+        for _ in range(self.max_read_retries):
+            seq = int(self._book_seq[slot])
+            if seq == 0:
+                return None
+            cached = self._books.get(slot)
+            if cached is not None and cached[0] == seq:
+                return cached[1]
+            if not seq & 1:
+                levels = self._book_levels[slot].copy()
+                if self._book_seq[slot] == seq:
+                    break
+            time.sleep(0)
+        else:
+            self.torn_reads += 1
+            return None
+
+        bids, asks = levels[0], levels[1]
+        bids, asks = bids[~np.isnan(bids[:, 0])], asks[~np.isnan(asks[:, 0])]
+        book = None
+        # An empty publication means the worker's book is out of sync
+        if len(bids) or len(asks):
+            book = OrderBook(symbol)
+            book.apply_snapshot([tuple(level) for level in bids], [tuple(level) for level in asks])
+        self._books[slot] = (seq, book)
+        return book
+
+    def close(self):
+        """Detach from the block; the creating process also frees it"""
+        # Drop the views before closing, or the buffer cannot be released
+        self._values = self._update_ts = self._seq = self._writer_counts = None
+        self._field_ts = self._exchange_ts = None
+        self._book_levels = self._book_seq = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
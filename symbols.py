@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Symbol registry: dense integer IDs for symbols, with aliases resolved once
+
+Feeds spell the same instrument several ways (BTCUSD, BTC/USD, btcusd,
+MARK:BTCUSD). The registry maps every spelling to one ID the first time it
+is seen and remembers the spelling, so afterwards resolving a raw feed
+symbol is a single dict lookup and everything downstream keys by integer.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Channel prefixes Delta puts in front of a symbol (candlestick_1m on mark prices)
+PREFIXES = ('MARK:',)
+
+def normalize(symbol: str) -> str:
+    """Canonical spelling: upper case, channel prefix and separators removed"""
+    symbol = symbol.strip().upper()
+    for prefix in PREFIXES:
+        if symbol.startswith(prefix):
+            symbol = symbol[len(prefix):]
+            break
+    return symbol.replace('/', '').replace('-', '').replace('_', '')
+
+class SymbolRegistry:
+    """
+    Interned symbols with IDs 0, 1, 2, ... in registration order.
+
+    id() never assigns; register() does. Spellings that normalize() does
+    not unify (an exchange pair and the perpetual it is hedged with) stay
+    separate symbols; universe.pair_to_symbol maps those before they get here.
+    """
+
+    def __init__(self, symbols: Iterable[str] = ()):
+        self._ids: Dict[str, int] = {}  # every spelling seen -> ID
+        self._names: List[str] = []     # ID -> canonical name
+        # Hot-path lookup of an exact spelling already seen (a bare dict.get, no normalizing)
+        self.get = self._ids.get
+        for symbol in symbols:
+            self.register(symbol)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, symbol: str) -> bool:
+        return self.id(symbol) is not None
+
+    @property
+    def names(self) -> List[str]:
+        """Canonical names in ID order"""
+        return list(self._names)
+
+    def id(self, symbol: str) -> Optional[int]:
+        """ID of a symbol under any spelling, or None if it was never registered"""
+        symbol_id = self._ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = self._ids.get(normalize(symbol))
+            if symbol_id is not None:
+                self._ids[symbol] = symbol_id  # the next lookup of this spelling is direct
+        return symbol_id
+
+    def register(self, symbol: str) -> int:
+        """ID of a symbol, assigning the next free one if it is new"""
+        symbol_id = self.id(symbol)
+        if symbol_id is None:
+            canonical = normalize(symbol)
+            symbol_id = len(self._names)
+            self._names.append(canonical)
+            self._ids[canonical] = symbol_id
+            self._ids[symbol] = symbol_id
+            for prefix in PREFIXES:
+                self._ids[prefix + canonical] = symbol_id
+        return symbol_id
+
+    def name(self, symbol_id: int) -> str:
+        """Canonical name for an ID"""
+        return self._names[symbol_id]
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Unit tests for CoinSwitchClient message handling (run with pytest)
+"""
+
+import json
+import asyncio
+
+import delta_messages
+from api_client import CoinSwitchClient
+
+def l2(action, sequence_no, bids=(), asks=()):
+    return delta_messages.from_dict({
+        'type': 'l2_updates', 'symbol': 'BTCUSD', 'action': action, 'sequence_no': sequence_no,
+        'bids': [list(level) for level in bids], 'asks': [list(level) for level in asks],
+    })
+
+def test_sequence_gap_sends_one_resync(make_socket):
+    async def run():
+        client = CoinSwitchClient()
+        client.delta_ws = make_socket()
+        try:
+            client._parse_delta_l2_update(l2('snapshot', 1, bids=[('100', '1')], asks=[('101', '1')]))
+            assert client._parse_delta_l2_update(l2('update', 3, bids=[('100', '2')])) is None  # gap
+            for sequence_no in range(4, 24):
+                assert client._parse_delta_l2_update(l2('update', sequence_no, bids=[('100', '3')])) is None
+            await asyncio.sleep(0)
+            await asyncio.gather(*client._resync_tasks.values())
+            sent = client.delta_ws.sent
+            assert [frame['type'] for frame in sent] == ['unsubscribe', 'subscribe']
+            assert not client._resync_tasks
+
+            # The snapshot ends the gap; the next gap asks again
+            assert client._parse_delta_l2_update(l2('snapshot', 30, bids=[('99', '1')], asks=[('101', '1')]))
+            assert client._parse_delta_l2_update(l2('update', 31, asks=[('100.5', '1')])) == ('BTCUSD', {'bid': 99.0, 'ask': 100.5})
+            client._parse_delta_l2_update(l2('update', 40))
+            await asyncio.sleep(0)
+            await asyncio.gather(*client._resync_tasks.values())
+            assert len(sent) == 4
+        finally:
+            await client.cleanup()
+
+    asyncio.run(run())
+
+def test_failed_resync_is_retried():
+    class BrokenSocket:
+        async def send(self, frame):
+            raise ConnectionError("socket closed")
+
+    async def run():
+        client = CoinSwitchClient()
+        client.delta_ws = BrokenSocket()
+        try:
+            client._parse_delta_l2_update(l2('snapshot', 1))
+            client._parse_delta_l2_update(l2('update', 5))
+            await asyncio.gather(*client._resync_tasks.values())
+            book = client.order_books[client.market_state.lookup('BTCUSD')]
+            assert not book.resync_pending
+        finally:
+            await client.cleanup()
+
+    asyncio.run(run())
+
+def unpack(frames):
+    """{channel: symbols} back out of subscribe frames"""
+    channels = {}
+    for frame in frames:
+        for entry in json.loads(frame)['payload']['channels']:
+            channels.setdefault(entry['name'], []).extend(entry['symbols'])
+    return channels
+
+def test_subscription_frames_respect_limits():
+    symbols = [f"S{i}INR" for i in range(500)]
+    channels = {name: symbols for name in ('v2/ticker', 'l1_orderbook', 'l2_updates', 'mark_price')}
+    channels['candlestick_1m'] = ["MARK:" + symbol for symbol in symbols]
+    for max_frame_bytes, max_symbols in ((16384, 500), (1000, 7), (120, 100)):
+        frames = CoinSwitchClient._subscription_frames(channels, max_frame_bytes=max_frame_bytes, max_symbols=max_symbols)
+        for frame in frames:
+            assert len(frame) <= max_frame_bytes
+            for entry in json.loads(frame)['payload']['channels']:
+                assert 0 < len(entry['symbols']) <= max_symbols
+        assert unpack(frames) == channels  # every symbol exactly once, order kept
+
+def test_subscription_frames_pack_channels_together():
+    channels = {'v2/ticker': ['BTCUSD', 'ETHUSD'], 'mark_price': ['BTCUSD']}
+    frames = CoinSwitchClient._subscription_frames(channels, "unsubscribe", max_frame_bytes=16384, max_symbols=100)
+    assert len(frames) == 1
+    assert json.loads(frames[0]) == {'type': 'unsubscribe', 'payload': {'channels': [
+        {'name': 'v2/ticker', 'symbols': ['BTCUSD', 'ETHUSD']},
+        {'name': 'mark_price', 'symbols': ['BTCUSD']},
+    ]}}
+    assert CoinSwitchClient._subscription_frames({}) == []
+
+def test_demo_book_is_only_seeded_in_demo_mode(monkeypatch):
+    import config
+
+    async def run(demo_mode):
+        monkeypatch.setattr(config, 'DEMO_MODE', demo_mode)
+        client = CoinSwitchClient()
+        try:
+            await client._populate_demo_data()
+            return client.order_books.get(client.market_state.lookup('BTCUSD'))
+        finally:
+            await client.cleanup()
+
+    assert asyncio.run(run(False)) is None  # live orders are never sized against fake depth
+    assert asyncio.run(run(True)).is_synced
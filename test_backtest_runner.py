@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the parallel backtest runner (run with pytest)
+"""
+
+import config
+from backtest import synthetic_ticks
+from backtest_runner import BacktestJob, run_job
+from tick_log import write_tick_file
+
+def test_job_parameters_do_not_leak_into_the_next_job(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'MIN_PROFITABLE_APR', 10.0)
+    records, names = synthetic_ticks(['BTCUSD', 'ETHUSD'], 1_735_689_600.0, 600, seed=1)
+    path = write_tick_file(str(tmp_path / 'day'), records, names)
+    job = BacktestJob('2025-01-01', (path,), (('MIN_PROFITABLE_APR', 0.5), ('POSITION_SIZE_QUOTE', 123.0)))
+    position_size = config.POSITION_SIZE_QUOTE
+
+    row = run_job(job)
+    assert 'error' not in row and row['MIN_PROFITABLE_APR'] == 0.5
+    assert (config.MIN_PROFITABLE_APR, config.POSITION_SIZE_QUOTE) == (10.0, position_size)
+
+    # Restored when the replay fails, too
+    failed = run_job(BacktestJob('2025-01-02', (str(tmp_path / 'missing.ticks'),), (('MIN_PROFITABLE_APR', 0.5),)))
+    assert 'error' in failed
+    assert config.MIN_PROFITABLE_APR == 10.0
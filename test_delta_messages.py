@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the typed WebSocket frame decoders, with and without msgspec (run with pytest)
+"""
+
+import json
+import math
+
+import pytest
+
+import delta_messages
+from delta_messages import decode_frame
+
+@pytest.fixture(params=['msgspec', 'fallback'])
+def decoder(request, monkeypatch):
+    """Run a test through the msgspec decoder and through the plain-JSON fallback"""
+    if request.param == 'msgspec':
+        if delta_messages._typed_decoder is None:
+            pytest.skip("msgspec is not installed")
+    else:
+        monkeypatch.setattr(delta_messages, '_typed_decoder', None)
+        monkeypatch.setattr(delta_messages, '_generic_loads', json.loads)
+    return request.param
+
+def frame(**fields):
+    return json.dumps(fields)
+
+def test_numeric_strings_decode_to_numbers(decoder):
+    msg = decode_frame(frame(type='v2/ticker', symbol='BTCUSD', close='100.5', mark_price='101',
+                             funding_rate='0.0001', timestamp=1700000000000000, extra='ignored'))
+    assert isinstance(msg, delta_messages.Ticker)
+    assert (msg.symbol, msg.close, msg.mark_price, msg.funding_rate) == ('BTCUSD', 100.5, 101.0, 0.0001)
+    assert msg.volume is None
+
+def test_unparsable_field_does_not_drop_the_frame(decoder):
+    msg = decode_frame(frame(type='v2/ticker', symbol='BTCUSD', close='-', mark_price='101.5',
+                             funding_rate='n/a', volume='NaN ', timestamp='soon'))
+    assert (msg.symbol, msg.close, msg.mark_price, msg.funding_rate, msg.timestamp) == ('BTCUSD', None, 101.5, None, None)
+    assert math.isnan(msg.volume)
+
+    msg = decode_frame(frame(type='l2_updates', symbol='BTCUSD', action='update', sequence_no='x',
+                             bids=[['100', '1']], asks=[]))
+    assert (msg.action, msg.sequence_no, msg.bids) == ('update', None, [['100', '1']])
+
+def test_other_messages_stay_dicts(decoder):
+    assert decode_frame(frame(type='subscriptions', channels=[])) == {'type': 'subscriptions', 'channels': []}
+    assert decode_frame('[1, 2]') == [1, 2]
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the arbitrage logic engine (run with pytest)
+"""
+
+import math
+import asyncio
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import config
+from logic_engine import ArbitrageLogicEngine
+from order_book import OrderBook
+
+class BookClient:
+    """Serves one order book for every symbol"""
+
+    def __init__(self, book):
+        self.book = book
+
+    def get_order_book(self, symbol):
+        return self.book
+
+def test_liquidity_uses_the_perp_book_for_the_futures_leg_only(monkeypatch):
+    monkeypatch.setattr(config, 'MAX_SLIPPAGE_PERCENT', 0.5)
+    monkeypatch.setattr(config, 'MIN_LIQUIDITY_QUOTE', 1000.0)
+    book = OrderBook('BTCUSD')
+    # Deep bids (what the futures sell walks), a single thin ask far away
+    book.apply_snapshot([(100.0 - 0.01 * i, 50.0) for i in range(20)], [(110.0, 0.01)])
+    engine = ArbitrageLogicEngine(BookClient(book))
+
+    liquidity = engine._book_liquidity('BTCUSD', 100.0, 100.0, 2000.0)
+    assert liquidity['is_liquid'], liquidity
+    assert liquidity['slippage_cost'] == liquidity['futures_slippage'] < 0.001
+    assert 'spot_slippage' not in liquidity
+
+    thin = OrderBook('BTCUSD')
+    thin.apply_snapshot([(100.0, 1.0)], [(101.0, 1000.0)])
+    liquidity = ArbitrageLogicEngine(BookClient(thin))._book_liquidity('BTCUSD', 100.0, 100.0, 2000.0)
+    assert not liquidity['is_liquid'] and liquidity['reason'] == 'Book too thin for position size'
+
+class ScalarClient(BookClient):
+    """Per-symbol getters over fixed arrays (NaN reads back as None), a book per symbol"""
+
+    def __init__(self, symbols, spot, mark, funding, books, trading_pairs):
+        self.symbols = list(symbols)
+        self.columns = {'spot': spot, 'mark': mark, 'funding': funding}
+        self.books = books
+        self.trading_pairs = list(trading_pairs)
+
+    def _get(self, column, symbol):
+        value = self.columns[column][self.symbols.index(symbol)]
+        return None if math.isnan(value) else float(value)
+
+    async def get_spot_price(self, symbol):
+        return self._get('spot', symbol)
+
+    async def get_futures_price(self, symbol):
+        return self._get('mark', symbol)
+
+    async def get_funding_rate(self, symbol):
+        return self._get('funding', symbol)
+
+    def get_order_book(self, symbol):
+        return self.books.get(symbol)
+
+def deep_book(symbol, price):
+    book = OrderBook(symbol)
+    book.apply_snapshot([(price, 1000.0)], [(price * 1.001, 1000.0)])
+    return book
+
+def test_scan_universe_matches_the_scalar_analysis(monkeypatch):
+    for name, value in (('MIN_PROFITABLE_APR', 0.1), ('MIN_POSITIVE_FUNDING_RATE', 0.0001),
+                        ('MAX_SLIPPAGE_PERCENT', 0.5), ('MIN_LIQUIDITY_QUOTE', 1000.0),
+                        ('POSITION_SIZE_QUOTE', 1000.0)):
+        monkeypatch.setattr(config, name, value)
+    rows = [  # symbol, spot, mark, funding
+        ('GOODUSD', 200.0, 201.0, 0.001),
+        ('CHEAPUSD', 50.0, 50.5, 0.002),        # low price risk, still acceptable
+        ('LOWFUNDUSD', 200.0, 201.0, 0.00005),  # under MIN_POSITIVE_FUNDING_RATE
+        ('NEGUSD', 200.0, 199.0, -0.001),
+        ('FEESUSD', 200.0, 201.0, 0.0005),      # funding does not cover the fees
+        ('NOFUNDUSD', 200.0, 201.0, np.nan),    # missing leg
+        ('NOMARKUSD', 200.0, np.nan, 0.001),
+        ('NOSPOTUSD', np.nan, 201.0, 0.001),
+        ('ZEROUSD', 0.0, 201.0, 0.001),
+        ('UNLISTEDUSD', 50.0, 50.5, 0.002),     # not a trading pair: risk too high
+        ('THINUSD', 200.0, 201.0, 0.001),       # no book depth
+    ]
+    symbols = [row[0] for row in rows]
+    spot, mark, funding = (np.array([row[i] for row in rows]) for i in (1, 2, 3))
+    books = {symbol: deep_book(symbol, price) for symbol, price in zip(symbols, spot) if symbol != 'THINUSD'}
+    client = ScalarClient(symbols, spot, mark, funding, books, [s for s in symbols if s != 'UNLISTEDUSD'])
+    engine = ArbitrageLogicEngine(client)
+    engine.clock = lambda: datetime(2026, 1, 5, 4, 0).timestamp()  # four hours to funding
+    next_funding, hours = engine._next_funding_time()
+
+    found, columns = engine.scan_universe(symbols, spot, mark, funding, hours, next_funding)
+    found_by_symbol = {opportunity['symbol']: opportunity for opportunity in found}
+
+    for i, symbol in enumerate(symbols):
+        scalar = asyncio.run(engine.analyze_symbol_opportunity(symbol))
+        assert bool(columns['is_profitable'][i]) == scalar['is_profitable'], symbol
+        assert bool(columns['has_data'][i]) == (scalar.get('reason') != 'Missing market data'), symbol
+        if not columns['has_data'][i]:
+            continue
+        for key in ('net_profit_percent', 'annualized_return', 'basis'):
+            assert columns[key][i] == pytest.approx(scalar[key]), (symbol, key)
+        assert columns['risk_score'][i] == pytest.approx(scalar['risk']['risk_score']), symbol
+        if scalar['is_profitable']:
+            vector = found_by_symbol[symbol]
+            assert vector['total_fees'] == scalar['total_fees']
+            assert vector['liquidity'] == scalar['liquidity']
+            assert vector['risk']['risk_factors'] == scalar['risk']['risk_factors']
+
+    assert [o['symbol'] for o in found] == ['CHEAPUSD', 'GOODUSD']  # best APR first
+
+def state_client(make_client, symbols):
+    """FakeClient with a deep book for every symbol"""
+    client = make_client(symbols)
+    for symbol in symbols:
+        client.order_books[client.market_state.lookup(symbol)] = deep_book(symbol, 200.0)
+    return client
+
+def test_memo_is_reused_until_an_input_changes(monkeypatch, make_client):
+    monkeypatch.setattr(config, 'MIN_PROFITABLE_APR', 0.1)
+    monkeypatch.setattr(config, 'MIN_POSITIVE_FUNDING_RATE', 0.0001)
+    now = datetime(2026, 1, 5, 4, 0).timestamp()
+    client = state_client(make_client, ['GOODUSD', 'FLATUSD'])
+    client.market_state.update('GOODUSD', timestamp=now, last=200.0, mark=201.0, funding=0.001)
+    client.market_state.update('FLATUSD', timestamp=now, last=200.0, mark=201.0, funding=0.0)
+    engine = ArbitrageLogicEngine(client)
+    engine._has_started = True
+    engine.clock = lambda: now
+
+    scanned = []
+    scan_universe = engine.scan_universe
+    def recording_scan(symbols, *args, **kwargs):
+        scanned.append(list(symbols))
+        return scan_universe(symbols, *args, **kwargs)
+    engine.scan_universe = recording_scan
+
+    def find():
+        return asyncio.run(engine.find_arbitrage_opportunities())
+
+    first = find()
+    assert [o['symbol'] for o in first] == ['GOODUSD']
+    assert find() == first  # unchanged versions: served from the memo
+    assert scanned == [['GOODUSD', 'FLATUSD']]
+
+    for field, value in (('last', 199.0), ('mark', 202.0), ('funding', 0.002)):
+        scanned.clear()
+        client.market_state.update('GOODUSD', timestamp=now, **{field: value})
+        opportunity, = find()
+        assert scanned == [['GOODUSD']], field
+    assert (opportunity['spot_price'], opportunity['futures_price'], opportunity['funding_rate']) == (199.0, 202.0, 0.002)
+
+    # A write that makes the unprofitable symbol profitable is picked up too
+    scanned.clear()
+    client.market_state.update('FLATUSD', timestamp=now, funding=0.003)
+    assert [o['symbol'] for o in find()] == ['FLATUSD', 'GOODUSD']
+    assert scanned == [['FLATUSD']]
+
+def test_stale_symbols_are_left_out_of_scan_results(monkeypatch, make_client):
+    monkeypatch.setattr(config, 'MIN_PROFITABLE_APR', 0.1)
+    monkeypatch.setattr(config, 'MIN_POSITIVE_FUNDING_RATE', 0.0001)
+    monkeypatch.setattr(config, 'MAX_DATA_AGE_SECONDS', 30.0)
+    clock = [datetime(2026, 1, 5, 4, 0).timestamp()]
+    client = state_client(make_client, ['BTCUSD', 'ETHUSD'])
+    for symbol in ('BTCUSD', 'ETHUSD'):
+        client.market_state.update(symbol, timestamp=clock[0], last=200.0, mark=201.0, funding=0.001)
+    engine = ArbitrageLogicEngine(client)
+    engine._has_started = True
+    engine.clock = lambda: clock[0]
+
+    def find():
+        return [o['symbol'] for o in asyncio.run(engine.find_arbitrage_opportunities())]
+
+    assert find() == ['BTCUSD', 'ETHUSD']
+    clock[0] += 31
+    client.market_state.update('BTCUSD', timestamp=clock[0], last=200.0, mark=201.0, funding=0.001)
+    assert find() == ['BTCUSD']  # ETHUSD's memoized result aged out without a write
+
+    # ETHUSD's prices tick again but its funding stays old: rescanned, still stale
+    client.market_state.update('ETHUSD', timestamp=clock[0], last=200.0, mark=201.0)
+    assert find() == ['BTCUSD']
+
+    engine.clear_memo()
+    clock[0] += 31  # now everything is old
+    assert find() == []
@@ -78,10 +78,11 @@ class BotTester:
                     logger.info(f"  {ws_type}: {'✅ Connected' if connected else '❌ Disconnected'}")
                     
                 # Check if we have spot prices
-                if hasattr(self.bot.api_client, 'spot_prices'):
-                    logger.info("💰 Spot Prices:")
-                    for symbol, price in self.bot.api_client.spot_prices.items():
-                        logger.info(f"  {symbol}: {price}")
+                if hasattr(self.bot.api_client, 'market_state'):
+                    logger.info("💰 Market State:")
+                    market_state = self.bot.api_client.market_state
+                    for symbol in market_state.symbols:
+                        logger.info(f"  {symbol}: {market_state.get(symbol)}")
 
 async def main():
     """Main test function"""
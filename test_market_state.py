@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the seqlocked market state store (run with pytest)
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from market_state import MarketStateStore, FIELD_INDEX
+
+def begin_write(store, symbol, **fields):
+    """Leave a row the way a writer does halfway through an update: odd seq, some fields written"""
+    slot = store.slot(symbol)
+    store._seq[slot] += 1
+    for name, value in fields.items():
+        store._values[slot, FIELD_INDEX[name]] = value
+    return slot
+
+def test_snapshot_retries_a_row_being_written(monkeypatch):
+    store = MarketStateStore(['BTCUSD', 'ETHUSD'])
+    store.update('BTCUSD', bid=100.0, ask=101.0)
+    store.update('ETHUSD', bid=10.0, ask=11.0)
+    slot = begin_write(store, 'BTCUSD', bid=200.0)
+
+    sleeps = []
+    def writer_finishes(seconds):
+        # The reader yields while the row is odd; the writer completes its update meanwhile
+        sleeps.append(seconds)
+        store._values[slot, FIELD_INDEX['ask']] = 201.0
+        store._seq[slot] += 1
+    monkeypatch.setattr(time, 'sleep', writer_finishes)
+
+    snapshot = store.snapshot(['BTCUSD', 'ETHUSD'])
+    assert list(snapshot.bid) == [200.0, 10.0]
+    assert list(snapshot.ask) == [201.0, 11.0]
+    assert snapshot.seq[0] % 2 == 0
+    assert len(sleeps) == 1
+    assert store.torn_reads == 0
+
+def test_snapshot_gives_up_on_a_stuck_row(monkeypatch):
+    store = MarketStateStore(['BTCUSD', 'ETHUSD'], max_read_retries=5)
+    store.update('BTCUSD', bid=100.0, ask=101.0)
+    store.update('ETHUSD', bid=10.0, ask=11.0)
+    begin_write(store, 'BTCUSD', bid=200.0)
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+
+    snapshot = store.snapshot()
+    assert np.isnan(snapshot.bid[0]) and np.isnan(snapshot.ask[0])  # never a half-written row
+    assert snapshot.bid[1] == 10.0
+    assert store.torn_reads == 1
+    assert store.get('BTCUSD') is None
+
+def test_concurrent_writer_never_yields_torn_rows():
+    store = MarketStateStore(['BTCUSD'])
+    store.update('BTCUSD', bid=0.0, ask=0.0, last=0.0)
+    stop = threading.Event()
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            i += 1
+            store.update('BTCUSD', bid=float(i), ask=float(i), last=float(i))
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 0.3
+        while time.monotonic() < deadline:
+            snapshot = store.snapshot(['BTCUSD'])
+            if not np.isnan(snapshot.bid[0]):
+                assert snapshot.bid[0] == snapshot.ask[0] == snapshot.last[0]
+    finally:
+        stop.set()
+        thread.join()
+
+def test_symbol_goes_stale_when_one_leg_stops_updating():
+    store = MarketStateStore(['BTCUSD', 'ETHUSD'])
+    t0 = 1_700_000_000.0
+    for symbol in ('BTCUSD', 'ETHUSD'):
+        store.update(symbol, timestamp=t0, last=100.0, mark=101.0, funding=0.001)
+    for second in range(1, 31):
+        # ETHUSD's mark feed goes quiet; every other input keeps ticking
+        store.update('BTCUSD', timestamp=t0 + second, last=100.0 + second, mark=101.0 + second, funding=0.001)
+        store.update('ETHUSD', timestamp=t0 + second, last=100.0 + second, funding=0.001)
+
+    snapshot = store.snapshot(['BTCUSD', 'ETHUSD'])
+    assert list(snapshot.stale(30.0, now=t0 + 30)) == [False, False]  # exactly MAX_DATA_AGE old
+    assert list(snapshot.stale(30.0, now=t0 + 30.5)) == [False, True]
+    assert list(snapshot.data_ts()) == [t0 + 30, t0]
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Unit tests for L2 order book maintenance (run with pytest)
+"""
+
+from order_book import OrderBook, parse_levels
+
+def make_book():
+    book = OrderBook('BTCUSD')
+    book.apply_snapshot([(100.0, 1.0), (99.0, 2.0), (98.0, 3.0)], [(101.0, 1.0), (102.0, 2.0)], sequence_no=10)
+    return book
+
+def test_snapshot_sorts_best_first_and_drops_empty_levels():
+    book = OrderBook('BTCUSD')
+    book.apply_snapshot([(99.0, 2.0), (100.0, 1.0), (98.0, 0.0)], [(102.0, 2.0), (101.0, 1.0)], sequence_no=1)
+    assert book.bids.levels() == [(100.0, 1.0), (99.0, 2.0)]
+    assert book.asks.levels() == [(101.0, 1.0), (102.0, 2.0)]
+    assert book.is_synced and book.sequence_no == 1
+
+def test_delta_inserts_updates_and_deletes_levels():
+    book = make_book()
+    assert book.apply_delta([(100.5, 4.0), (99.0, 0.0)], [(101.0, 5.0), (103.0, 1.0)], sequence_no=11)
+    assert book.bids.levels() == [(100.5, 4.0), (100.0, 1.0), (98.0, 3.0)]
+    assert book.asks.levels() == [(101.0, 5.0), (102.0, 2.0), (103.0, 1.0)]
+    assert book.top_of_book() == {'bid': 100.5, 'ask': 101.0}
+    assert book.sequence_no == 11
+
+    # Deleting a level that is not there is a no-op
+    assert book.apply_delta([(97.0, 0.0)], [], sequence_no=12)
+    assert len(book.bids) == 3
+
+def test_sequence_gap_desyncs_until_next_snapshot():
+    book = make_book()
+    assert not book.apply_delta([(100.0, 9.0)], [], sequence_no=12)  # 11 was missed
+    assert not book.is_synced
+    assert book.bids.levels(1) == [(100.0, 1.0)]  # the gapped delta was not applied
+    assert not book.apply_delta([(100.0, 9.0)], [], sequence_no=13)  # nor anything after it
+
+    book.apply_snapshot([(99.5, 1.0)], [(100.5, 1.0)], sequence_no=20)
+    assert book.is_synced and not book.resync_pending
+    assert book.apply_delta([], [(100.25, 2.0)], sequence_no=21)
+    assert book.best_ask() == 100.25
+
+def test_deltas_without_sequence_numbers_always_apply():
+    book = OrderBook('BTCUSD')
+    book.apply_snapshot([(100.0, 1.0)], [(101.0, 1.0)])
+    assert book.apply_delta([(100.0, 2.0)], [])
+    assert book.apply_delta([], [(101.0, 0.0)])
+    assert book.best_ask() is None
+
+def test_fill_estimate_walks_levels():
+    book = make_book()
+    estimate = book.estimate_fill('sell', 100.0 * 1.0 + 99.0 * 1.0)
+    assert estimate['fully_filled'] and estimate['levels'] == 2
+    assert estimate['vwap'] == 199.0 / 2.0
+    assert not book.estimate_fill('buy', 1e9)['fully_filled']
+    assert book.depth('buy', 0.01) == 101.0 * 1.0 + 102.0 * 2.0
+
+def test_parse_levels_accepts_pairs_and_dicts():
+    assert parse_levels([['100.5', '2'], {'limit_price': '99', 'size': '1.5'}, {'price': 98, 'depth': 3}]) == [
+        (100.5, 2.0), (99.0, 1.5), (98.0, 3.0)
+    ]
+    assert parse_levels(None) == []
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the cache and latency histogram in performance_utils (run with pytest)
+"""
+
+import random
+import time
+
+import numpy as np
+
+from performance_utils import LatencyHistogram, SimpleCache
+
+class FakeClock:
+    """Stands in for time.monotonic so TTLs can be stepped through"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+def make_cache(monkeypatch, **kwargs):
+    clock = FakeClock()
+    monkeypatch.setattr(time, 'monotonic', clock)
+    return SimpleCache(**kwargs), clock
+
+def test_lru_evicts_least_recently_used(monkeypatch):
+    cache, _ = make_cache(monkeypatch, max_entries=3)
+    for key in 'abc':
+        cache.set(key, key.upper())
+    assert cache.get('a') == 'A'  # a is now the most recent
+    cache.set('d', 'D')
+    assert 'b' not in cache
+    assert [key for key in cache.cache] == ['c', 'a', 'd']
+    cache.set('c', 'C2')  # overwriting refreshes recency without evicting
+    cache.set('e', 'E')
+    assert list(cache.cache) == ['d', 'c', 'e']
+    assert cache.evictions == 2
+    assert len(cache) == 3
+
+def test_ttl_expires_on_read(monkeypatch):
+    cache, clock = make_cache(monkeypatch, default_ttl=10.0)
+    cache.set('short', 1, ttl=2.0)
+    cache.set('long', 2)
+    clock.now += 2.0
+    assert cache.get('short') is None
+    assert cache.get('long') == 2
+    assert cache.expirations == 1
+    assert 'short' not in cache.cache
+
+def test_zero_ttl_is_not_the_default(monkeypatch):
+    cache, _ = make_cache(monkeypatch, default_ttl=10.0)
+    cache.set('now', 1, ttl=0)
+    cache.set('default', 2)
+    assert cache.get('now') is None  # expires immediately rather than living default_ttl
+    assert cache.get('default') == 2
+
+def test_timer_wheel_sweeps_expired_entries(monkeypatch):
+    cache, clock = make_cache(monkeypatch, default_ttl=5.0, tick_seconds=1.0, wheel_size=8)
+    cache.set('a', 1, ttl=1.0)
+    cache.set('b', 2, ttl=3.0)
+    cache.set('c', 3, ttl=20.0)  # longer than one turn of the wheel
+    assert cache.clear_expired() == 0
+
+    clock.now += 2.5
+    assert cache.clear_expired() == 1
+    assert list(cache.cache) == ['b', 'c']
+
+    clock.now += 10.0  # more than a full turn: every bucket is visited once
+    assert cache.clear_expired() == 1
+    assert list(cache.cache) == ['c']
+
+    clock.now += 10.0
+    assert cache.clear_expired() == 1
+    assert len(cache) == 0
+
+def test_evicted_entry_leaves_the_wheel(monkeypatch):
+    cache, clock = make_cache(monkeypatch, max_entries=1, default_ttl=1.0)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert sum(len(bucket) for bucket in cache._wheel) == 1
+    clock.now += 5.0
+    assert cache.clear_expired() == 1
+
+def test_histogram_percentiles_within_resolution():
+    rng = random.Random(7)
+    samples = [rng.lognormvariate(6.0, 1.5) for _ in range(50_000)]  # ~400µs median, long tail
+    histogram = LatencyHistogram()
+    for value in samples:
+        histogram.record(value)
+
+    exact = np.percentile(np.array(samples).astype(int), [50, 90, 99, 99.9])
+    reported = histogram.percentiles([50, 90, 99, 99.9])
+    for want, got in zip(exact, reported):
+        assert abs(got - want) <= want * 0.016 + 1
+    assert histogram.percentile(99) == reported[2]
+    assert histogram.percentile(100) == histogram.max_us
+
+def test_histogram_small_values_are_exact():
+    histogram = LatencyHistogram()
+    for value in range(1, 101):
+        histogram.record(value)
+    assert histogram.percentile(50) == 50
+    assert histogram.percentile(1) == 1
+    assert histogram.count == 100
+    assert histogram.min_us == 1 and histogram.max_us == 100
+
+def test_histogram_merge_matches_single_histogram():
+    rng = random.Random(1)
+    values = [rng.uniform(0, 5_000_000) for _ in range(10_000)]
+    whole, first, second = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for i, value in enumerate(values):
+        whole.record(value)
+        (first if i % 2 else second).record(value)
+    first.merge(second)
+    assert first.counts == whole.counts
+    assert first.percentiles([50, 99]) == whole.percentiles([50, 99])
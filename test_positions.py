@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Unit tests for position bookkeeping in the trading bot (run with pytest)
+"""
+
+import asyncio
+
+import config
+from main import ArbitrageBot
+
+class FakeEngine:
+    """Logic engine that finds a profitable opportunity in every symbol it is asked about"""
+
+    def __init__(self, client):
+        self.client = client
+        self.scanned = []
+
+    async def find_arbitrage_opportunities(self, symbols=None):
+        symbols = self.client.trading_pairs if symbols is None else symbols
+        self.scanned.append(list(symbols))
+        return [
+            {'symbol': symbol, 'spot_price': 100.0, 'futures_price': 101.0, 'funding_rate': 0.001}
+            for symbol in symbols
+        ]
+
+    async def validate_opportunity(self, opportunity):
+        return True
+
+    async def calculate_position_sizes(self, symbol, quote_amount):
+        return {'spot_quantity': 1.0, 'futures_quantity': 1.0}
+
+def make_bot(client):
+    bot = ArbitrageBot()
+    bot.api_client = client
+    bot.logic_engine = FakeEngine(client)
+    return bot
+
+def test_second_tick_does_not_reopen_position(monkeypatch, make_client):
+    monkeypatch.setattr(config, 'MAX_OPEN_POSITIONS', 5)
+    bot = make_bot(make_client(['SYN5USD']))
+
+    async def ticks():
+        await bot._check_opportunities(['SYN5USD'])
+        await bot._check_opportunities(['SYN5USD'])
+        await bot._check_opportunities()
+
+    asyncio.run(ticks())
+    assert [p.symbol for p in bot.active_positions.values()] == ['SYN5USD']
+    assert len(bot.api_client.orders) == 2  # one spot and one futures leg
+    assert bot.logic_engine.scanned == [['SYN5USD']]
+
+def test_alias_spelling_counts_as_held(monkeypatch, make_client):
+    monkeypatch.setattr(config, 'MAX_OPEN_POSITIONS', 5)
+    bot = make_bot(make_client(['SYN5USD', 'SYN6USD']))
+
+    async def ticks():
+        await bot._check_opportunities(['SYN5USD'])
+        await bot._check_opportunities(['SYN5/USD', 'SYN6USD'])
+
+    asyncio.run(ticks())
+    assert sorted(p.symbol for p in bot.active_positions.values()) == ['SYN5USD', 'SYN6USD']
+    assert bot.logic_engine.scanned[-1] == ['SYN6USD']
+
+def test_closing_position_blocks_reentry(monkeypatch, make_client):
+    monkeypatch.setattr(config, 'MAX_OPEN_POSITIONS', 5)
+    bot = make_bot(make_client(['SYN5USD']))
+
+    asyncio.run(bot._check_opportunities(['SYN5USD']))
+    position = next(iter(bot.active_positions.values()))
+    position.status = "CLOSING"
+
+    opportunity = {'symbol': 'SYN5USD', 'spot_price': 100.0, 'futures_price': 101.0, 'funding_rate': 0.001}
+    asyncio.run(bot._execute_arbitrage(opportunity))
+    assert len(bot.active_positions) == 1
+    assert len(bot.api_client.orders) == 2
+
+def compensate(client, order_status='OPEN'):
+    bot = ArbitrageBot()
+    bot.api_client = client
+    order = {'orderId': 'ORD0', 'status': order_status}
+    return asyncio.run(bot._compensate_leg('SYN5USD', order, 'spot', 'buy', 2.0))
+
+def test_failed_cancel_reverses_only_the_filled_part(make_client):
+    client = make_client(['SYN5USD'], {'orderId': 'ORD0', 'status': 'PARTIALLY_FILLED', 'filledQty': 0.5})
+    assert compensate(client) is False  # the rest could not be cancelled either
+    assert client.cancels == 2
+    assert client.orders == [('SYN5USD', 'sell', 0.5, 'spot')]
+
+def test_failed_cancel_of_filled_order_reverses_all_of_it(make_client):
+    client = make_client(['SYN5USD'], {'orderId': 'ORD0', 'status': 'FILLED'})
+    assert compensate(client) is True
+    assert client.cancels == 1
+    assert client.orders == [('SYN5USD', 'sell', 2.0, 'spot')]
+
+def test_unknown_status_does_not_trade(make_client):
+    client = make_client(['SYN5USD'])
+    assert compensate(client) is False
+    assert client.orders == []
+
+def test_filled_order_is_reversed_without_cancelling(make_client):
+    client = make_client(['SYN5USD'])
+    assert compensate(client, order_status='FILLED') is True
+    assert client.cancels == 0
+    assert client.orders == [('SYN5USD', 'sell', 2.0, 'spot')]
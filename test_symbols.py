@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Unit tests for symbol interning and the places that key by symbol ID (run with pytest)
+"""
+
+import asyncio
+
+from symbols import SymbolRegistry, normalize
+from logic_engine import ArbitrageLogicEngine
+from ws_shards import ShardedConnectionManager
+
+def test_spellings_share_one_id():
+    registry = SymbolRegistry(['BTCUSD'])
+    assert normalize('mark:btc/usd') == 'BTCUSD'
+    for spelling in ('BTCUSD', 'BTC/USD', 'btc-usd', 'MARK:BTCUSD', 'BTC_USD'):
+        assert registry.id(spelling) == 0
+    assert registry.id('ETHUSD') is None
+    assert registry.register('ETH/USD') == 1
+    assert registry.names == ['BTCUSD', 'ETHUSD']
+    assert registry.get('ETH/USD') == 1  # exact spelling remembered for the fast path
+
+def test_shards_do_not_subscribe_an_alias_twice(make_client, make_socket):
+    client = make_client(['BTCUSD', 'ETHUSD'])
+    manager = ShardedConnectionManager(client, shard_count=2)
+    manager.assign(['BTCUSD', 'ETHUSD', 'BTC/USD'])
+    assert sum(len(shard.symbols) for shard in manager.shards) == 2
+
+    sockets = [make_socket() for _ in manager.shards]
+    for shard, ws in zip(manager.shards, sockets):
+        shard.ws = ws
+
+    async def churn():
+        await manager.add(['btc/usd', 'SOLUSD'])
+        await manager.remove(['ETH-USD'])
+
+    asyncio.run(churn())
+    sent = [frame for ws in sockets for frame in ws.sent]
+    assert sent == [('subscribe', {'l2_updates': ['SOLUSD']}), ('unsubscribe', {'l2_updates': ['ETHUSD']})]
+    assert manager.socket_for('MARK:BTCUSD') is manager.shards[0].ws
+    assert manager.socket_for('ETHUSD') is None
+
+def test_dirty_symbols_match_trading_pairs_by_id(make_client):
+    client = make_client(['BTC/USD', 'ETHUSD'])
+    engine = ArbitrageLogicEngine(client)
+    engine._has_started = True
+
+    # drain_dirty hands back canonical names; trading_pairs here uses another spelling
+    asyncio.run(engine.find_arbitrage_opportunities(['BTCUSD', 'SOLUSD']))
+    assert client.scanned == [['BTC/USD']]
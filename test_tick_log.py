@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Unit tests for tick capture (run with pytest)
+"""
+
+import math
+import os
+
+import numpy as np
+
+from tick_log import (TickRecorder, TickLogReader, CHANNEL_IDS, FIELD_DTYPE, HEADER_SIZE, PRICE_FIELDS,
+                      TICK_DTYPE, write_tick_file)
+
+T0 = 1_700_000_000.0
+
+def read_back(recorder):
+    reader = TickLogReader(recorder.path)
+    return [
+        (float(r['ts']), reader.symbol(int(r['symbol_id'])), reader.channels[int(r['channel'])],
+         {f: float(r[f]) for f in PRICE_FIELDS if not math.isnan(r[f])})
+        for r in reader.records
+    ]
+
+def test_conflation_keeps_receive_time_and_channel(tmp_path):
+    recorder = TickRecorder(str(tmp_path), min_interval=1.0)
+    recorder.hold('BTCUSD', 'l1_orderbook', {'bid': 100.0, 'ask': 101.0}, T0)
+    recorder.conflate(T0)
+    for i in range(1, 50):  # a burst inside one interval collapses to its last value
+        recorder.hold('BTCUSD', 'l1_orderbook', {'bid': 100.0 + i}, T0 + i * 0.01)
+        recorder.conflate(T0 + i * 0.01)
+    recorder.hold('BTCUSD', 'mark_price', {'mark': 100.5}, T0 + 0.6)
+    recorder.hold('BTCUSD', 'l1_orderbook', {'ask': 101.0}, T0 + 0.7)  # unchanged: not written again
+    recorder.hold('ETHUSD', 'v2/ticker', {'last': 5.0}, T0 + 0.8)
+    recorder.conflate(T0 + 1.0)
+    recorder.hold('ETHUSD', 'all_trades', {'last': 6.0}, T0 + 1.2)  # held until close
+    recorder.close()
+
+    assert read_back(recorder) == [
+        (T0, 'BTCUSD', 'l1_orderbook', {'bid': 100.0}),
+        (T0, 'BTCUSD', 'l1_orderbook', {'ask': 101.0}),
+        (T0 + 0.49, 'BTCUSD', 'l1_orderbook', {'bid': 149.0}),
+        (T0 + 0.6, 'BTCUSD', 'mark_price', {'mark': 100.5}),
+        (T0 + 0.8, 'ETHUSD', 'v2/ticker', {'last': 5.0}),
+        (T0 + 1.2, 'ETHUSD', 'all_trades', {'last': 6.0}),
+    ]
+
+def test_zero_interval_writes_every_change(tmp_path):
+    recorder = TickRecorder(str(tmp_path))
+    for i, bid in enumerate((100.0, 100.0, 101.0)):
+        recorder.hold('BTCUSD', 'l1_orderbook', {'bid': bid}, T0 + i)
+        recorder.conflate(T0 + i)
+    recorder.close()
+    assert [fields for _, _, _, fields in read_back(recorder)] == [{'bid': 100.0}, {'bid': 101.0}]
+
+def test_bytes_per_tick(tmp_path):
+    assert FIELD_DTYPE.itemsize == 20
+    recorder = TickRecorder(str(tmp_path))
+    for i in range(1000):  # a typical l1 tick moves one side of the book
+        recorder.hold(f"S{i % 50}USD", 'l1_orderbook', {'bid': 100.0 + i}, T0 + i * 0.001)
+        recorder.conflate(T0 + i * 0.001)
+    recorder.close()
+    data_bytes = os.path.getsize(recorder.path) - HEADER_SIZE
+    assert data_bytes / 1000 == 20  # vs 56 for a NaN-padded row
+    assert recorder.records_written == 1000
+
+def test_row_files_still_read(tmp_path):
+    records = np.zeros(2, dtype=TICK_DTYPE)
+    records['ts'] = [T0, T0 + 1]
+    records['channel'] = CHANNEL_IDS['synthetic']
+    for field in PRICE_FIELDS:
+        records[field] = [1.0, 2.0]
+    path = write_tick_file(str(tmp_path / 'day1'), records, ['BTCUSD'])
+    reader = TickLogReader(path)
+    assert reader.header['dtype'] == TICK_DTYPE
+    assert list(reader.records['mark']) == [1.0, 2.0]
+    assert reader.time_range() == (T0, T0 + 1)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Unit tests for trading universe selection and live resubscription (run with pytest)
+"""
+
+import os
+import sys
+import json
+import asyncio
+import subprocess
+
+from order_book import OrderBook
+from universe import UniverseManager, pair_to_symbol
+
+def make_manager(client, max_symbols=3):
+    return UniverseManager(client, pairs_file='unused.json', min_volume=1_000_000, min_funding=0.0,
+                           max_symbols=max_symbols, keep_ratio=0.5)
+
+def test_select_filters_by_volume_and_funding(make_client):
+    manager = make_manager(make_client([]))
+    tickers = {
+        'BTCUSD': (9_000_000, 0.0001),
+        'ETHUSD': (5_000_000, 0.0002),
+        'LOWVOLUSD': (999_999, 0.001),
+        'NEGUSD': (8_000_000, -0.0001),   # negative funding is not added...
+        'KEPTUSD': (600_000, -0.0005),    # ...but a subscribed symbol stays while turnover holds up
+        'GONEUSD': (400_000, 0.001),      # below keep_ratio * min_volume
+        'SOLUSD': (2_000_000, 0.0),
+    }
+    candidates = ['SOLUSD', 'BTCUSD', 'LOWVOLUSD', 'NEGUSD', 'ETHUSD', 'NOPERPUSD', 'KEPTUSD', 'GONEUSD']
+    assert make_manager(make_client([]), max_symbols=10).select(candidates, tickers) == ['BTCUSD', 'ETHUSD', 'SOLUSD']
+    assert manager.select(candidates, tickers, current=['KEPTUSD', 'GONEUSD']) == ['BTCUSD', 'ETHUSD', 'SOLUSD']
+    manager.max_symbols = 10
+    assert manager.select(candidates, tickers, current=['KEPTUSD', 'GONEUSD']) == ['BTCUSD', 'ETHUSD', 'SOLUSD', 'KEPTUSD']
+
+def test_apply_subscribes_only_the_difference(make_client, make_socket):
+    client = make_client(['BTCUSD', 'ETHUSD', 'XRPUSD'])
+    client.delta_ws = ws = make_socket()
+    client.order_books[client.market_state.lookup('ETHUSD')] = OrderBook('ETHUSD')
+    manager = make_manager(client)
+    manager.pinned = lambda: ['XRPUSD']  # open position: never dropped
+
+    added, removed = asyncio.run(manager.apply(['BTCUSD', 'SOLUSD']))
+    assert (added, removed) == (['SOLUSD'], ['ETHUSD'])
+    # Sent on the open socket, nothing reconnects
+    assert client.delta_ws is ws
+    assert ws.sent == [('subscribe', {'l2_updates': ['SOLUSD']}), ('unsubscribe', {'l2_updates': ['ETHUSD']})]
+    assert client.trading_pairs == ['BTCUSD', 'SOLUSD', 'XRPUSD']
+    assert client.market_state.lookup('SOLUSD') is not None
+    assert not client.order_books
+
+    ws.sent.clear()
+    assert asyncio.run(manager.apply(['SOLUSD', 'BTCUSD'])) == ([], [])
+    assert ws.sent == []
+
+def test_refresh_reads_pairs_and_tickers(tmp_path, make_client, make_socket):
+    pairs = tmp_path / 'pairs.json'
+    pairs.write_text(json.dumps({'data': {'coinswitchx': ['BTC/INR', 'ETH/INR', 'SOL/INR', 'btc/usdt']}}))
+    client = make_client(['BTCUSD'], tickers={
+        'BTCUSD': (450_000, 0.0001),  # kept until turnover drops below 500k
+        'ETHUSD': (3_000_000, 0.0001),
+        'SOLUSD': (2_000_000, -0.001),
+    })
+    client.delta_ws = make_socket()
+    manager = make_manager(client)
+    manager.pairs_file = str(pairs)
+
+    assert manager.candidates() == ['BTCUSD', 'ETHUSD', 'SOLUSD']
+    assert asyncio.run(manager.refresh()) == (['ETHUSD'], ['BTCUSD'])
+    assert client.delta_ws.sent == [('subscribe', {'l2_updates': ['ETHUSD']}), ('unsubscribe', {'l2_updates': ['BTCUSD']})]
+    assert pair_to_symbol('eth/inr') == 'ETHUSD'
+
+def import_config(**env):
+    """Import config in a fresh interpreter with the given environment; returns its stderr"""
+    env = {**os.environ, 'ENVIRONMENT': 'production', 'DELTA_API_KEY': 'key', 'DELTA_API_SECRET': 'secret', **env}
+    result = subprocess.run([sys.executable, '-c', 'import config'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env=env, capture_output=True, text=True)
+    return result.stderr
+
+def test_runtime_universe_is_rejected_with_ingest_workers():
+    # Shared memory has a fixed symbol table, so symbols added by a refresh would have nowhere to go
+    assert 'UNIVERSE_ENABLED cannot be combined' in import_config(UNIVERSE_ENABLED='true', INGEST_WORKERS='4')
+    assert import_config(UNIVERSE_ENABLED='true', INGEST_WORKERS='1') == ''
+    assert import_config(UNIVERSE_ENABLED='false', INGEST_WORKERS='4') == ''
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Unit tests for moving symbols between WebSocket shards (run with pytest)
+"""
+
+import json
+import asyncio
+
+from api_client import CoinSwitchClient
+from ws_shards import ShardedConnectionManager
+
+def l2(action, sequence_no, bid):
+    return json.dumps({
+        'type': 'l2_updates', 'symbol': 'BTCUSD', 'action': action, 'sequence_no': sequence_no,
+        'bids': [[str(bid), '1']], 'asks': [['200', '1']],
+    })
+
+def test_frames_queued_on_the_old_shard_do_not_break_the_moved_book(make_socket):
+    async def run():
+        client = CoinSwitchClient()
+        manager = client.shard_manager = ShardedConnectionManager(client, shard_count=2)
+        manager.assign(['BTCUSD', 'ETHUSD'])
+        old, new = manager.shards
+        old.ws, new.ws = make_socket(), make_socket()
+        try:
+            await client._process_websocket_batch([l2('snapshot', 10, 100), l2('update', 11, 101)])
+            await manager.move(['BTCUSD'], new)
+            book = client.order_books[client.market_state.lookup('BTCUSD')]
+            assert not book.is_synced
+
+            # Still queued on the old shard: before the new snapshot, then behind it
+            await client._process_websocket_batch([l2('update', 12, 102)])
+            await client._process_websocket_batch([l2('snapshot', 15, 105)])
+            await client._process_websocket_batch([l2('update', 13, 103), l2('update', 15, 999)])
+            await client._process_websocket_batch([l2('update', 16, 106)])
+            await asyncio.sleep(0)
+
+            assert book.is_synced and book.sequence_no == 16
+            assert book.best_bid() == 106.0
+            assert not client._resync_tasks
+            assert [frame['type'] for frame in old.ws.sent] == ['unsubscribe']
+            assert [frame['type'] for frame in new.ws.sent] == ['subscribe']
+        finally:
+            await client.cleanup()
+
+    asyncio.run(run())
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Append-only binary tick log for market data capture and replay
+
+Each file is a 64-byte header followed by fixed-width records, with a small
+JSON sidecar mapping symbol ids to symbols. Live capture writes one packed
+20-byte FIELD_DTYPE record per changed field (receive time, symbol, channel,
+field, value). Dense streams (synthetic data) can instead be written as
+56-byte TICK_DTYPE rows carrying any subset of bid/ask/last/mark/funding,
+missing fields NaN. Readers memory-map the records instead of loading them
+and present both layouts as TICK_DTYPE rows.
+"""
+
+import os
+import json
+import time
+import struct
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TICK_DTYPE = np.dtype([
+    ('ts', '<f8'),          # receive time, epoch seconds
+    ('symbol_id', '<u4'),   # index into the file's symbol table
+    ('channel', '<u2'),     # index into CHANNELS
+    ('reserved', '<u2'),
+    ('bid', '<f8'),
+    ('ask', '<f8'),
+    ('last', '<f8'),
+    ('mark', '<f8'),
+    ('funding', '<f8'),
+])
+PRICE_FIELDS = ('bid', 'ask', 'last', 'mark', 'funding')
+FIELD_IDS = {name: i for i, name in enumerate(PRICE_FIELDS)}
+
+# One changed field per record, packed (no alignment padding)
+FIELD_DTYPE = np.dtype([
+    ('ts', '<f8'),          # receive time of this value, epoch seconds
+    ('symbol_id', '<u2'),   # index into the file's symbol table
+    ('channel', 'u1'),      # index into CHANNELS
+    ('field', 'u1'),        # index into PRICE_FIELDS
+    ('value', '<f8'),
+])
+
+# Channel ids are part of the file format: append only
+CHANNELS = ('unknown', 'l1_orderbook', 'v2/ticker', 'all_trades', 'mark_price',
+            'candlestick_1m', 'l2_updates', 'l2_orderbook', 'demo', 'synthetic', 'batch')
+CHANNEL_IDS = {name: i for i, name in enumerate(CHANNELS)}
+
+# Magic -> record layout
+MAGIC_ROWS = b'TICKLOG1'
+MAGIC_FIELDS = b'TICKLOG2'
+LAYOUTS = {MAGIC_ROWS: TICK_DTYPE, MAGIC_FIELDS: FIELD_DTYPE}
+HEADER_SIZE = 64
+FILE_SUFFIX = '.ticks'
+SYMBOLS_SUFFIX = '.symbols.json'
+
+def _write_header(f, created: float, magic: bytes = MAGIC_FIELDS):
+    header = magic + struct.pack('<HHd', LAYOUTS[magic].itemsize, HEADER_SIZE, created)
+    f.write(header.ljust(HEADER_SIZE, b'\0'))
+
+def _read_header(path: str) -> Dict:
+    with open(path, 'rb') as f:
+        header = f.read(HEADER_SIZE)
+    magic = header[:len(MAGIC_FIELDS)]
+    if len(header) < HEADER_SIZE or magic not in LAYOUTS:
+        raise ValueError(f"Not a tick log: {path}")
+    record_size, header_size, created = struct.unpack_from('<HHd', header, len(magic))
+    dtype = LAYOUTS[magic]
+    if record_size != dtype.itemsize:
+        raise ValueError(f"Unsupported tick record size {record_size} in {path}")
+    return {'dtype': dtype, 'record_size': record_size, 'header_size': header_size, 'created': created}
+
+def expand_fields(fields: np.ndarray) -> np.ndarray:
+    """TICK_DTYPE rows for FIELD_DTYPE records, one row per record with the other fields NaN"""
+    records = np.zeros(len(fields), dtype=TICK_DTYPE)
+    records['ts'] = fields['ts']
+    records['symbol_id'] = fields['symbol_id']
+    records['channel'] = fields['channel']
+    for field_id, name in enumerate(PRICE_FIELDS):
+        column = np.full(len(fields), np.nan)
+        present = fields['field'] == field_id
+        column[present] = fields['value'][present]
+        records[name] = column
+    return records
+
+class TickRecorder:
+    """
+    Buffered writer for the ingest path.
+
+    record() turns a tick into one FIELD_DTYPE record per field and copies
+    them into a preallocated NumPy buffer; the buffer goes to disk in one
+    write when it fills up or flush_interval seconds after the last write,
+    and on flush()/close(). Files roll over at max_file_bytes and at UTC
+    midnight, so one file never spans two days.
+
+    The ingest path uses hold() and conflate() instead: hold() keeps the
+    latest value of each (symbol, field) with its receive time and channel,
+    and conflate() writes the values that changed at most once every
+    min_interval seconds, so the volume is bounded by symbols / min_interval
+    rather than by the message rate.
+    """
+
+    def __init__(self, directory: str, max_file_bytes: int = 256 * 1024 * 1024,
+                 buffer_records: int = 4096, flush_interval: float = 1.0, prefix: str = 'ticks',
+                 min_interval: float = 0.0):
+        self.directory = directory
+        self.min_interval = min_interval
+        self.max_file_bytes = max_file_bytes
+        self.flush_interval = flush_interval
+        self._last_flush = time.time()
+        self.prefix = prefix
+        self._buffer = np.zeros(max(int(buffer_records), 1), dtype=FIELD_DTYPE)
+        self._buffered = 0
+        self._symbol_ids: Dict[str, int] = {}
+        self._symbols: List[str] = []
+        self._symbols_dirty = False
+        # hold()/conflate(): (symbol id, field id) -> (receive ts, value, channel id) waiting to be
+        # written, and the last value written for each
+        self._held: Dict[Tuple[int, int], Tuple[float, float, int]] = {}
+        self._recorded: Dict[Tuple[int, int], float] = {}
+        self._last_conflated = 0.0
+        self._file = None
+        self._path: Optional[str] = None
+        self._file_bytes = 0
+        self._day_end = 0.0
+
+        self.records_written = 0
+        self.files_written = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def path(self) -> Optional[str]:
+        """File currently being written"""
+        return self._path
+
+    def symbol_id(self, symbol: str) -> int:
+        symbol_id = self._symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = self._symbol_ids[symbol] = len(self._symbols)
+            self._symbols.append(symbol)
+            self._symbols_dirty = True
+        return symbol_id
+
+    def _append(self, record: tuple):
+        """Buffer one (ts, symbol id, channel id, field id, value) record"""
+        # One tuple assignment is several times cheaper than setting fields one by one
+        self._buffer[self._buffered] = record
+        self._buffered += 1
+        if self._buffered == len(self._buffer) or record[0] - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def record(self, symbol: str, channel: str, fields: Dict[str, float], timestamp: Optional[float] = None):
+        """Append one tick ({field: value} for any of bid/ask/last/mark/funding)"""
+        timestamp = timestamp if timestamp is not None else time.time()
+        symbol_id = self.symbol_id(symbol)
+        channel_id = CHANNEL_IDS.get(channel, 0)
+        for field, value in fields.items():
+            field_id = FIELD_IDS.get(field)
+            if field_id is not None:
+                self._append((timestamp, symbol_id, channel_id, field_id, value))
+
+    def record_many(self, updates: Dict[str, Dict[str, float]], channel: str, timestamp: Optional[float] = None):
+        """Append one tick per symbol from a {symbol: {field: value}} batch"""
+        timestamp = timestamp if timestamp is not None else time.time()
+        for symbol, fields in updates.items():
+            self.record(symbol, channel, fields, timestamp)
+
+    def hold(self, symbol: str, channel: str, fields: Dict[str, float], timestamp: Optional[float] = None):
+        """Keep the latest value of each field for the next conflate(), with when and where it arrived"""
+        timestamp = timestamp if timestamp is not None else time.time()
+        symbol_id = self.symbol_id(symbol)
+        channel_id = CHANNEL_IDS.get(channel, 0)
+        held = self._held
+        for field, value in fields.items():
+            field_id = FIELD_IDS.get(field)
+            if field_id is not None:
+                held[(symbol_id, field_id)] = (timestamp, value, channel_id)
+
+    def conflate(self, now: Optional[float] = None):
+        """Write the held values that changed, if min_interval has passed since the last time"""
+        now = now if now is not None else time.time()
+        if now - self._last_conflated >= self.min_interval:
+            self._last_conflated = now
+            self._write_held()
+
+    def _write_held(self):
+        recorded = self._recorded
+        changed = []
+        for key, (timestamp, value, channel_id) in self._held.items():
+            if recorded.get(key) != value:
+                recorded[key] = value
+                changed.append((timestamp, key[0], channel_id, key[1], value))
+        self._held.clear()
+        # Everything held arrived after the previous conflation, so sorting keeps the file in time order
+        changed.sort()
+        for record in changed:
+            self._append(record)
+
+    def flush(self):
+        """Write buffered ticks to the current file"""
+        self._last_flush = time.time()
+        if not self._buffered:
+            self._write_symbols()
+            return
+        records = self._buffer[:self._buffered]
+        while len(records):
+            if self._file is None or self._file_bytes >= self.max_file_bytes or records['ts'][0] >= self._day_end:
+                self._rotate(float(records['ts'][0]))
+            # Anything past midnight goes to the next day's file
+            split = int(np.searchsorted(records['ts'], self._day_end))
+            self._write(records[:split])
+            records = records[split:]
+
+        self._buffered = 0
+        self._write_symbols()
+
+    def _write(self, records: np.ndarray):
+        data = records.tobytes()
+        self._file.write(data)
+        self._file.flush()
+        self._file_bytes += len(data)
+        self.records_written += len(records)
+
+    def _rotate(self, first_ts: float):
+        """Close the current file and start a new one"""
+        self._close_file()
+        stamp = datetime.fromtimestamp(first_ts, timezone.utc)
+        name = f"{self.prefix}_{stamp:%Y%m%d_%H%M%S}_{self.files_written:04d}{FILE_SUFFIX}"
+        self._path = os.path.join(self.directory, name)
+        self._file = open(self._path, 'wb')
+        _write_header(self._file, first_ts)
+        self._file_bytes = HEADER_SIZE
+        day_start = stamp.replace(hour=0, minute=0, second=0, microsecond=0)
+        self._day_end = (day_start + timedelta(days=1)).timestamp()
+        self.files_written += 1
+        self._symbols_dirty = True
+        logger.info(f"📼 Recording ticks to {self._path}")
+
+    def _write_symbols(self):
+        """Rewrite the sidecar symbol table if symbols were added"""
+        if not self._symbols_dirty or self._path is None:
+            return
+        sidecar = self._path[:-len(FILE_SUFFIX)] + SYMBOLS_SUFFIX
+        tmp = sidecar + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'symbols': self._symbols, 'channels': list(CHANNELS)}, f)
+        os.replace(tmp, sidecar)
+        self._symbols_dirty = False
+
+    def _close_file(self):
+        if self._file is not None:
+            self._write_symbols()
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        """Flush and close the current file"""
+        self._write_held()
+        self.flush()
+        self._close_file()
+
+class TickLogReader:
+    """
+    View of one tick log file as TICK_DTYPE rows.
+
+    Row files are memory-mapped as they are (zero-copy); field-record files
+    are mapped and expanded to one row per record.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.header = _read_header(path)
+        dtype = self.header['dtype']
+        count = (os.path.getsize(path) - HEADER_SIZE) // dtype.itemsize
+        # A torn final record (writer killed mid-write) is ignored
+        if count > 0:
+            mapped = np.memmap(path, dtype=dtype, mode='r', offset=HEADER_SIZE, shape=(count,))
+        else:
+            mapped = np.zeros(0, dtype=dtype)
+        self.records = mapped if dtype == TICK_DTYPE else expand_fields(mapped)
+
+        sidecar = path[:-len(FILE_SUFFIX)] + SYMBOLS_SUFFIX
+        with open(sidecar) as f:
+            table = json.load(f)
+        self.symbols: List[str] = table['symbols']
+        self.channels: List[str] = table.get('channels', list(CHANNELS))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def symbol(self, symbol_id: int) -> str:
+        return self.symbols[symbol_id]
+
+    def time_range(self) -> Optional[tuple]:
+        if not len(self.records):
+            return None
+        return float(self.records['ts'][0]), float(self.records['ts'][-1])
+
+    def iter_batches(self, batch_size: int = 65536) -> Iterator[np.ndarray]:
+        """Yield consecutive slices of the mapped records (views, not copies)"""
+        for start in range(0, len(self.records), batch_size):
+            yield self.records[start:start + batch_size]
+
+    def to_updates(self, records: np.ndarray) -> Iterator[tuple]:
+        """Yield (ts, symbol, channel, {field: value}) per record, skipping NaN fields"""
+        values = np.column_stack([records[name] for name in PRICE_FIELDS])
+        present = ~np.isnan(values)
+        for i in range(len(records)):
+            fields = {PRICE_FIELDS[j]: float(values[i, j]) for j in np.flatnonzero(present[i])}
+            channel_id = int(records['channel'][i])
+            channel = self.channels[channel_id] if channel_id < len(self.channels) else 'unknown'
+            yield float(records['ts'][i]), self.symbols[int(records['symbol_id'][i])], channel, fields
+
+def list_tick_files(directory: str, start: Optional[float] = None, end: Optional[float] = None) -> List[str]:
+    """Tick files in a directory in time order, optionally only those overlapping [start, end]"""
+    if not os.path.isdir(directory):
+        return []
+    paths = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(FILE_SUFFIX)
+    )
+    if start is None and end is None:
+        return paths
+
+    selected = []
+    for path in paths:
+        time_range = TickLogReader(path).time_range()
+        if time_range is None:
+            continue
+        first, last = time_range
+        if (end is None or first <= end) and (start is None or last >= start):
+            selected.append(path)
+    return selected
+
+def write_tick_file(path: str, records: np.ndarray, symbols: List[str]):
+    """
+    Write a whole TICK_DTYPE array (e.g. a synthetic stream) as one tick log
+    file, kept as rows: for dense data they are smaller than field records
+    """
+    if not path.endswith(FILE_SUFFIX):
+        path += FILE_SUFFIX
+    records = np.asarray(records, dtype=TICK_DTYPE)
+    with open(path, 'wb') as f:
+        _write_header(f, float(records['ts'][0]) if len(records) else time.time(), MAGIC_ROWS)
+        f.write(records.tobytes())
+    with open(path[:-len(FILE_SUFFIX)] + SYMBOLS_SUFFIX, 'w') as f:
+        json.dump({'symbols': list(symbols), 'channels': list(CHANNELS)}, f)
+    return path
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Trading universe: which symbols the bot streams and scans
+
+Candidates come from the exchange pair list (pairs.json, reloaded when the
+file changes) and are filtered by turnover and funding from the public
+tickers. Each refresh diffs the selection against the live subscriptions
+and subscribes or unsubscribes only the difference on the open sockets,
+so the universe can grow from one symbol to hundreds without a restart.
+"""
+
+import os
+import json
+import asyncio
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import config
+
+logger = logging.getLogger(__name__)
+
+def pair_to_symbol(pair: str, quote: str = None) -> Optional[str]:
+    """Map an exchange pair ('BTC/INR') to the perpetual the bot trades ('BTCUSD')"""
+    base = pair.split('/', 1)[0].strip().upper()
+    return f"{base}{quote or config.UNIVERSE_SYMBOL_QUOTE}" if base else None
+
+def load_pairs(path: str, exchange: str = None) -> List[str]:
+    """Read a pair list in the exchange's {"data": {exchange: [pairs]}} format"""
+    with open(path) as f:
+        data = json.load(f)
+    return list(data.get('data', {}).get(exchange or config.UNIVERSE_EXCHANGE, []))
+
+class UniverseManager:
+    """
+    Selects and maintains the client's trading_pairs.
+
+    A candidate is added when its 24h turnover is at least min_volume and
+    its funding rate at least min_funding. Once subscribed it stays until
+    turnover falls below min_volume * keep_ratio; funding only gates
+    additions, because it flips sign too often to unsubscribe on. Symbols
+    returned by pinned() (open positions) are never dropped.
+    """
+
+    def __init__(self, client, pairs_file: str = None, refresh_interval: float = None,
+                 min_volume: float = None, min_funding: float = None, max_symbols: int = None,
+                 keep_ratio: float = None):
+        self.client = client
+        self.pairs_file = pairs_file or config.UNIVERSE_PAIRS_FILE
+        self.refresh_interval = refresh_interval or config.UNIVERSE_REFRESH_INTERVAL
+        self.min_volume = config.UNIVERSE_MIN_VOLUME_USD if min_volume is None else min_volume
+        self.min_funding = config.UNIVERSE_MIN_FUNDING_RATE if min_funding is None else min_funding
+        self.max_symbols = max_symbols or config.UNIVERSE_MAX_SYMBOLS
+        self.keep_ratio = config.UNIVERSE_KEEP_RATIO if keep_ratio is None else keep_ratio
+        self.pinned: Callable[[], Iterable[str]] = lambda: ()
+
+        self._candidates: List[str] = []
+        self._pairs_mtime: Optional[float] = None
+        self.refreshes = 0
+        self.last_added: List[str] = []
+        self.last_removed: List[str] = []
+
+    def candidates(self) -> List[str]:
+        """Symbols from the pair list, cached until the file changes"""
+        try:
+            mtime = os.path.getmtime(self.pairs_file)
+            if mtime != self._pairs_mtime:
+                symbols = (pair_to_symbol(pair) for pair in load_pairs(self.pairs_file))
+                self._candidates = list(dict.fromkeys(symbol for symbol in symbols if symbol))
+                self._pairs_mtime = mtime
+                logger.info(f"📜 Loaded {len(self._candidates)} candidate pairs from {self.pairs_file}")
+        except Exception as e:
+            logger.error(f"❌ Error loading pair list {self.pairs_file}: {e}")
+        return self._candidates
+
+    async def fetch_tickers(self) -> Optional[Dict[str, Tuple[float, float]]]:
+        """{symbol: (24h turnover in USD, funding rate)} for the exchange's perpetuals"""
+        response = await self.client._make_request('GET', '/v2/tickers', params={'contract_types': 'perpetual_futures'})
+        if not response or 'result' not in response:
+            return None
+        tickers = {}
+        for ticker in response['result']:
+            try:
+                tickers[ticker['symbol']] = (float(ticker.get('turnover_usd') or 0), float(ticker.get('funding_rate') or 0))
+            except (KeyError, TypeError, ValueError):
+                continue
+        return tickers
+
+    def select(self, candidates: List[str], tickers: Dict[str, Tuple[float, float]],
+               current: Iterable[str] = ()) -> List[str]:
+        """Filter candidates by turnover and funding, busiest first, capped at max_symbols"""
+        current = set(current)
+        chosen = []
+        for symbol in candidates:
+            ticker = tickers.get(symbol)
+            if ticker is None:
+                continue  # no perpetual to hedge with
+            turnover, funding = ticker
+            if symbol in current:
+                keep = turnover >= self.min_volume * self.keep_ratio
+            else:
+                keep = turnover >= self.min_volume and funding >= self.min_funding
+            if keep:
+                chosen.append(symbol)
+        chosen.sort(key=lambda s: tickers[s][0], reverse=True)
+        return chosen[:self.max_symbols]
+
+    async def initial_universe(self) -> List[str]:
+        """Universe to start with, or TARGET_SYMBOLS if the tickers are unavailable"""
+        tickers = await self.fetch_tickers()
+        if tickers is None:
+            logger.warning("⚠️ Tickers unavailable, starting with TARGET_SYMBOLS")
+            return list(config.TARGET_SYMBOLS)
+        return self.select(self.candidates(), tickers) or list(config.TARGET_SYMBOLS)
+
+    async def refresh(self) -> Tuple[List[str], List[str]]:
+        """Re-select the universe and apply the difference; returns (added, removed)"""
+        tickers = await self.fetch_tickers()
+        if tickers is None:
+            logger.warning("⚠️ Tickers unavailable, keeping the current universe")
+            return [], []
+        self.refreshes += 1
+        return await self.apply(self.select(self.candidates(), tickers, self.client.trading_pairs))
+
+    async def apply(self, target: List[str]) -> Tuple[List[str], List[str]]:
+        """Make target the live universe, (un)subscribing only what changed"""
+        client = self.client
+        current = list(client.trading_pairs)
+        pinned = set(self.pinned())
+        target = list(dict.fromkeys(target + [symbol for symbol in current if symbol in pinned]))
+
+        target_set, current_set = set(target), set(current)
+        added = [symbol for symbol in target if symbol not in current_set]
+        removed = [symbol for symbol in current if symbol not in target_set]
+        self.last_added, self.last_removed = added, removed
+        if not added and not removed:
+            return added, removed
+
+        for symbol in added:
+            client.market_state.slot(symbol)
+        # Updated before sending so a socket that reconnects meanwhile subscribes the new set
+        client.trading_pairs = target
+
+        try:
+            if client.shard_manager is not None:
+                await client.shard_manager.add(added)
+                await client.shard_manager.remove(removed)
+            elif client.delta_ws is not None:
+                if added:
+                    await client._subscribe_channels(client.delta_ws, client._channels_for(added))
+                if removed:
+                    await client._subscribe_channels(client.delta_ws, client._channels_for(removed), "unsubscribe")
+        except Exception as e:
+            # The socket resubscribes trading_pairs when it reconnects
+            logger.error(f"❌ Error updating subscriptions: {e}")
+
+        for symbol in removed:
+            client.order_books.pop(client.market_state.lookup(symbol), None)
+        logger.info(f"🌍 Universe now {len(target)} symbols (+{len(added)} / -{len(removed)})")
+        return added, removed
+
+    async def run(self):
+        """Refresh every refresh_interval seconds until cancelled"""
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"❌ Error refreshing universe: {e}")
+
+    def get_stats(self) -> Dict:
+        return {
+            'symbols': len(self.client.trading_pairs),
+            'candidates': len(self._candidates),
+            'refreshes': self.refreshes,
+            'last_added': len(self.last_added),
+            'last_removed': len(self.last_removed),
+        }
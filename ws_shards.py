@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Sharded market data ingest: the symbol universe spread over several WebSocket connections
+
+Each shard owns a subset of the symbols and has its own connection, reader
+and decode/apply task, so one busy or reconnecting socket no longer holds up
+every symbol. All shards write to the client's single MarketStateStore.
+Symbols move between shards (unsubscribe on one socket, subscribe on the
+other, no reconnect) when one shard falls behind.
+"""
+
+import time
+import asyncio
+import logging
+from typing import Dict, List
+
+import websockets
+
+import config
+
+logger = logging.getLogger(__name__)
+
+class _Shard:
+    """One connection and the symbols it carries"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.symbols: Dict[int, str] = {}  # slot -> spelling it is subscribed under, insertion-ordered
+        self.ws = None
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.messages = 0
+        self.reconnects = 0
+        self.msgs_per_s = 0.0
+        self.lagging_checks = 0
+        self._rate_messages = 0
+        self._rate_time = time.monotonic()
+
+    @property
+    def backlog(self) -> int:
+        """Frames received but not yet decoded"""
+        return self.queue.qsize()
+
+    def update_rate(self, now: float):
+        elapsed = now - self._rate_time
+        if elapsed > 0:
+            self.msgs_per_s = (self.messages - self._rate_messages) / elapsed
+        self._rate_messages = self.messages
+        self._rate_time = now
+
+class ShardedConnectionManager:
+    """
+    Runs shard_count connections for a CoinSwitchClient.
+
+    Symbols are dealt round-robin at start. Every rebalance_interval seconds
+    the per-shard message rates are refreshed and logged; a shard whose
+    decode backlog has stayed above lag_frames (or whose rate is more than
+    imbalance_ratio times the average) hands its busiest symbols to the
+    least loaded shard, at most max_moves per round. Symbol activity is
+    measured from market state version deltas, so the hot path pays nothing.
+    """
+
+    def __init__(self, client, shard_count: int = None, rebalance_interval: float = None,
+                 lag_frames: int = None, imbalance_ratio: float = None, max_moves: int = 10):
+        self.client = client
+        self.shards = [_Shard(i) for i in range(max(shard_count or config.WS_SHARD_COUNT, 1))]
+        self.rebalance_interval = rebalance_interval or config.WS_SHARD_REBALANCE_INTERVAL
+        self.lag_frames = lag_frames or config.WS_SHARD_LAG_FRAMES
+        self.imbalance_ratio = imbalance_ratio or config.WS_SHARD_IMBALANCE_RATIO
+        self.max_moves = max_moves
+        # Keyed by market state slot, so every alias of a symbol maps to one subscription
+        self._shard_of: Dict[int, _Shard] = {}
+        self._versions: Dict[int, int] = {}
+        self._tasks: List[asyncio.Task] = []
+        self.rebalances = 0
+
+    def assign(self, symbols: List[str]):
+        """Deal symbols round-robin over the shards (before run, or to reset the layout)"""
+        for shard in self.shards:
+            shard.symbols.clear()
+        self._shard_of.clear()
+        for symbol in symbols:
+            slot = self.client.market_state.slot(symbol)
+            if slot in self._shard_of:
+                continue  # another spelling of a symbol already dealt
+            shard = self.shards[len(self._shard_of) % len(self.shards)]
+            shard.symbols[slot] = symbol
+            self._shard_of[slot] = shard
+
+    def socket_for(self, symbol: str):
+        """Connection currently carrying a symbol (None if unassigned or disconnected)"""
+        shard = self._shard_of.get(self.client.market_state.lookup(symbol))
+        return shard.ws if shard else None
+
+    async def run(self):
+        """Run every shard until cancelled"""
+        if not self._shard_of:
+            self.assign(self.client.trading_pairs)
+        logger.info(f"🔀 Sharding {len(self._shard_of)} symbols over {len(self.shards)} connections")
+        for shard in self.shards:
+            self._tasks.append(asyncio.create_task(self._run_reader(shard)))
+            self._tasks.append(asyncio.create_task(self._run_applier(shard)))
+        try:
+            while True:
+                await asyncio.sleep(self.rebalance_interval)
+                await self._check_shards()
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks.clear()
+
+    async def _run_reader(self, shard: _Shard):
+        """Connection loop for one shard, with the same backoff as the single-socket reader"""
+        retry_delay = 5
+        max_retry_delay = 60
+        while True:
+            try:
+                async with websockets.connect(config.WS_URL, ping_interval=20, ping_timeout=20) as ws:
+                    shard.ws = ws
+                    if shard.symbols:
+                        await self.client._subscribe_channels(ws, self.client._channels_for(list(shard.symbols.values())))
+                    logger.info(f"🔌 Shard {shard.index} connected ({len(shard.symbols)} symbols)")
+                    retry_delay = 5
+
+                    ingest = shard.queue.put_nowait
+                    async for message in ws:
+                        ingest(message)
+                        shard.messages += 1
+
+                logger.warning(f"❌ Shard {shard.index} WebSocket closed by server")
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Shard {shard.index} WebSocket connection error: {e}")
+            finally:
+                shard.ws = None
+
+            shard.reconnects += 1
+            logger.info(f"⏳ Shard {shard.index} reconnecting in {retry_delay} seconds...")
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, max_retry_delay)
+
+    async def _run_applier(self, shard: _Shard):
+        """Drains one shard's queue in batches into the shared market state"""
+        queue = shard.queue
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < config.INGEST_MAX_BATCH:
+                try:
+                    batch.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            await self.client._process_websocket_batch(batch)
+
+    async def _check_shards(self):
+        """Refresh rates, log them, and rebalance if a shard is falling behind"""
+        now = time.monotonic()
+        for shard in self.shards:
+            shard.update_rate(now)
+            shard.lagging_checks = shard.lagging_checks + 1 if shard.backlog > self.lag_frames else 0
+        logger.info("📶 Shard rates: " + ", ".join(
+            f"#{s.index} {s.msgs_per_s:,.0f} msgs/s ({len(s.symbols)} symbols, backlog {s.backlog})"
+            for s in self.shards
+        ))
+        activity = self._symbol_activity()
+        if len(self.shards) > 1:
+            await self.rebalance(activity)
+
+    def _symbol_activity(self) -> Dict[int, int]:
+        """Market state writes per slot since the previous check"""
+        version_at = self.client.market_state.version_at
+        activity = {}
+        for slot in self._shard_of:
+            version = version_at(slot)
+            activity[slot] = version - self._versions.get(slot, 0)
+            self._versions[slot] = version
+        return activity
+
+    async def rebalance(self, activity: Dict[int, int]) -> int:
+        """Move the busiest symbols off an overloaded shard; returns how many moved"""
+        load = {shard.index: sum(activity.get(s, 0) for s in shard.symbols) for shard in self.shards}
+        busiest = max(self.shards, key=lambda s: (s.lagging_checks > 1, load[s.index]))
+        idlest = min(self.shards, key=lambda s: (s.backlog, load[s.index]))
+        average = sum(load.values()) / len(self.shards)
+
+        lagging = busiest.lagging_checks > 1
+        imbalanced = average > 0 and load[busiest.index] > average * self.imbalance_ratio
+        if busiest is idlest or len(busiest.symbols) <= 1 or not (lagging or imbalanced):
+            return 0
+
+        # Hand over the hottest symbols until the two shards would be roughly even
+        excess = (load[busiest.index] - load[idlest.index]) / 2
+        to_move = []
+        for slot in sorted(busiest.symbols, key=lambda s: activity.get(s, 0), reverse=True):
+            if len(to_move) >= self.max_moves or len(to_move) >= len(busiest.symbols) - 1:
+                break
+            if activity.get(slot, 0) > excess and not lagging:
+                continue
+            to_move.append(busiest.symbols[slot])
+            excess -= activity.get(slot, 0)
+            if excess <= 0:
+                break
+        if not to_move:
+            return 0
+
+        await self.move(to_move, idlest)
+        self.rebalances += 1
+        logger.info(f"⚖️ Moved {len(to_move)} symbols from shard {busiest.index} to shard {idlest.index} "
+                    f"({'backlog ' + str(busiest.backlog) if lagging else 'load imbalance'})")
+        return len(to_move)
+
+    async def add(self, symbols: List[str]):
+        """Subscribe new symbols, each on the shard currently carrying the fewest"""
+        by_shard: Dict[int, List[str]] = {}
+        for symbol in symbols:
+            slot = self.client.market_state.slot(symbol)
+            if slot in self._shard_of:
+                continue  # already subscribed, possibly under another spelling
+            shard = min(self.shards, key=lambda s: len(s.symbols))
+            shard.symbols[slot] = symbol
+            self._shard_of[slot] = shard
+            by_shard.setdefault(shard.index, []).append(symbol)
+        await self._send(by_shard, "subscribe")
+
+    async def remove(self, symbols: List[str]):
+        """Unsubscribe symbols from whichever shards carry them"""
+        by_shard: Dict[int, List[str]] = {}
+        for symbol in symbols:
+            slot = self.client.market_state.lookup(symbol)
+            shard = self._shard_of.pop(slot, None)
+            if shard is None:
+                continue
+            self._versions.pop(slot, None)
+            # Unsubscribe under the spelling it was subscribed with
+            by_shard.setdefault(shard.index, []).append(shard.symbols.pop(slot))
+        await self._send(by_shard, "unsubscribe")
+
+    async def _send(self, by_shard: Dict[int, List[str]], action: str):
+        for index, group in by_shard.items():
+            ws = self.shards[index].ws
+            if ws is None:
+                continue  # a reconnecting shard subscribes its current symbols when it is back
+            try:
+                await self.client._subscribe_channels(ws, self.client._channels_for(group), action)
+            except Exception as e:
+                logger.error(f"❌ Error sending {action} to shard {index}: {e}")
+
+    async def move(self, symbols: List[str], target: _Shard):
+        """Re-home symbols on another shard without reconnecting either socket"""
+        by_source: Dict[int, List[str]] = {}
+        for symbol in symbols:
+            slot = self.client.market_state.slot(symbol)
+            source = self._shard_of.get(slot)
+            if source is target:
+                continue
+            if source is not None:
+                symbol = source.symbols.pop(slot)
+                by_source.setdefault(source.index, []).append(symbol)
+            target.symbols[slot] = symbol
+            self._shard_of[slot] = target
+
+        moved = [symbol for group in by_source.values() for symbol in group]
+        # The new subscription starts with an L2 snapshot; until it lands, deltas from either socket
+        # are dropped, and afterwards ones still queued on the old shard are behind it and ignored
+        for symbol in moved:
+            book = self.client.order_books.get(self.client.market_state.lookup(symbol))
+            if book is not None:
+                book.await_snapshot()
+        try:
+            # Subscribe first so there is no gap in the unsequenced channels
+            if target.ws is not None and moved:
+                await self.client._subscribe_channels(target.ws, self.client._channels_for(moved))
+            for index, group in by_source.items():
+                source = self.shards[index]
+                if source.ws is not None:
+                    await self.client._subscribe_channels(source.ws, self.client._channels_for(group), "unsubscribe")
+        except Exception as e:
+            # A socket that failed mid-move resubscribes its current symbols on reconnect
+            logger.error(f"❌ Error moving symbols to shard {target.index}: {e}")
+
+    def get_stats(self) -> List[Dict]:
+        """Per-shard symbols, message counts and rates"""
+        return [
+            {
+                'shard': shard.index,
+                'connected': shard.ws is not None,
+                'symbols': len(shard.symbols),
+                'messages': shard.messages,
+                'msgs_per_s': shard.msgs_per_s,
+                'backlog': shard.backlog,
+                'reconnects': shard.reconnects,
+            }
+            for shard in self.shards
+        ]